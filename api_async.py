@@ -0,0 +1,135 @@
+# 导入asyncio用于并发调度，threading用于保护令牌桶状态，time用于计时
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+
+# 粗略估计文本的token数量（约4个字符一个token），用于速率限制和预算控制
+def estimate_tokens(text):
+    if not text:
+        return 0
+    return len(text) // 4 + 1
+
+
+# 单次请求的开销记录：延迟（秒）、服务器返回的token用量（未返回用量时为0）和遇到的429次数
+def request_meta(latency, usage=None):
+    usage = usage or {}
+    return {
+        'llm_latency': latency,
+        'prompt_tokens': usage.get('prompt_tokens', 0),
+        'completion_tokens': usage.get('completion_tokens', 0),
+        'llm_throttled': usage.get('throttled', 0),
+    }
+
+
+# 令牌桶：按“每分钟”速率补充令牌，用于限制每分钟请求数（RPM）或每分钟token数（TPM）
+# 状态由线程锁保护，等待通过asyncio.sleep完成，因此可以在不同的事件循环之间复用
+class TokenBucket():
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0  # 每秒补充的令牌数
+        self.capacity = capacity if capacity is not None else rate_per_minute  # 桶容量（允许的突发量）
+        self.tokens = self.capacity  # 当前令牌数，初始为满
+        self.updated = time.monotonic()  # 上次补充的时间
+        self._lock = threading.Lock()
+
+    # 根据流逝的时间补充令牌（调用方需持有锁）
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # 获取amount个令牌，不足时异步等待；单次请求超过容量时按容量计，避免永远等待
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            await asyncio.sleep(wait)
+
+    # 用实际消耗修正预估值（delta为正表示多扣，允许令牌数暂时为负以偿还“欠款”）
+    def adjust(self, delta):
+        with self._lock:
+            self._refill()
+            self.tokens -= delta
+
+    # 线程锁不能被pickle，传到worker进程时重新创建
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+# 基于asyncio的LLM客户端：在单个进程中保持最多max_in_flight个请求同时进行，
+# 并用RPM/TPM令牌桶控制发送速率。实际的HTTP请求由阻塞接口（复用连接池）在线程中完成
+class AsyncLLMClient():
+    def __init__(self, interface_llm, max_in_flight=8, rpm=None, tpm=None):
+        self.interface_llm = interface_llm  # 底层阻塞接口（InterfaceAPI或本地LLM接口）
+        self.max_in_flight = max(1, int(max_in_flight))  # 最大在途请求数
+        self.rpm_bucket = TokenBucket(rpm) if rpm else None  # 每分钟请求数限制
+        self.tpm_bucket = TokenBucket(tpm) if tpm else None  # 每分钟token数限制
+        self._executor = None  # 执行阻塞请求的线程池（懒加载）
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_in_flight)
+        return self._executor
+
+    # 调用底层接口获取n个样本，返回 (响应列表, token用量)；不提供用量的接口返回None
+    # stop_when用于单样本流式响应的提前结束（见InterfaceAPI._stream）
+    def _complete(self, prompt_content, n=1, stop_when=None):
+        if hasattr(self.interface_llm, 'get_completions'):
+            return self.interface_llm.get_completions(prompt_content, n, stop_when)
+        return [self.interface_llm.get_response(prompt_content) for _ in range(n)], None
+
+    # 发送单个请求：先占用并发名额，再依次等待RPM和TPM令牌
+    async def _request(self, semaphore, prompt_content, n=1, stop_when=None):
+        async with semaphore:
+            if self.rpm_bucket is not None:
+                await self.rpm_bucket.acquire(1)
+            n_est = estimate_tokens(prompt_content)
+            if self.tpm_bucket is not None:
+                await self.tpm_bucket.acquire(n_est)
+            loop = asyncio.get_running_loop()
+            time_start = time.monotonic()
+            try:
+                responses, usage = await loop.run_in_executor(self._get_executor(), self._complete, prompt_content, n, stop_when)
+            except Exception:
+                responses, usage = [None] * n, None
+            # 用服务器返回的实际token用量修正TPM令牌桶
+            if self.tpm_bucket is not None and usage and usage.get('total_tokens'):
+                self.tpm_bucket.adjust(usage['total_tokens'] - n_est)
+            return responses, request_meta(time.monotonic() - time_start, usage)
+
+    # 并发发送一组提示词（第i个请求counts[i]个样本），按输入顺序返回响应列表的列表（失败的样本对应None）
+    # 传入列表meta时，按相同顺序追加每个请求的开销记录
+    async def gather(self, prompts, counts=None, meta=None, stop_when=None):
+        if counts is None:
+            counts = [1] * len(prompts)
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        results = await asyncio.gather(*(self._request(semaphore, p, n, stop_when) for p, n in zip(prompts, counts)))
+        if meta is not None:
+            meta.extend(m for _, m in results)
+        return [responses for responses, _ in results]
+
+    # 同步入口：在新的事件循环中完成一批多样本请求
+    def get_samples(self, prompts, counts=None, meta=None, stop_when=None):
+        return asyncio.run(self.gather(prompts, counts, meta, stop_when))
+
+    # 同步入口：每个提示词一个样本，返回响应列表
+    def get_responses(self, prompts):
+        return [samples[0] for samples in self.get_samples(prompts)]
+
+    # 线程池不能被pickle，传到worker进程时重新懒加载
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_executor'] = None
+        return state
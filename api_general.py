@@ -1,11 +1,23 @@
-# 导入用于HTTP通信的http.client模块和用于JSON数据处理的json模块
-import http.client
+# 导入用于JSON数据处理的json模块和用于计时/等待的time模块
 import json
+import time
+
+# 导入按进程共享的keep-alive连接池
+from .api_pool import get_pool, parse_endpoint
+# 导入重试策略、熔断器和重试统计
+from .api_retry import APIError, RetryPolicy, get_breaker, get_stats, parse_retry_after
+# 导入按进程、按端点共享的自适应节奏控制器
+from .api_pacing import get_pacer
 
 # 定义一个用于与远程LLM API交互的接口类
 class InterfaceAPI:
     # 初始化方法，接收API端点、API密钥、模型名称和调试模式参数
-    def __init__(self, api_endpoint, api_key, model_LLM, debug_mode):
+    # pool_size/pool_idle_timeout控制连接池的最大连接数和空闲连接保留时间
+    # retry_policy为重试策略（默认最多5次尝试、指数退避），breaker_threshold/breaker_reset为端点熔断器设置
+    # pacing为是否启用自适应节奏控制（出现429后按AIMD调整发送速率），pacing_max_rpm/pacing_latency为速率上限和延迟阈值
+    def __init__(self, api_endpoint, api_key, model_LLM, debug_mode, pool_size=4, pool_idle_timeout=60,
+                 retry_policy=None, breaker_threshold=5, breaker_reset=30.0, stream=False,
+                 pacing=True, pacing_max_rpm=None, pacing_latency=None):
         # 将传入的API端点赋值给实例变量，用于后续连接
         self.api_endpoint = api_endpoint
         # 将传入的API密钥赋值给实例变量，用于身份验证
@@ -14,22 +26,52 @@ class InterfaceAPI:
         self.model_LLM = model_LLM
         # 将传入的调试模式标志赋值给实例变量，控制调试信息输出
         self.debug_mode = debug_mode
-        # 设置最大重试次数为5次，用于API调用失败时的重试机制
-        self.n_trial = 5
+        # 重试策略：指数退避+完全抖动，遵循429响应的Retry-After
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        # 熔断器设置（熔断器本身按进程、按端点共享）
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        # 是否使用流式（SSE）响应，流式时可以在内容足够后提前断开
+        self.stream = stream
+        # 节奏控制设置（控制器本身按进程、按端点共享）
+        self.pacing = pacing
+        self.pacing_max_rpm = pacing_max_rpm
+        self.pacing_latency = pacing_latency
+        # 连接池配置（连接池本身按进程懒加载，不保存在实例上，保证实例可被pickle到worker进程）
+        self.pool_size = pool_size
+        self.pool_idle_timeout = pool_idle_timeout
+        # 请求路径，支持端点中带路径前缀（如 http://127.0.0.1:8000/proxy）
+        self.api_path = parse_endpoint(self.api_endpoint)[3] + "/v1/chat/completions"
 
     # 定义获取LLM响应的方法，接收提示词内容作为参数
-    def get_response(self, prompt_content):
+    def get_response(self, prompt_content, stop_when=None):
+        # 只返回生成内容，忽略token用量
+        return self.get_completion(prompt_content, stop_when)[0]
+
+    # 获取LLM响应及服务器返回的token用量（usage字段），返回 (响应内容, 用量字典或None)
+    # 调用过程中遇到429时，用量字典中附加throttled字段（429次数）
+    # 流式模式下stop_when(已接收内容)返回True时停止读取，返回已接收的部分
+    def get_completion(self, prompt_content, stop_when=None):
+        responses, usage = self.get_completions(prompt_content, 1, stop_when)
+        return (responses[0] if responses else None), usage
+
+    # 一次请求生成n个样本（请求参数n），返回 (响应内容列表, 用量字典或None)，失败时列表为空
+    # 服务器返回的样本数可能少于n（部分服务不支持n），由调用方决定是否补齐；n>1时不使用流式
+    def get_completions(self, prompt_content, n=1, stop_when=None):
+        stream = self.stream and n == 1
         # 构造API请求的JSON payload，包含模型名称和对话消息（仅用户提示词）
-        payload_explanation = json.dumps(
-            {
-                "model": self.model_LLM,  # 指定使用的模型
-                "messages": [
-                    # 注释掉的系统角色消息，原本用于定义助手行为
-                    # {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt_content}  # 用户输入的提示词
-                ],
-            }
-        )
+        payload = {
+            "model": self.model_LLM,  # 指定使用的模型
+            "messages": [
+                # 注释掉的系统角色消息，原本用于定义助手行为
+                # {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": prompt_content}  # 用户输入的提示词
+            ],
+            "stream": stream,  # 是否以SSE流式返回
+        }
+        if n > 1:
+            payload["n"] = n  # 同一提示词生成的样本数
+        payload_explanation = json.dumps(payload)
 
         # 构造HTTP请求头，包含身份验证、用户代理、内容类型等信息
         headers = {
@@ -39,38 +81,124 @@ class InterfaceAPI:
             "x-api2d-no-cache": 1,  # 禁用缓存，确保获取最新响应
         }
         
-        # 初始化响应变量为None
-        response = None
-        # 初始化重试计数器为1
-        n_trial = 1
-        # 进入循环，直到成功获取响应或达到最大重试次数
+        # 同一端点在本进程内共享的连接池、熔断器和统计对象
+        pool = get_pool(self.api_endpoint, self.pool_size, self.pool_idle_timeout)
+        breaker = get_breaker(self.api_endpoint, self.breaker_threshold, self.breaker_reset)
+        stats = get_stats(self.api_endpoint)
+        pacer = None
+        if self.pacing:
+            pacer = get_pacer(
+                self.api_endpoint,
+                max_rate=self.pacing_max_rpm / 60.0 if self.pacing_max_rpm else None,
+                latency_target=self.pacing_latency,
+            )
+
+        attempt = 0  # 尝试次数
+        n_throttled = 0  # 本次调用中遇到的429次数
+        n_rejected = 0  # 本次调用中被熔断器拒绝的次数
         while True:
-            # 重试计数器加1
-            n_trial += 1
-            # 如果重试次数超过最大限制，返回当前响应（可能为None）
-            if n_trial > self.n_trial:
-                return response
+            attempt += 1
+            rejected = False
+            time_start = time.time()
             try:
-                # 建立与API端点的HTTPS连接
-                conn = http.client.HTTPSConnection(self.api_endpoint)
-                # 发送POST请求到指定的API路径（聊天补全接口），携带payload和 headers
-                conn.request("POST", "/v1/chat/completions", payload_explanation, headers)
-                # 获取服务器的响应
-                res = conn.getresponse()
-                # 读取响应数据
-                data = res.read()
-                # 将响应数据解析为JSON格式
-                json_data = json.loads(data)
-                # 提取响应中的生成内容（取第一个选择的消息内容）
-                response = json_data["choices"][0]["message"]["content"]
-                # 成功获取响应后跳出循环
-                break
-            except:
+                # 熔断器打开时不发送请求，按熔断器剩余时间（半开状态下按退避时间）等待后重试
+                if not breaker.allow():
+                    rejected = True
+                    n_rejected += 1
+                    raise APIError("circuit breaker open", retry_after=breaker.retry_in() or None)
+                # 按当前速率等待发送名额（未观察到限流时不等待）
+                if pacer is not None:
+                    pacer.wait()
+                    time_start = time.time()
+                # 从连接池取得keep-alive连接，发送POST请求到聊天补全接口并读取响应数据
+                try:
+                    if stream:
+                        status, res_headers, data, usage = self._stream(pool, payload_explanation, headers, stop_when)
+                    else:
+                        status, res_headers, data = pool.request("POST", self.api_path, payload_explanation, headers)
+                except Exception as e:
+                    raise APIError(f"connection error: {e!r}")
+                if status != 200:
+                    raise APIError(f"HTTP {status}", status, parse_retry_after(res_headers.get("retry-after")))
+                # 将响应数据解析为JSON格式，提取所有选择的消息内容和token用量（部分服务不返回用量）
+                try:
+                    if stream:
+                        responses = [data]
+                    else:
+                        json_data = json.loads(data)
+                        responses = [choice["message"]["content"] for choice in json_data["choices"]]
+                        usage = json_data.get("usage")
+                    if not responses:
+                        raise ValueError("empty choices")
+                except Exception as e:
+                    raise APIError(f"invalid response: {e!r}", status)
+                breaker.record_success()
+                stats.record(attempt, time.time() - time_start, n_throttled, n_rejected)
+                if pacer is not None:
+                    pacer.record(latency=time.time() - time_start)
+                if n_throttled:
+                    usage = dict(usage or {}, throttled=n_throttled)
+                return responses, usage
+            except APIError as e:
+                if e.throttled:
+                    # 限流说明端点可用，只是需要放慢，不计入熔断器的失败次数
+                    n_throttled += 1
+                    breaker.record_throttled()
+                    if pacer is not None:
+                        pacer.record(throttled=1)
+                elif not rejected:
+                    breaker.record_failure()
                 # 如果处于调试模式，打印API调用错误信息
                 if self.debug_mode:
-                    print("Error in API. Restarting the process...")
-                # 发生异常时继续循环重试
-                continue
-        
-        # 返回从API获取的响应内容
-        return response
\ No newline at end of file
+                    print(f"Error in API ({e}). Restarting the process...")
+                # 不可重试或达到最大尝试次数时返回空列表
+                if not self.retry_policy.should_retry(attempt, e):
+                    stats.record(attempt, None, n_throttled, n_rejected)
+                    return [], None
+                time.sleep(self.retry_policy.delay(attempt, e))
+
+    # 以SSE流式方式发送请求并逐块累积生成内容，每收到完整的一行就调用stop_when判断是否可以提前结束
+    # 提前结束时剩余内容不再读取，连接直接关闭而不放回连接池
+    # 返回 (状态码, 响应头, 生成内容（出错时为响应体）, token用量)
+    def _stream(self, pool, payload, headers, stop_when=None):
+        conn, _ = pool.acquire()
+        reuse = False
+        try:
+            conn.request("POST", self.api_path, payload, headers)
+            res = conn.getresponse()
+            res_headers = {k.lower(): v for k, v in res.getheaders()}
+            if res.status != 200:
+                data = res.read()
+                reuse = not res.will_close
+                return res.status, res_headers, data, None
+
+            content = ""
+            usage = None
+            while True:
+                line = res.readline()
+                if not line:
+                    break
+                line = line.strip()
+                # 只处理 "data: ..." 事件行，忽略注释行和空行
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    res.read()
+                    reuse = not res.will_close
+                    break
+                event = json.loads(data)
+                if event.get("usage"):
+                    usage = event["usage"]
+                choices = event.get("choices") or []
+                if not choices:
+                    continue
+                delta = (choices[0].get("delta") or {}).get("content")
+                if not delta:
+                    continue
+                content += delta
+                if stop_when is not None and "\n" in delta and stop_when(content):
+                    break
+            return res.status, res_headers, content, usage
+        finally:
+            pool.release(conn, reuse=reuse)
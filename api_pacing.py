@@ -0,0 +1,112 @@
+# 导入双端队列、线程同步、进程号和计时相关的模块
+import collections
+import os
+import threading
+import time
+
+
+# 自适应请求节奏控制（AIMD）：未观察到限流时不做任何等待（快速端点和本地LLM全速运行）；
+# 出现429限流或延迟超过latency_target时，速率按decrease倍数下降（乘性减），之后每个成功请求使速率
+# 按increase（每秒增加的请求/秒）线性回升（加性增），直到max_rate。
+# 第一次限流时以最近实际发送速率为基准下降。速率单位为请求/秒，None表示不限制
+class AdaptivePacer():
+    def __init__(self, min_rate=0.05, max_rate=None, increase=0.02, decrease=0.5, latency_target=None,
+                 cooldown=2.0, window=60.0):
+        self.min_rate = min_rate  # 速率下限（请求/秒）
+        self.max_rate = max_rate  # 速率上限（请求/秒），None表示回升时不设上限
+        self.increase = increase  # 加性增：成功请求持续期间每秒增加的速率
+        self.decrease = decrease  # 乘性减：每次拥塞信号后速率乘以该系数
+        self.latency_target = latency_target  # 延迟阈值（秒），超过视为拥塞；None表示只根据限流调整
+        self.cooldown = cooldown  # 两次下降之间的最短间隔（秒），同一波并发请求的多个429只下降一次
+        self.window = window  # 估计实际发送速率的时间窗口（秒）
+        self._rate = None  # 当前速率，None表示尚未观察到限流、不做等待
+        self._next = 0.0  # 下一个请求最早可以发送的时间
+        self._last_decrease = None  # 最近一次下降的时间
+        self._sent = collections.deque()  # 窗口内的发送记录 [(时间, 请求数)]
+        self.n_throttled = 0  # 观察到的拥塞信号次数
+        self._lock = threading.Lock()
+
+    # 当前速率（请求/秒），None表示不限制
+    @property
+    def rate(self):
+        with self._lock:
+            return self._rate
+
+    # 当前速率（请求/分钟），None表示不限制
+    @property
+    def rpm(self):
+        rate = self.rate
+        return None if rate is None else rate * 60.0
+
+    # 窗口内的实际发送速率（调用方需持有锁）
+    def _observed_rate(self, now):
+        while self._sent and now - self._sent[0][0] > self.window:
+            self._sent.popleft()
+        if not self._sent:
+            return self.min_rate
+        return sum(n for _, n in self._sent) / max(now - self._sent[0][0], 1.0)
+
+    # 预约n个请求的发送名额，返回需要等待的秒数（不限制时为0）
+    def reserve(self, n=1):
+        with self._lock:
+            now = time.monotonic()
+            self._sent.append((now, n))
+            if self._rate is None:
+                return 0.0
+            start = max(now, self._next)
+            self._next = start + n / self._rate
+            return start - now
+
+    # 按当前速率等待，直到可以发送n个请求
+    def wait(self, n=1):
+        delay = self.reserve(n)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    # 记录请求结果：throttled为遇到的429次数，latency为成功请求的延迟（秒）
+    def record(self, throttled=0, latency=None):
+        congested = throttled > 0 or (
+            self.latency_target is not None and latency is not None and latency > self.latency_target)
+        with self._lock:
+            now = time.monotonic()
+            if congested:
+                self.n_throttled += 1
+                if self._last_decrease is not None and now - self._last_decrease < self.cooldown:
+                    return
+                base = self._rate if self._rate is not None else self._observed_rate(now)
+                self._rate = max(self.min_rate, base * self.decrease)
+                self._last_decrease = now
+                # 之前按较高速率预约的名额作废，从现在开始按新速率排队
+                self._next = now + 1.0 / self._rate
+            elif latency is not None and self._rate is not None:
+                self._rate += self.increase / self._rate
+                if self.max_rate is not None:
+                    self._rate = min(self._rate, self.max_rate)
+
+    # 线程锁不能被pickle，传到worker进程时重新创建
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+# 按进程、按端点共享的节奏控制器（同一进程内的所有线程共享）
+_pacers = {}
+_registry_pid = None
+_registry_lock = threading.Lock()
+
+
+def get_pacer(api_endpoint, **kwargs):
+    global _registry_pid
+    with _registry_lock:
+        if _registry_pid != os.getpid():
+            _pacers.clear()
+            _registry_pid = os.getpid()
+        if api_endpoint not in _pacers:
+            _pacers[api_endpoint] = AdaptivePacer(**kwargs)
+        return _pacers[api_endpoint]
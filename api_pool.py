@@ -0,0 +1,149 @@
+# 导入HTTP通信、进程/线程同步和时间相关的模块
+import http.client
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# 解析API端点，兼容 "api.xxx.com" 和 "http://127.0.0.1:8000" 两种写法
+# 返回 (协议, 主机, 端口, 路径前缀)
+def parse_endpoint(api_endpoint):
+    if "://" not in api_endpoint:
+        api_endpoint = "https://" + api_endpoint  # 未写协议时默认使用HTTPS（与原实现一致）
+    parts = urlsplit(api_endpoint)
+    scheme = parts.scheme.lower()
+    port = parts.port or (443 if scheme == "https" else 80)
+    return scheme, parts.hostname, port, parts.path.rstrip("/")
+
+
+# 单个端点的HTTP连接池：线程安全、keep-alive复用、空闲连接淘汰、最大连接数限制
+class ConnectionPool():
+    def __init__(self, scheme, host, port, max_size=4, idle_timeout=60, timeout=None):
+        self.scheme = scheme  # 协议（http / https）
+        self.host = host  # 主机名
+        self.port = port  # 端口
+        self.max_size = max(1, int(max_size))  # 最大连接数（空闲+使用中）
+        self.idle_timeout = idle_timeout  # 空闲连接的最长保留时间（秒）
+        self.timeout = timeout  # 单个socket操作的超时时间（秒），None表示不限制
+
+        self._idle = []  # 空闲连接栈：[(连接, 最后使用时间)]，后进先出以优先复用“热”连接
+        self._n_open = 0  # 当前已打开的连接数（空闲+使用中）
+        self._cond = threading.Condition(threading.Lock())  # 保护上述状态的条件变量
+
+    # 新建一个连接（不在锁内调用，避免阻塞其他线程）
+    def _new_connection(self):
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    # 关闭超过空闲时间的连接（调用方需持有锁）
+    def _evict_idle(self):
+        if self.idle_timeout is None:
+            return
+        now = time.monotonic()
+        alive = []
+        for conn, last_used in self._idle:
+            if now - last_used > self.idle_timeout:
+                conn.close()
+                self._n_open -= 1
+            else:
+                alive.append((conn, last_used))
+        self._idle = alive
+
+    # 取出一个连接：优先复用空闲连接，否则在未达上限时新建，达到上限则等待归还
+    # 返回 (连接, 是否为复用连接)
+    def acquire(self):
+        with self._cond:
+            while True:
+                self._evict_idle()
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                    return conn, True
+                if self._n_open < self.max_size:
+                    self._n_open += 1
+                    break
+                self._cond.wait()
+        try:
+            return self._new_connection(), False
+        except Exception:
+            with self._cond:
+                self._n_open -= 1
+                self._cond.notify()
+            raise
+
+    # 归还连接：reuse为False（出错或服务器要求关闭）时直接关闭
+    def release(self, conn, reuse=True):
+        with self._cond:
+            if reuse:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                conn.close()
+                self._n_open -= 1
+            self._cond.notify()
+
+    # 发送一次完整请求并读取全部响应，返回 (状态码, 响应头字典, 响应体)
+    # 复用的keep-alive连接可能已被服务器关闭，此时换新连接重发一次
+    def request(self, method, path, body=None, headers=None):
+        while True:
+            conn, reused = self.acquire()
+            try:
+                conn.request(method, path, body, headers or {})
+                res = conn.getresponse()
+                data = res.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.release(conn, reuse=False)
+                if reused:
+                    continue
+                raise
+            except Exception:
+                self.release(conn, reuse=False)
+                raise
+            self.release(conn, reuse=not res.will_close)
+            return res.status, {k.lower(): v for k, v in res.getheaders()}, data
+
+    # 多个调用方共享同一个连接池、设置不同时取较宽松的值（None表示不限制）；连接数上限提高时唤醒等待连接的线程，
+    # 新的超时时间只作用于之后新建的连接
+    def widen(self, max_size, idle_timeout, timeout):
+        with self._cond:
+            if int(max_size) > self.max_size:
+                self.max_size = int(max_size)
+                self._cond.notify_all()
+            if self.idle_timeout is not None and (idle_timeout is None or idle_timeout > self.idle_timeout):
+                self.idle_timeout = idle_timeout
+            if self.timeout is not None and (timeout is None or timeout > self.timeout):
+                self.timeout = timeout
+
+    # 关闭所有空闲连接
+    def close(self):
+        with self._cond:
+            for conn, _ in self._idle:
+                conn.close()
+                self._n_open -= 1
+            self._idle = []
+            self._cond.notify_all()
+
+
+# 按进程维护的连接池注册表：同一进程内所有InterfaceAPI共享同一端点的连接池
+# fork出的子进程（如joblib worker）不能复用父进程的socket，因此进程号变化时清空
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+# 获取（或创建）某个端点的连接池
+def get_pool(api_endpoint, max_size=4, idle_timeout=60, timeout=None):
+    global _pools_pid
+    scheme, host, port, _ = parse_endpoint(api_endpoint)
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        key = (scheme, host, port)
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(scheme, host, port, max_size, idle_timeout, timeout)
+            _pools[key] = pool
+        else:
+            pool.widen(max_size, idle_timeout, timeout)
+        return pool
@@ -0,0 +1,187 @@
+# 导入随机数、线程同步、时间和HTTP日期解析相关的模块
+import collections
+import email.utils
+import os
+import random
+import threading
+import time
+
+import numpy as np
+
+
+# LLM API调用错误：status为HTTP状态码（网络错误或响应格式错误时为None），
+# retry_after为服务器要求（或熔断器建议）的等待秒数
+class APIError(Exception):
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    # 是否值得重试：网络/格式错误、超时、限流和服务器错误可重试，其他4xx（如密钥错误）不重试
+    @property
+    def retryable(self):
+        return self.status is None or self.status in (408, 409, 429) or self.status >= 500
+
+    # 是否为限流响应
+    @property
+    def throttled(self):
+        return self.status == 429
+
+
+# 解析Retry-After响应头（秒数或HTTP日期），返回等待秒数；无法解析时返回None
+def parse_retry_after(value):
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# 重试策略：指数退避 + 完全抖动（full jitter），优先遵循服务器给出的Retry-After
+class RetryPolicy():
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=60.0, max_retry_after=300.0):
+        self.max_attempts = max_attempts  # 最大尝试次数（含第一次）
+        self.base_delay = base_delay  # 退避的基础时间（秒）
+        self.max_delay = max_delay  # 单次退避的上限（秒）
+        self.max_retry_after = max_retry_after  # 对Retry-After的最长等待（秒）
+
+    # 第attempt次尝试失败后是否继续重试
+    def should_retry(self, attempt, error):
+        return attempt < self.max_attempts and error.retryable
+
+    # 第attempt次尝试失败后的等待时间
+    def delay(self, attempt, error=None):
+        if error is not None and error.retry_after is not None:
+            return min(error.retry_after, self.max_retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+# 熔断器：连续失败达到阈值后“打开”，在reset_timeout内拒绝请求；
+# 之后进入“半开”状态放行一个探测请求，成功或限流（端点可用）则关闭，失败则再次打开；
+# 探测请求在reset_timeout内没有任何结果（如意外异常）时放行下一个探测请求
+class CircuitBreaker():
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold  # 连续失败阈值
+        self.reset_timeout = reset_timeout  # 打开状态持续时间（秒）
+        self.state = 'closed'  # 'closed' / 'open' / 'half_open'
+        self.n_failures = 0  # 连续失败次数
+        self.opened_at = 0.0  # 最近一次打开的时间
+        self.probe_at = 0.0  # 最近一次放行探测请求的时间
+        self._lock = threading.Lock()
+
+    # 是否放行当前请求
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            now = time.monotonic()
+            if (self.state == 'open' and now - self.opened_at >= self.reset_timeout) or \
+                    (self.state == 'half_open' and now - self.probe_at >= self.reset_timeout):
+                self.state = 'half_open'  # 放行一个探测请求，其余请求继续等待
+                self.probe_at = now
+                return True
+            return False
+
+    # 距离下一次允许探测的剩余时间（秒）
+    def retry_in(self):
+        with self._lock:
+            if self.state == 'closed':
+                return 0.0
+            since = self.probe_at if self.state == 'half_open' else self.opened_at
+            return max(0.0, self.reset_timeout - (time.monotonic() - since))
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.n_failures = 0
+
+    # 限流说明端点可用：不计入连续失败次数，半开状态的探测请求被限流时关闭熔断器
+    def record_throttled(self):
+        with self._lock:
+            if self.state == 'half_open':
+                self.state = 'closed'
+                self.n_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.n_failures += 1
+            if self.state == 'half_open' or self.n_failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+# 重试和延迟统计：请求数、尝试次数、重试次数、限流次数、失败次数和成功请求的延迟分位数
+class RetryStats():
+    def __init__(self, max_samples=1000):
+        self.n_requests = 0  # 调用次数
+        self.n_attempts = 0  # HTTP尝试次数
+        self.n_retries = 0  # 重试次数
+        self.n_throttled = 0  # 429限流次数
+        self.n_rejected = 0  # 被熔断器拒绝的次数
+        self.n_failures = 0  # 最终失败的调用次数
+        self.latencies = collections.deque(maxlen=max_samples)  # 最近成功调用的延迟（秒）
+        self._lock = threading.Lock()
+
+    def record(self, attempts, latency=None, throttled=0, rejected=0):
+        with self._lock:
+            self.n_requests += 1
+            self.n_attempts += attempts
+            self.n_retries += attempts - 1
+            self.n_throttled += throttled
+            self.n_rejected += rejected
+            if latency is None:
+                self.n_failures += 1
+            else:
+                self.latencies.append(latency)
+
+    # 返回统计摘要字典
+    def summary(self):
+        with self._lock:
+            out = {
+                'requests': self.n_requests,
+                'attempts': self.n_attempts,
+                'retries': self.n_retries,
+                'throttled': self.n_throttled,
+                'rejected': self.n_rejected,
+                'failures': self.n_failures,
+            }
+            if self.latencies:
+                p50, p90, p99 = np.percentile(list(self.latencies), [50, 90, 99])
+                out.update({'latency_p50': float(p50), 'latency_p90': float(p90), 'latency_p99': float(p99)})
+            return out
+
+
+# 按进程、按端点共享的熔断器和统计对象（同一进程内的所有线程共享）
+_breakers = {}
+_stats = {}
+_registry_pid = None
+_registry_lock = threading.Lock()
+
+
+def _check_pid():
+    global _registry_pid
+    if _registry_pid != os.getpid():
+        _breakers.clear()
+        _stats.clear()
+        _registry_pid = os.getpid()
+
+
+def get_breaker(api_endpoint, failure_threshold=5, reset_timeout=30.0):
+    with _registry_lock:
+        _check_pid()
+        if api_endpoint not in _breakers:
+            _breakers[api_endpoint] = CircuitBreaker(failure_threshold, reset_timeout)
+        return _breakers[api_endpoint]
+
+
+def get_stats(api_endpoint):
+    with _registry_lock:
+        _check_pid()
+        if api_endpoint not in _stats:
+            _stats[api_endpoint] = RetryStats()
+        return _stats[api_endpoint]
@@ -0,0 +1,139 @@
+import ast
+import functools
+import hashlib
+
+
+def _is_docstring(node):
+    return isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+
+
+# names bound inside a top-level function (assignments, loop/with/except targets,
+# comprehension variables, nested defs, local imports, parameters of nested functions),
+# in source order; the function's own parameters are kept since callers may pass them by keyword
+class _LocalNames(ast.NodeVisitor):
+
+    def __init__(self):
+        self.names = []
+        self.declared = set()
+
+    def _add(self, name):
+        if name not in self.names:
+            self.names.append(name)
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, (ast.Store, ast.Del)):
+            self._add(node.id)
+
+    def visit_Global(self, node):
+        self.declared.update(node.names)
+
+    visit_Nonlocal = visit_Global
+
+    def visit_FunctionDef(self, node):
+        self._add(node.name)
+        for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs:
+            self._add(arg.arg)
+        for arg in (node.args.vararg, node.args.kwarg):
+            if arg is not None:
+                self._add(arg.arg)
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node):
+        for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs:
+            self._add(arg.arg)
+        self.generic_visit(node)
+
+    def visit_ExceptHandler(self, node):
+        if node.name:
+            self._add(node.name)
+        self.generic_visit(node)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self._add(alias.asname or alias.name.split(".")[0])
+
+    visit_ImportFrom = visit_Import
+
+
+class _Renamer(ast.NodeTransformer):
+
+    def __init__(self, mapping):
+        self.mapping = mapping
+
+    def _rename(self, name):
+        return self.mapping.get(name, name)
+
+    def visit_Name(self, node):
+        node.id = self._rename(node.id)
+        return node
+
+    def visit_arg(self, node):
+        node.arg = self._rename(node.arg)
+        node.annotation = None
+        return node
+
+    def visit_FunctionDef(self, node):
+        node.name = self._rename(node.name)
+        node.returns = None
+        return self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ExceptHandler(self, node):
+        if node.name:
+            node.name = self._rename(node.name)
+        return self.generic_visit(node)
+
+    def visit_alias(self, node):
+        bound = node.asname or node.name.split(".")[0]
+        if bound in self.mapping:
+            node.asname = self.mapping[bound]
+        return node
+
+
+def _strip_docstrings(body):
+    body = [node for i, node in enumerate(body) if not (i == 0 and _is_docstring(node))]
+    for node in body:
+        for child in ast.walk(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and child.body and _is_docstring(child.body[0]):
+                child.body = child.body[1:] or [ast.Pass()]
+    return body
+
+
+def _rename_locals(func):
+    collector = _LocalNames()
+    for node in func.body:
+        collector.visit(node)
+    params = {arg.arg for arg in func.args.posonlyargs + func.args.args + func.args.kwonlyargs}
+    names = [n for n in collector.names if n not in collector.declared and n not in params and n != func.name]
+    mapping = {name: "_v" + str(i) for i, name in enumerate(names)}
+    func.body = [_Renamer(mapping).visit(node) for node in func.body]
+
+
+# canonical source of the code: docstrings (and other top-level string literals), comments and
+# annotations removed, locals of top-level functions renamed in order of first binding,
+# and constants/layout as printed by ast.unparse; None if the code does not parse
+def normalize_code(code):
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+    tree.body = [node for node in _strip_docstrings(tree.body) if not _is_docstring(node)]
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            _rename_locals(node)
+    return ast.unparse(ast.fix_missing_locations(tree))
+
+
+# sha256 of the normalised code (of the stripped, non-blank lines if it does not parse);
+# heuristics with the same fingerprint evaluate to the same objective
+@functools.lru_cache(maxsize=4096)
+def code_fingerprint(code):
+    if code is None:
+        return None
+    canonical = normalize_code(code)
+    if canonical is None:
+        canonical = "\n".join(line.rstrip() for line in code.splitlines() if line.strip())
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -0,0 +1,122 @@
+import ast
+import re
+
+
+_block_pattern = re.compile(r"<{5,}\s*SEARCH[^\n]*\n(.*?)\n?={5,}[^\n]*\n(.*?)\n?>{5,}\s*REPLACE", re.DOTALL)
+_hunk_pattern = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+_number_pattern = re.compile(r"^\s*\d+\| ?")
+
+
+def number_lines(code):
+    lines = code.splitlines()
+    width = len(str(len(lines)))
+    return "\n".join(str(i).rjust(width) + "| " + line for i, line in enumerate(lines, 1))
+
+
+# line numbers the model copied from the numbered parent are dropped if every line has one
+def _strip_numbers(lines):
+    if lines and all(_number_pattern.match(line) for line in lines if line.strip()):
+        return [_number_pattern.sub("", line, count=1) for line in lines]
+    return lines
+
+
+# index of `old` in `lines`, comparing exactly, then ignoring trailing and finally all
+# surrounding whitespace; the match closest to `hint` wins
+def _find(lines, old, hint=0):
+    if not old:
+        return None
+    for norm in (lambda s: s, str.rstrip, str.strip):
+        target = [norm(line) for line in old]
+        starts = [i for i in range(len(lines) - len(old) + 1)
+                  if [norm(line) for line in lines[i:i + len(old)]] == target]
+        if starts:
+            return min(starts, key=lambda i: abs(i - hint))
+    return None
+
+
+def _apply_blocks(lines, blocks):
+    for search, replace in blocks:
+        old = _strip_numbers(search.splitlines())
+        start = _find(lines, old)
+        if start is None:
+            return None
+        lines = lines[:start] + _strip_numbers(replace.splitlines()) + lines[start + len(old):]
+    return lines
+
+
+def _parse_hunks(text):
+    hunks = []
+    hunk = None
+    for line in text.splitlines():
+        match = _hunk_pattern.match(line)
+        if match:
+            hunk = (int(match.group(1)) - 1, [], [])
+            hunks.append(hunk)
+        elif hunk is None:
+            continue
+        elif line.startswith("-"):
+            hunk[1].append(line[1:])
+        elif line.startswith("+"):
+            hunk[2].append(line[1:])
+        elif line.startswith(" ") or line == "":
+            hunk[1].append(line[1:])
+            hunk[2].append(line[1:])
+        elif line.startswith("\\"):
+            continue
+        else:
+            hunk = None
+    return hunks
+
+
+def _apply_hunks(lines, hunks):
+    # hunks are applied bottom-up so earlier line numbers stay valid
+    for hint, old, new in sorted(hunks, key=lambda h: h[0], reverse=True):
+        while old and new and old[-1] == "" and new[-1] == "":
+            old, new = old[:-1], new[:-1]
+        if not old:
+            lines = lines[:hint] + new + lines[hint:]
+            continue
+        start = _find(lines, old, hint)
+        if start is None:
+            return None
+        lines = lines[:start] + new + lines[start + len(old):]
+    return lines
+
+
+def is_valid(code, func_name):
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+    return any(isinstance(node, ast.FunctionDef) and node.name == func_name for node in ast.walk(tree))
+
+
+# Applies the SEARCH/REPLACE blocks or unified diff in `response` to `code`. Returns
+# [patched code, description] or None if there is no patch, it does not apply, or the
+# result is not valid Python defining func_name.
+def apply_patch(code, response, func_name):
+    if response is None:
+        return None
+
+    lines = code.splitlines()
+    blocks = _block_pattern.findall(response)
+    if blocks:
+        head = response[:_block_pattern.search(response).start()]
+        patched = _apply_blocks(lines, blocks)
+    else:
+        hunks = _parse_hunks(response)
+        if not hunks:
+            return None
+        head = response[:response.find("@@")]
+        patched = _apply_hunks(lines, hunks)
+    if patched is None:
+        return None
+
+    algorithm = re.findall(r"\{(.*)\}", head, re.DOTALL)
+    if len(algorithm) == 0:
+        return None
+
+    patched_code = "\n".join(patched)
+    if patched_code == code.rstrip("\n") or not is_valid(patched_code, func_name):
+        return None
+    return [patched_code, algorithm[0]]
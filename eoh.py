@@ -1,9 +1,12 @@
 import numpy as np
 import json
 import random
+import os
 import time
 
 from .eoh_interface_EC import InterfaceEC
+from .eoh_metrics import save_generation_metrics
+from .eoh_checkpoint import EventLog, read_events, replay, truncate_log
 # main class for eoh (Evolutionary Optimization with Heuristics，启发式进化优化算法)
 class EOH:
 
@@ -13,6 +16,9 @@ class EOH:
         self.prob = problem  # 问题定义接口（用于评估算法性能）
         self.select = select  # 选择策略（用于从种群中选择父代个体）
         self.manage = manage  # 种群管理策略（用于控制种群规模和筛选优质个体）
+        # 问题接口支持时按设置开启浮点数makespan（目标值与原实现不同，需显式开启）
+        if paras.eva_float_makespan and hasattr(problem, 'float_makespan'):
+            problem.float_makespan = True
         
         # LLM（大语言模型）配置
         self.use_local_llm = paras.llm_use_local  # 是否使用本地LLM
@@ -20,6 +26,42 @@ class EOH:
         self.api_endpoint = paras.llm_api_endpoint  # 远程API端点（目前前仅支持API2D + GPT）
         self.api_key = paras.llm_api_key  # API密钥
         self.llm_model = paras.llm_model  # LLM模型名称
+        # 透传给LLM接口的其他设置（连接池等）
+        self.llm_kwargs = {
+            'llm_pool_size': paras.llm_pool_size,
+            'llm_pool_idle_timeout': paras.llm_pool_idle_timeout,
+            'llm_max_attempts': paras.llm_max_attempts,
+            'llm_backoff_base': paras.llm_backoff_base,
+            'llm_backoff_max': paras.llm_backoff_max,
+            'llm_breaker_threshold': paras.llm_breaker_threshold,
+            'llm_breaker_reset': paras.llm_breaker_reset,
+            'llm_stream': paras.llm_stream,
+            'llm_batch_samples': paras.llm_batch_samples,
+            'llm_async': paras.llm_async,
+            'llm_max_in_flight': paras.llm_max_in_flight,
+            'llm_rpm': paras.llm_rpm,
+            'llm_tpm': paras.llm_tpm,
+            'llm_pacing': paras.llm_pacing,
+            'llm_pacing_max_rpm': paras.llm_pacing_max_rpm,
+            'llm_pacing_latency': paras.llm_pacing_latency,
+            'llm_cache_mode': paras.llm_cache_mode,
+            'llm_cache_path': paras.llm_cache_path or paras.exp_output_path + "/results/llm_cache.sqlite",
+            'llm_cache_max_mb': paras.llm_cache_max_mb,
+            'llm_health_ttl': paras.llm_health_ttl,
+            'llm_health_path': paras.llm_health_path or paras.exp_output_path + "/results/llm_health.json",
+            'llm_prompt_budget': paras.llm_prompt_budget,
+            'ec_patch_mutation': paras.ec_patch_mutation,
+            'ec_speculative_k': paras.ec_speculative_k,
+            'eva_process_pool': paras.eva_process_pool,
+            'eva_cpu_limit': paras.eva_cpu_limit,
+            'eva_mem_limit_mb': paras.eva_mem_limit_mb,
+            'eva_race': paras.eva_race,
+            'eva_race_confidence': paras.eva_race_confidence,
+            'eva_fitness_store': paras.eva_fitness_store,
+            'eva_fitness_store_path': paras.eva_fitness_store_path or paras.exp_output_path + "/results/fitness.sqlite",
+            'eva_fitness_store_max_mb': paras.eva_fitness_store_max_mb,
+        }
+        self.llm_async = paras.llm_async  # 是否将一代内所有算子的LLM请求一起并发发送
 
         # ------------------ 本地注释本地LLM的备用配置（已注释） ------------------
         # self.use_local_llm = kwargs.get('use_local_llm', False)
@@ -54,6 +96,14 @@ class EOH:
 
         self.output_path = paras.exp_output_path  # 结果输出目录路径
 
+        # 事件日志：逐个记录生成的子代（只追加，批量fsync），崩溃后可重放到失败点继续运行
+        self.use_event_log = paras.exp_event_log  # 是否记录事件日志
+        self.event_log_path = self.output_path + "/results/events.jsonl"  # 事件日志路径
+        self.event_log_fsync = paras.exp_event_log_fsync  # 每多少个事件fsync一次
+        self.resume = paras.exp_resume  # 是否从事件日志续跑（日志不存在或没有初始种群时重新开始）
+        self.snapshots = paras.exp_snapshots  # 是否在每代结束时写出种群快照文件（可由事件日志重新导出）
+        self.event_log = None
+
         self.exp_n_proc = paras.exp_n_proc  # 并行进程数（用于加速算法评估）
         self.timeout = paras.eva_timeout  # 算法评估超时时间
         self.use_numba = paras.eva_numba_decorator  # 是否使用numba装饰器加速代码执行
@@ -75,25 +125,24 @@ class EOH:
             population.append(off)
     
 
-    # 运行EOH算法的主方法
-    def run(self):
-        print("- 进化过程开始 -")
-        time_start = time.time()  # 记录开始时间
-
+    # 创建进化算子接口（连接LLM、评估器和选择策略）
+    def _get_interface_ec(self):
         # 评估接口（绑定具体问题）
         interface_prob = self.prob
 
-        # 初始化进化算子接口（连接LLM、评估器和选择策略）
         interface_ec = InterfaceEC(
             self.pop_size, self.m, 
             self.api_endpoint, self.api_key, self.llm_model, 
             self.use_local_llm, self.llm_local_url,
             self.debug_mode, interface_prob, 
             select=self.select, n_p=self.exp_n_proc,
-            timeout=self.timeout, use_numba=self.use_numba
+            timeout=self.timeout, use_numba=self.use_numba,
+            **self.llm_kwargs
         )
+        return interface_ec
 
-        # 初始化种群
+    # 初始化种群（种子文件、断点续跑或全新生成），返回 (种群, 起始代数)
+    def _init_population(self, interface_ec, time_start):
         population = []
         if self.use_seed:
             # 从种子文件加载初始种群
@@ -102,9 +151,10 @@ class EOH:
             # 基于种子数据生成种群（包含算法描述、代码和评估结果）
             population = interface_ec.population_generation_seed(data, self.exp_n_proc)
             # 保存初始种群
-            filename = self.output_path + "/results/pops/population_generation_0.json"
-            with open(filename, 'w') as f:
-                json.dump(population, f, indent=5)
+            if self.snapshots:
+                filename = self.output_path + "/results/pops/population_generation_0.json"
+                with open(filename, 'w') as f:
+                    json.dump(population, f, indent=5)
             n_start = 0  # 起始代数为0
         else:
             if self.load_pop:  # 从已有种群文件加载（断点续跑）
@@ -119,6 +169,8 @@ class EOH:
                 print("创建初始种群中：")
                 # 调用进化算子接口生成初始种群（使用i1算子）
                 population = interface_ec.population_generation()
+                # 保存初始种群生成过程的算子度量
+                save_generation_metrics(self.output_path, 0, population, time.time() - time_start)
                 # 裁剪种群至设定规模
                 population = self.manage.population_management(population, self.pop_size)
                 
@@ -129,23 +181,139 @@ class EOH:
                 print()
                 print("初始种群创建完成！")
                 # 保存初始种群
-                filename = self.output_path + "/results/pops/population_generation_0.json"
-                with open(filename, 'w') as f:
-                    json.dump(population, f, indent=5)
+                if self.snapshots:
+                    filename = self.output_path + "/results/pops/population_generation_0.json"
+                    with open(filename, 'w') as f:
+                        json.dump(population, f, indent=5)
                 n_start = 0  # 起始代数为0
 
+        # 初始种群（包括续跑时加载的种群）加入评估历史，等价代码不再重复评估
+        interface_ec.remember(population)
+        self._log_event(dict({'event': 'init', 'generation': n_start, 'population': population}, **self._init_progress(n_start)), sync=True)
+        return population, n_start
+
+    # 记录在init事件中的起始进度（分代版本不需要；稳态版本记录已插入和已完成的子代数）
+    def _init_progress(self, n_start):
+        return {}
+
+    # 打开事件日志：续跑时重放已有日志并返回重建的状态（见eoh_checkpoint.replay），否则新建日志并返回None
+    def _open_event_log(self, interface_ec):
+        if not self.use_event_log:
+            return None
+        state = None
+        if self.resume and os.path.exists(self.event_log_path):
+            events, size = read_events(self.event_log_path)
+            state = replay(events, self.add2pop, self.manage, self.pop_size)
+            if state is not None:
+                truncate_log(self.event_log_path, size)  # 去掉崩溃时写了一半的事件
+                interface_ec.remember(state['population'] + state['offsprings'])  # 恢复评估历史
+                print(f"从事件日志续跑：第 {state['generation'] + 1} 代，已记录 {len(state['offsprings'])} 个子代")
+        self.event_log = EventLog(self.event_log_path, self.event_log_fsync, append=state is not None)
+        if self.event_log.rotated:
+            print(f"已有的事件日志保留为 {self.event_log.rotated}（改回原名后可用exp_resume从中续跑）")
+        return state
+
+    # 追加一个事件（未启用事件日志时忽略）
+    def _log_event(self, event, sync=False):
+        if self.event_log is not None:
+            self.event_log.append(event, sync)
+
+    def _close_event_log(self):
+        if self.event_log is not None:
+            self.event_log.close()
+            self.event_log = None
+
+    # 由事件日志重新导出每代的种群快照文件（pops和pops_best），返回导出的代数列表
+    def export_snapshots(self):
+        events, _ = read_events(self.event_log_path)
+        state = replay(events, self.add2pop, self.manage, self.pop_size)
+        if state is None:
+            return []
+        for k, population in sorted(state['snapshots'].items()):
+            self._save_population(population, k)
+        for k, progress in state['progress'].items():
+            self._save_progress(progress, k)
+        return sorted(state['snapshots'])
+
+    # 保存第k代（稳态模式下为第k个检查点）的完整种群和最优个体
+    def _save_population(self, population, k):
+        # 保存完整种群
+        filename = self.output_path + "/results/pops/population_generation_" + str(k) + ".json"
+        with open(filename, 'w') as f:
+            json.dump(population, f, indent=5)
+
+        # 保存最优个体（默认种群已按适应度排序，第一个为最优）
+        filename = self.output_path + "/results/pops_best/population_generation_" + str(k) + ".json"
+        with open(filename, 'w') as f:
+            json.dump(population[0], f, indent=5)
+
+    # 保存稳态模式第k个检查点的进度（实际插入和完成的子代数），与种群快照放在一起，用exp_continue_*续跑时读取
+    def _save_progress(self, progress, k):
+        filename = self.output_path + "/results/pops/progress_" + str(k) + ".json"
+        with open(filename, 'w') as f:
+            json.dump(progress, f, indent=5)
+
+    # 运行EOH算法的主方法
+    def run(self):
+        print("- 进化过程开始 -")
+        time_start = time.time()  # 记录开始时间
+
+        # 初始化进化算子接口和种群（从事件日志续跑时由日志重建种群和本代进度）
+        interface_ec = self._get_interface_ec()
+        resume = self._open_event_log(interface_ec)
+        if resume is None:
+            population, n_start = self._init_population(interface_ec, time_start)
+        else:
+            population, n_start = resume['population'], resume['generation']
+
         # 进化主循环（迭代n_pop代）
         n_op = len(self.operators)  # 算子数量
         for pop in range(n_start, self.n_pop):  
+            time_generation = time.time()  # 本代开始时间
+            # 续跑的代：沿用日志中的算子选择，跳过已完成的算子，已生成的子代不再重新生成
+            resumed = resume if resume is not None and pop == n_start else None
+            i_start = resumed['operator'] if resumed else 0  # 本代第一个要执行的算子
+            selected = dict(resumed['selected']) if resumed else {}  # 算子序号 -> 本代是否执行
+            pending = resumed['pending'] if resumed else {}  # 算子序号 -> 崩溃前已生成的子代
+            generation_offsprings = list(resumed['generation_offsprings']) if resumed else []  # 本代生成的全部子代（用于统计算子度量）
+
+            # 根据权重随机决定每个算子本代是否执行，并记录到日志
+            for i in range(i_start, n_op):
+                if i not in selected:
+                    selected[i] = bool(np.random.rand() < self.operator_weights[i])
+                    self._log_event({'event': 'operator', 'generation': pop, 'index': i,
+                                     'operator': self.operators[i], 'selected': selected[i]})
+
+            # 每个子代生成后立即写入日志
+            def log_offspring(i):
+                return lambda tag, p, off: self._log_event({'event': 'offspring', 'generation': pop, 'index': i, 'offspring': off})
+
+            # 还需生成的子代数量（扣除崩溃前已生成的）
+            def n_needed(i):
+                return max(0, self.pop_size - len(pending.get(i, [])))
+
+            # 并发模式：本代执行的算子的全部LLM请求一起发送
+            batch = {}
+            if self.llm_async:
+                todo = [i for i in range(i_start, n_op) if selected[i] and n_needed(i) > 0]
+                results = interface_ec.get_algorithms(population, [self.operators[i] for i in todo],
+                                                      [n_needed(i) for i in todo],
+                                                      lambda k, p, off: log_offspring(todo[k])(k, p, off))
+                batch = dict(zip(todo, results))
             # 遍历所有进化算子
-            for i in range(n_op):
+            for i in range(i_start, n_op):
                 op = self.operators[i]  # 当前算子（如e1, m1）
                 print(f" 算子: {op}, [{i + 1} / {n_op}] ", end="|") 
-                op_w = self.operator_weights[i]  # 算子选择权重
-                # 根据权重随机决定是否执行当前算子
-                if (np.random.rand() < op_w):
-                    # 调用算子生成父代和子代（父代通过选择策略从种群中选出）
-                    parents, offsprings = interface_ec.get_algorithm(population, op)
+                offsprings = list(pending.get(i, []))  # 崩溃前已生成的子代
+                # 执行被选中的算子（父代通过选择策略从种群中选出）
+                if selected[i] and n_needed(i) > 0:
+                    if self.llm_async:
+                        # 取出并发批次中属于当前算子的结果
+                        parents, new_offsprings = batch.get(i, ([], []))
+                    else:
+                        parents, new_offsprings = interface_ec.get_algorithm(population, op, n_needed(i), log_offspring(i))
+                    offsprings += new_offsprings
+                    generation_offsprings += new_offsprings
                 # 将子代添加到种群
                 self.add2pop(population, offsprings)
                 # 打印子代的目标值
@@ -154,21 +322,22 @@ class EOH:
                 # 裁剪种群至设定规模（保留适应度更高的个体）
                 size_act = min(len(population), self.pop_size)
                 population = self.manage.population_management(population, size_act)
+                self._log_event({'event': 'operator_end', 'generation': pop, 'index': i})
                 print()
 
-            # 保存当前代的完整种群
-            filename = self.output_path + "/results/pops/population_generation_" + str(pop + 1) + ".json"
-            with open(filename, 'w') as f:
-                json.dump(population, f, indent=5)
+            # 保存当前代各算子的延迟、token、重试、重复、评估失败和改进量统计
+            save_generation_metrics(self.output_path, pop + 1, generation_offsprings, time.time() - time_generation)
+            self._log_event({'event': 'generation_end', 'generation': pop + 1}, sync=True)
 
-            # 保存当前代的最优个体（默认种群已按适应度排序，第一个为最优）
-            filename = self.output_path + "/results/pops_best/population_generation_" + str(pop + 1) + ".json"
-            with open(filename, 'w') as f:
-                json.dump(population[0], f, indent=5)
+            # 保存当前代的完整种群和最优个体（可选，也可以之后由事件日志导出）
+            if self.snapshots:
+                self._save_population(population, pop + 1)
 
             # 打印当前代的统计信息
             print(f"--- 第 {pop + 1}/{self.n_pop} 代完成，耗时: {((time.time()-time_start)/60):.1f} 分钟")
             print("种群目标值: ", end=" ")
             for i in range(len(population)):
                 print(str(population[i]['objective']) + " ", end="")
-            print()
\ No newline at end of file
+            print()
+
+        self._close_event_log()
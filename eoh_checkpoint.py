@@ -0,0 +1,152 @@
+# 导入JSON、文件系统和计时相关的模块
+import json
+import os
+import time
+
+
+# 事件日志中的numpy数值和数组转换为JSON可表示的值
+def _to_json(value):
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+# 只追加的事件日志（JSONL）：每个事件写一行并立即flush（进程崩溃不丢失），
+# 每fsync_every个事件或每fsync_interval秒fsync一次（断电时最多丢失最后一批事件）。
+# 不追加时已有的非空日志不会被覆盖，而是改名为 path.1、path.2 ...（第一个未使用的编号）保留
+class EventLog():
+    def __init__(self, path, fsync_every=16, fsync_interval=5.0, append=False):
+        self.path = path  # 日志文件路径
+        self.fsync_every = fsync_every  # 每多少个事件fsync一次
+        self.fsync_interval = fsync_interval  # 最长多少秒fsync一次
+        self.rotated = None  # 被保留的旧日志路径（没有旧日志时为None）
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not append and os.path.exists(path) and os.path.getsize(path):
+            self.rotated = rotate_log(path)
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self._n_unsynced = 0  # 尚未fsync的事件数
+        self._synced = time.monotonic()  # 上次fsync的时间
+
+    # 追加一个事件；sync=True时立即fsync（如每代结束时）
+    def append(self, event, sync=False):
+        self._file.write(json.dumps(event, default=_to_json) + "\n")
+        self._file.flush()
+        self._n_unsynced += 1
+        if sync or self._n_unsynced >= self.fsync_every or time.monotonic() - self._synced >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        if self._n_unsynced:
+            os.fsync(self._file.fileno())
+            self._n_unsynced = 0
+        self._synced = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+
+# 把已有的日志改名为第一个未使用的 path.i，返回新路径
+def rotate_log(path):
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        i += 1
+    os.replace(path, f"{path}.{i}")
+    return f"{path}.{i}"
+
+
+# 读取事件日志，返回 (事件列表, 完整事件的字节长度)；崩溃时写了一半的最后一行被忽略
+def read_events(path):
+    events = []
+    size = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                break
+            size += len(line)
+    return events, size
+
+
+# 截掉日志末尾不完整的事件，之后可以安全地继续追加
+def truncate_log(path, size):
+    with open(path, 'r+b') as f:
+        f.truncate(size)
+
+
+# 重放事件日志，重建崩溃时的状态。事件类型：
+#   init           初始种群 {'generation': 起始代数, 'population': [...]}
+#   operator       某代第index个算子是否执行 {'generation', 'index', 'operator', 'selected'}
+#   offspring      生成的一个子代；分代模式带 {'generation', 'index'}，在operator_end时加入种群；
+#                  稳态模式不带index，有效子代立即加入种群
+#   failed         稳态模式的一个子代任务失败（没有子代） {'operator'}
+#   operator_end   某代第index个算子的子代已加入种群并完成裁剪 {'generation', 'index'}
+#   generation_end 第generation代完成 {'generation'}
+#   checkpoint     稳态模式的第k个检查点 {'k', 'progress'}，progress为此时的 {'n_inserted', 'n_completed'}
+# add2pop和manage与运行时相同（种群管理是确定性的），因此重放得到的种群与崩溃前完全一致。
+# 返回状态字典，没有init事件时返回None：
+#   population 当前种群；generation 当前（未完成的）代；operator 该代中下一个要执行的算子序号；
+#   selected 该代已记录的算子选择；pending 已开始但未完成的算子已生成的子代；
+#   generation_offsprings 该代已生成的全部子代；offsprings 日志中的全部子代；
+#   snapshots 每代结束（稳态模式为每个检查点）时的种群；progress 稳态模式每个检查点的进度；
+#   n_inserted/n_completed 稳态模式已插入种群的有效子代数/已完成的子代任务数（包括init事件中记录的起始进度）；
+#   n_checkpointed 稳态模式最近一个检查点（或起始）时的插入数；
+#   window 稳态模式上一个检查点之后的子代
+def replay(events, add2pop, manage, pop_size):
+    state = None
+    for event in events:
+        kind = event['event']
+        if kind == 'init':
+            state = {
+                'population': event['population'], 'generation': event['generation'], 'operator': 0,
+                'selected': {}, 'pending': {}, 'generation_offsprings': [], 'offsprings': [],
+                'snapshots': {}, 'progress': {}, 'window': [],
+                'n_inserted': event.get('n_inserted', 0), 'n_completed': event.get('n_completed', 0),
+                'n_checkpointed': event.get('n_inserted', 0),
+            }
+            state['snapshots'][event['generation']] = list(event['population'])
+            continue
+        if state is None:
+            continue
+        if kind == 'operator':
+            state['selected'][event['index']] = event['selected']
+            state['pending'].setdefault(event['index'], [])
+        elif kind == 'offspring':
+            off = event['offspring']
+            state['offsprings'].append(off)
+            if 'index' in event:
+                state['pending'].setdefault(event['index'], []).append(off)
+                state['generation_offsprings'].append(off)
+            else:
+                state['window'].append(off)
+                state['n_completed'] += 1
+                if off['objective'] is not None:
+                    add2pop(state['population'], [off])
+                    state['population'] = manage.population_management(state['population'], min(len(state['population']), pop_size))
+                    state['n_inserted'] += 1
+        elif kind == 'failed':
+            state['n_completed'] += 1
+        elif kind == 'operator_end':
+            add2pop(state['population'], state['pending'].pop(event['index'], []))
+            state['population'] = manage.population_management(state['population'], min(len(state['population']), pop_size))
+            state['operator'] = event['index'] + 1
+        elif kind == 'generation_end':
+            state['generation'] = event['generation']
+            state['operator'] = 0
+            state['selected'] = {}
+            state['pending'] = {}
+            state['generation_offsprings'] = []
+            state['snapshots'][event['generation']] = list(state['population'])
+        elif kind == 'checkpoint':
+            state['window'] = []
+            state['n_checkpointed'] = state['n_inserted']
+            state['snapshots'][event['k']] = list(state['population'])
+            if 'progress' in event:
+                state['progress'][event['k']] = event['progress']
+    return state
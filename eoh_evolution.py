@@ -1,6 +1,9 @@
-import re
 import time
 from ...llm.interface_LLM import InterfaceLLM
+from .stream_extractor import StreamExtractor
+from .response_parser import ResponseParser
+from .prompt_builder import PromptBuilder, compact_code
+from .code_patch import number_lines, apply_patch
 
 class Evolution():
 
@@ -24,6 +27,19 @@ class Evolution():
         else:
             self.joined_outputs = "'" + self.prompt_func_outputs[0] + "'"
 
+        # with a token budget, prompts are compacted and laid out with a stable prefix
+        self.prompt_builder = None
+        if kwargs.get('llm_prompt_budget', None):
+            self.prompt_builder = PromptBuilder(
+                self.prompt_task, self.prompt_func_name,
+                self.joined_inputs, len(self.prompt_func_inputs),
+                self.joined_outputs, len(self.prompt_func_outputs),
+                self.prompt_inout_inf, self.prompt_other_inf,
+                kwargs['llm_prompt_budget'])
+
+        # m1/m2/m3 ask for a patch against the numbered parent instead of the whole function
+        self.patch_mutation = kwargs.get('ec_patch_mutation', False)
+
         # set LLMs
         self.api_endpoint = api_endpoint
         self.api_key = api_key
@@ -31,9 +47,17 @@ class Evolution():
         self.debug_mode = debug_mode # close prompt checking
 
 
-        self.interface_llm = InterfaceLLM(self.api_endpoint, self.api_key, self.model_LLM,llm_use_local,llm_local_url, self.debug_mode)
+        self.interface_llm = InterfaceLLM(self.api_endpoint, self.api_key, self.model_LLM,llm_use_local,llm_local_url, self.debug_mode, **kwargs)
+
+        # locates the description and the target function in responses
+        self.response_parser = ResponseParser(self.prompt_func_name)
+
+        # with streaming enabled, stop reading once description and function are complete
+        self.stream_extractor = StreamExtractor(self.prompt_func_name) if kwargs.get('llm_stream', False) else None
 
     def get_prompt_i1(self):
+        if self.prompt_builder is not None:
+            return self.prompt_builder.build("i1")
         
         prompt_content = self.prompt_task+"\n"\
 "First, describe your new algorithm and main steps in one sentence. \
@@ -46,6 +70,8 @@ The description must be inside a brace. Next, implement it in Python as a functi
 
         
     def get_prompt_e1(self,indivs):
+        if self.prompt_builder is not None:
+            return self.prompt_builder.build("e1", indivs)
         prompt_indiv = ""
         for i in range(len(indivs)):
             prompt_indiv=prompt_indiv+"No."+str(i+1) +" algorithm and the corresponding code are: \n" + indivs[i]['algorithm']+"\n" +indivs[i]['code']+"\n"
@@ -63,6 +89,8 @@ The description must be inside a brace. Next, implement it in Python as a functi
         return prompt_content
     
     def get_prompt_e2(self,indivs):
+        if self.prompt_builder is not None:
+            return self.prompt_builder.build("e2", indivs)
         prompt_indiv = ""
         for i in range(len(indivs)):
             prompt_indiv=prompt_indiv+"No."+str(i+1) +" algorithm and the corresponding code are: \n" + indivs[i]['algorithm']+"\n" +indivs[i]['code']+"\n"
@@ -80,6 +108,8 @@ The description must be inside a brace. Thirdly, implement it in Python as a fun
         return prompt_content
     
     def get_prompt_m1(self,indiv1):
+        if self.prompt_builder is not None:
+            return self.prompt_builder.build("m1", [indiv1])
         prompt_content = self.prompt_task+"\n"\
 "I have one algorithm with its code as follows. \
 Algorithm description: "+indiv1['algorithm']+"\n\
@@ -95,6 +125,8 @@ The description must be inside a brace. Next, implement it in Python as a functi
         return prompt_content
     
     def get_prompt_m2(self,indiv1):
+        if self.prompt_builder is not None:
+            return self.prompt_builder.build("m2", [indiv1])
         prompt_content = self.prompt_task+"\n"\
 "I have one algorithm with its code as follows. \
 Algorithm description: "+indiv1['algorithm']+"\n\
@@ -110,6 +142,8 @@ The description must be inside a brace. Next, implement it in Python as a functi
         return prompt_content
     
     def get_prompt_m3(self,indiv1):
+        if self.prompt_builder is not None:
+            return self.prompt_builder.build("m3", [indiv1])
         prompt_content = "First, you need to identify the main components in the function below. \
 Next, analyze whether any of these components can be overfit to the in-distribution instances. \
 Then, based on your analysis, simplify the components to enhance the generalization to potential out-of-distribution instances. \
@@ -118,54 +152,166 @@ Finally, provide the revised code, keeping the function name, inputs, and output
         return prompt_content
 
 
-    def _get_alg(self,prompt_content):
+    def get_prompt_patch(self,operator,indiv1):
+        goals = {
+            "m1": "Please assist me in creating a new algorithm that has a different form but can be a modified version of the algorithm provided. \n",
+            "m2": "Please identify the main algorithm parameters and assist me in creating a new algorithm that has a different parameter settings of the score function provided. \n",
+            "m3": "Please identify the main components in the function, analyze whether any of these components can be overfit to the in-distribution instances, \
+and simplify them to enhance the generalization to potential out-of-distribution instances. \n",
+        }
+        head = self.prompt_builder.prefix if self.prompt_builder is not None else self.prompt_task+"\n"
+        prompt_content = head+\
+"I have one algorithm with its code as follows, with line numbers. \
+Algorithm description: "+indiv1['algorithm']+"\n\
+Code:\n\
+"+number_lines(self._patch_base(indiv1))+"\n"\
++goals[operator]+\
+"First, describe your new algorithm and main steps in one sentence. \
+The description must be inside a brace. Next, do not rewrite the whole code: give only the changes to it, \
+either as one or more blocks of the form\n\
+<<<<<<< SEARCH\n(original lines, without line numbers)\n=======\n(new lines)\n>>>>>>> REPLACE\n\
+or as a unified diff. The function "+self.prompt_func_name+" must keep its input(s) "+self.joined_inputs+" and output(s) "\
++self.joined_outputs+". "+"Do not give additional explanations."
+        return prompt_content
+
+    # the code the patch is written against (compacted when prompts are budgeted)
+    def _patch_base(self,indiv1):
+        if self.prompt_builder is not None:
+            return compact_code(indiv1['code'])
+        return indiv1['code']
+
+    def get_prompt(self, operator, parents=None):
+
+        if self.patch_mutation and operator in ["m1", "m2", "m3"]:
+            return self.get_prompt_patch(operator, parents[0])
+
+        if operator == "i1":
+            return self.get_prompt_i1()
+        elif operator == "e1":
+            return self.get_prompt_e1(parents)
+        elif operator == "e2":
+            return self.get_prompt_e2(parents)
+        elif operator == "m1":
+            return self.get_prompt_m1(parents[0])
+        elif operator == "m2":
+            return self.get_prompt_m2(parents[0])
+        elif operator == "m3":
+            return self.get_prompt_m3(parents[0])
+        else:
+            raise ValueError(f"Evolution operator [{operator}] has not been implemented !")
+
+    def _extract_alg(self, response):
 
-        response = self.interface_llm.get_response(prompt_content)
+        return self.response_parser.parse(response)
 
-        algorithm = re.findall(r"\{(.*)\}", response, re.DOTALL)
-        if len(algorithm) == 0:
-            if 'python' in response:
-                algorithm = re.findall(r'^.*?(?=python)', response,re.DOTALL)
-            elif 'import' in response:
-                algorithm = re.findall(r'^.*?(?=import)', response,re.DOTALL)
-            else:
-                algorithm = re.findall(r'^.*?(?=def)', response,re.DOTALL)
+    def _request(self,prompt_content,info):
 
-        code = re.findall(r"import.*return", response, re.DOTALL)
-        if len(code) == 0:
-            code = re.findall(r"def.*return", response, re.DOTALL)
+        time_start = time.time()
+        response, usage = self.interface_llm.get_completion(prompt_content, self.stream_extractor)
+        info['llm_latencies'].append(time.time() - time_start)
+        if usage:
+            info['prompt_tokens'] += usage.get('prompt_tokens', 0)
+            info['completion_tokens'] += usage.get('completion_tokens', 0)
+            info['llm_throttled'] += usage.get('throttled', 0)
 
-        n_retry = 1
-        while (len(algorithm) == 0 or len(code) == 0):
+        return response
+
+    # parses a response into code and description, re-requesting unparseable ones;
+    # returns the result together with the LLM cost spent on it (code is None on failure)
+    def _generate(self,prompt_content,response=None,meta=None,info=None):
+
+        if info is None:
+            info = self._new_info()
+
+        response = self._first_response(prompt_content, info, response, meta)
+
+        result = self._extract_alg(response)
+
+        while result is None and info['parse_retries'] < 4:
             if self.debug_mode:
                 print("Error: algorithm or code not identified, wait 1 seconds and retrying ... ")
 
-            response = self.interface_llm.get_response(prompt_content)
+            info['parse_retries'] += 1
+            response = self._request(prompt_content, info)
+            result = self._extract_alg(response)
 
-            algorithm = re.findall(r"\{(.*)\}", response, re.DOTALL)
-            if len(algorithm) == 0:
-                if 'python' in response:
-                    algorithm = re.findall(r'^.*?(?=python)', response,re.DOTALL)
-                elif 'import' in response:
-                    algorithm = re.findall(r'^.*?(?=import)', response,re.DOTALL)
-                else:
-                    algorithm = re.findall(r'^.*?(?=def)', response,re.DOTALL)
+        if result is not None:
+            [info['code'], info['algorithm']] = result
 
-            code = re.findall(r"import.*return", response, re.DOTALL)
-            if len(code) == 0:
-                code = re.findall(r"def.*return", response, re.DOTALL)
-                
-            if n_retry > 3:
-                break
-            n_retry +=1
+        return info
 
-        algorithm = algorithm[0]
-        code = code[0] 
+    # a patch response is applied to the parent and validated; if that fails the
+    # offspring is regenerated in full with the regular prompt of the operator
+    def _generate_patch(self,operator,parent,prompt_content,response=None,meta=None):
 
-        code_all = code+" "+", ".join(s for s in self.prompt_func_outputs) 
+        info = self._new_info()
 
+        response = self._first_response(prompt_content, info, response, meta)
 
-        return [code_all, algorithm]
+        result = apply_patch(self._patch_base(parent), response, self.prompt_func_name)
+
+        if result is None:
+            if self.debug_mode:
+                print("Error: patch could not be applied, regenerating the whole algorithm ... ")
+            info['patch'] = 'fallback'
+            return self._generate(getattr(self, "get_prompt_" + operator)(parent), info=info)
+
+        info['patch'] = 'applied'
+        [info['code'], info['algorithm']] = result
+
+        return info
+
+    def _new_info(self):
+        return {'code': None, 'algorithm': None, 'llm_latencies': [],
+                'prompt_tokens': 0, 'completion_tokens': 0, 'llm_throttled': 0, 'parse_retries': 0, 'patch': None}
+
+    # a response that was already fetched (e.g. in a concurrent batch) is used first
+    def _first_response(self,prompt_content,info,response=None,meta=None):
+
+        if response is None:
+            return self._request(prompt_content, info)
+
+        if meta:
+            info['llm_latencies'].append(meta['llm_latency'])
+            info['prompt_tokens'] += meta['prompt_tokens']
+            info['completion_tokens'] += meta['completion_tokens']
+            info['llm_throttled'] += meta.get('llm_throttled', 0)
+
+        return response
+
+    def _get_alg(self,prompt_content,response=None):
+
+        info = self._generate(prompt_content, response)
+
+        if info['code'] is None:
+            raise ValueError("algorithm or code not identified in the LLM response")
+
+        return [info['code'], info['algorithm']]
+
+    # like i1/e1/.../m3, but never raises on unparseable responses and also reports
+    # the LLM latency, token usage and parse retries spent on the offspring;
+    # a response fetched beforehand (with its meta) is parsed instead of a new request
+    def generate(self,operator,parents=None,response=None,meta=None):
+
+        prompt_content = self.get_prompt(operator, parents)
+
+        if self.debug_mode and response is None:
+            print("\n >>> check prompt for creating algorithm using [ "+operator+" ] : \n", prompt_content )
+            print(">>> Press 'Enter' to continue")
+            input()
+
+        if self.patch_mutation and operator in ["m1", "m2", "m3"]:
+            info = self._generate_patch(operator, parents[0], prompt_content, response, meta)
+        else:
+            info = self._generate(prompt_content, response, meta)
+
+        if self.debug_mode and response is None:
+            print("\n >>> check designed algorithm: \n", info['algorithm'])
+            print("\n >>> check designed code: \n", info['code'])
+            print(">>> Press 'Enter' to continue")
+            input()
+
+        return info
 
 
     def i1(self):
@@ -5,6 +5,11 @@ from .eoh_evolution import Evolution
 import warnings
 from joblib import Parallel, delayed
 from .evaluator_accelerate import add_numba_decorator
+from .eoh_metrics import new_record, add_llm_info, finish_record
+from .eval_executor import ProcessEvaluator, evaluate_in_thread
+from .code_fingerprint import code_fingerprint
+from .fitness_store import FitnessStore, problem_signature
+from ...llm.api_pacing import AdaptivePacer
 import re
 import concurrent.futures
 
@@ -31,6 +36,34 @@ class InterfaceEC():
         
         self.timeout = timeout  # 评估超时时间
         self.use_numba = use_numba  # 是否使用numba加速代码
+        # 基于进程的评估器：超时直接杀死评估进程，可限制CPU时间和内存；未启用时使用线程评估
+        self.eval_executor = None
+        if kwargs.get('eva_process_pool', False):
+            self.eval_executor = ProcessEvaluator(interface_prob, timeout, kwargs.get('eva_cpu_limit', None), kwargs.get('eva_mem_limit_mb', None))
+        # 问题接口提供evaluate_detail(code)时，评估同时返回各实例的得分
+        self.eval_method = 'evaluate_detail' if hasattr(interface_prob, 'evaluate_detail') else 'evaluate'
+        # 竞速评估：种群已满时把种群最差目标值和最差个体的各实例得分传给问题接口的evaluate_race，
+        # 子代确定无法进入种群后提前停止评估（需要问题接口支持）
+        self.race = kwargs.get('eva_race', False) and hasattr(interface_prob, 'evaluate_race')
+        self.race_confidence = kwargs.get('eva_race_confidence', None)  # 统计提前停止的置信度，None表示只用确定性下界
+        self.history = {}  # 本次运行评估成功的代码指纹 -> {'objective', 'scores'}，指纹相同的代码直接复用结果而不再评估
+        # 持久化的适应度存储：跨运行、续跑和种子复用同一问题、实例集和评估参数下已评估代码的结果；None表示不使用
+        self.fitness_store = None
+        if kwargs.get('eva_fitness_store', False):
+            self.fitness_store = FitnessStore(
+                kwargs.get('eva_fitness_store_path', './fitness_store.sqlite'),
+                problem_signature(interface_prob),
+                kwargs.get('eva_fitness_store_max_mb', 256),
+            )
+        self.batch_samples = kwargs.get('llm_batch_samples', False)  # 是否将相同提示词的子代合并为一次n样本请求
+        self.speculative_k = kwargs.get('ec_speculative_k', 0)  # 推测模式：每批多启动k个子代任务，凑够pop_size个有效子代后取消其余任务
+        # 批次节奏控制：子代任务在worker进程中请求LLM，根据子代度量中记录的429次数和延迟调整批次的发送速率，
+        # 未遇到限流时批次之间不等待；None表示不控制
+        self.pacer = None
+        if kwargs.get('llm_pacing', True):
+            max_rpm = kwargs.get('llm_pacing_max_rpm', None)
+            self.pacer = AdaptivePacer(max_rate=max_rpm / 60.0 if max_rpm else None,
+                                       latency_target=kwargs.get('llm_pacing_latency', None))
         
     # 将生成的代码写入文件（当前写入ael_alg.py）
     def code2file(self,code):
@@ -50,12 +83,45 @@ class InterfaceEC():
         return True  # 返回True
     
     # 检查种群中是否存在相同代码的个体，避免代码重复
+    # 按规范化代码的指纹比较：只有空白、注释、文档字符串、局部变量名或常量写法不同的代码视为重复
     def check_duplicate(self,population,code):
+        fingerprint = code_fingerprint(code)
         for ind in population:
-            if code == ind['code']:
+            if fingerprint == code_fingerprint(ind['code']):
                 return True  # 存在重复代码，返回True
         return False  # 无重复，返回False
 
+    # 查找与code指纹相同的已评估代码的结果 {'objective', 'scores'}：依次查种群、本次运行的评估历史和持久化存储，
+    # 没有时返回None
+    def lookup_fitness(self,population,code):
+        fingerprint = code_fingerprint(code)
+        for ind in population:
+            if self._reusable(ind) and fingerprint == code_fingerprint(ind['code']):
+                return {'objective': ind['objective'], 'scores': self._scores(ind)}
+        if fingerprint in self.history:
+            return self.history[fingerprint]
+        if self.fitness_store is not None:
+            return self.fitness_store.get(fingerprint)
+        return None
+
+    # 个体记录中的各实例得分（没有时为None）
+    @staticmethod
+    def _scores(ind):
+        record = ind.get('other_inf')
+        return record.get('scores') if isinstance(record, dict) else None
+
+    # 个体的目标值能否复用给等价代码：符号检验提前停止的目标值只是拒绝值（不是下界），不复用
+    @staticmethod
+    def _reusable(ind):
+        record = ind.get('other_inf')
+        return ind['objective'] is not None and not (isinstance(record, dict) and record.get('raced') == 'sign')
+
+    # 将评估成功的个体加入评估历史（子代在worker进程中评估，由主进程在收集结果后调用）
+    def remember(self,individuals):
+        for ind in individuals:
+            if ind['code'] is not None and self._reusable(ind):
+                self.history[code_fingerprint(ind['code'])] = {'objective': ind['objective'], 'scores': self._scores(ind)}
+
     # 生成初始种群（注释掉的方法为种群管理和父代选择的示例，未使用）
     # def population_management(self,pop):
     #     # 删除最差个体
@@ -88,8 +154,12 @@ class InterfaceEC():
 
         population = []  # 初始化种群列表
 
-        # 并行评估所有种子算法的性能
-        fitness = Parallel(n_jobs=n_p)(delayed(self.interface_eval.evaluate)(seed['code']) for seed in seeds)
+        # 已评估过的种子直接复用结果，只并行评估其余种子的性能
+        fitness = [self.lookup_fitness([], seed['code']) for seed in seeds]
+        todo = [i for i in range(len(seeds)) if fitness[i] is None]
+        results = Parallel(n_jobs=n_p)(delayed(self._evaluate_seed)(seeds[i]['code']) for i in todo)
+        for i, result in zip(todo, results):
+            fitness[i] = result
 
         # 遍历种子算法，构建种群个体
         for i in range(len(seeds)):
@@ -101,8 +171,10 @@ class InterfaceEC():
                     'other_inf': None  # 其他信息
                 }
 
-                obj = np.array(fitness[i])  # 将评估结果转换为数组
+                obj = np.array(fitness[i]['objective'])  # 将评估结果转换为数组
                 seed_alg['objective'] = np.round(obj, 5)  # 保留5位小数
+                if fitness[i]['scores'] is not None:
+                    seed_alg['other_inf'] = {'scores': fitness[i]['scores']}  # 各实例得分
                 population.append(seed_alg)  # 添加到种群
 
             except Exception as e:
@@ -110,12 +182,78 @@ class InterfaceEC():
                 exit()  # 退出程序
 
         print("Initiliazation finished! Get "+str(len(seeds))+" seed algorithms")  # 打印初始化完成信息
+        self.remember(population)  # 记录种子算法的目标值
 
         return population  # 返回初始种群
+
+    # 评估一个种子算法（不限时），结果写入持久化存储，返回 {'objective', 'scores'}
+    def _evaluate_seed(self,code):
+        time_start = time.time()
+        objective, scores, _ = self._split_result(getattr(self.interface_eval, self.eval_method)(code))
+        if self.fitness_store is not None:
+            self.fitness_store.put(code_fingerprint(code), objective, scores, time.time() - time_start)
+        return {'objective': objective, 'scores': scores}
     
 
-    # 内部方法：通过指定的进化算子生成子代算法
-    def _get_alg(self,pop,operator):
+    # 按算子类型选择父代：i1无需父代，e1/e2选择m个，m1/m2/m3选择1个
+    def _select_parents(self,pop,operator):
+        if operator == "i1":
+            return None
+        elif operator in ["e1", "e2"]:
+            return self.select.parent_selection(pop,self.m)
+        elif operator in ["m1", "m2", "m3"]:
+            return self.select.parent_selection(pop,1)
+        else:
+            raise ValueError(f"Evolution operator [{operator}] has not been implemented !")
+
+    # 为子代代码添加numba装饰器（如果启用），返回实际用于评估的代码
+    def _prepare_code(self,code):
+        if not self.use_numba:
+            return code
+        # 正则表达式匹配函数定义，提取函数名
+        pattern = r"def\s+(\w+)\s*\(.*\):"
+        match = re.search(pattern, code)
+        function_name = match.group(1)
+        # 为函数添加numba装饰器
+        return add_numba_decorator(program=code, function_name=function_name)
+
+    # 在超时限制内评估代码，返回保留5位小数的目标值
+    def _evaluate(self,code):
+        return self._evaluate_detail(code)[0]
+
+    # 将评估方法的返回值统一为 (目标值, 各实例得分或None, 是否竞速提前停止)
+    def _split_result(self,result,method=None):
+        method = method or self.eval_method
+        if method == 'evaluate':
+            return result, None, False
+        fitness, scores = result[:2]
+        raced = method == 'evaluate_race' and result[2]
+        return fitness, None if scores is None else [float(s) for s in scores], raced
+
+    # 竞速评估的参数：种群已满时，目标值不小于种群最差目标值的子代无法进入种群；种群未满或未启用时返回None
+    def _race_params(self,pop):
+        if not self.race or pop is None:
+            return None
+        members = [ind for ind in pop if ind['objective'] is not None]
+        if len(members) < self.pop_size:
+            return None
+        worst = max(members, key=lambda ind: ind['objective'])
+        return {'threshold': float(worst['objective']), 'references': self._scores(worst), 'confidence': self.race_confidence}
+
+    # 在超时限制内评估代码，返回 (保留5位小数的目标值, 各实例得分或None, 是否竞速提前停止)
+    # 传入种群pop且启用竞速评估时，子代确定无法进入该种群后提前停止
+    def _evaluate_detail(self,code,pop=None):
+        race = self._race_params(pop)
+        method, args = (self.eval_method, ()) if race is None else ('evaluate_race', (race,))
+        if self.eval_executor is not None:
+            fitness, scores, raced = self._split_result(self.eval_executor.evaluate(code, method, args), method)  # 超时的评估进程已被杀死
+            return np.round(fitness, 5), scores, raced
+        result = evaluate_in_thread(getattr(self.interface_eval, method), self.timeout, code, *args)  # 超时则抛出异常，不等待评估线程结束
+        fitness, scores, raced = self._split_result(result, method)
+        return np.round(fitness, 5), scores, raced  # 保留5位小数
+
+    # 内部方法：通过指定的进化算子生成子代算法，LLM开销累加到度量记录record中
+    def _get_alg(self,pop,operator,record=None):
         # 初始化子代字典，包含算法描述、代码、目标值等
         offspring = {
             'algorithm': None,
@@ -123,83 +261,110 @@ class InterfaceEC():
             'objective': None,
             'other_inf': None
         }
-        # 根据不同的算子生成子代
-        if operator == "i1":  # i1算子：初始创建，无需父代
-            parents = None
-            [offspring['code'],offspring['algorithm']] =  self.evol.i1()  # 调用Evolution类的i1方法生成算法          
-        elif operator == "e1":  # e1算子：基于多个父代生成全新算法
-            parents = self.select.parent_selection(pop,self.m)  # 选择m个父代
-            [offspring['code'],offspring['algorithm']] = self.evol.e1(parents)  # 调用e1方法生成算法
-        elif operator == "e2":  # e2算子：基于父代的共同思想生成新算法
-            parents = self.select.parent_selection(pop,self.m)  # 选择m个父代
-            [offspring['code'],offspring['algorithm']] = self.evol.e2(parents)  # 调用e2方法生成算法
-        elif operator == "m1":  # m1算子：对单个父代进行修改生成新算法
-            parents = self.select.parent_selection(pop,1)  # 选择1个父代
-            [offspring['code'],offspring['algorithm']] = self.evol.m1(parents[0])  # 调用m1方法生成算法
-        elif operator == "m2":  # m2算子：修改单个父代的参数生成新算法
-            parents = self.select.parent_selection(pop,1)  # 选择1个父代
-            [offspring['code'],offspring['algorithm']] = self.evol.m2(parents[0])  # 调用m2方法生成算法
-        elif operator == "m3":  # m3算子：简化单个父代的组件以增强泛化性
-            parents = self.select.parent_selection(pop,1)  # 选择1个父代
-            [offspring['code'],offspring['algorithm']] = self.evol.m3(parents[0])  # 调用m3方法生成算法
-        else:
-            print(f"Evolution operator [{operator}] has not been implemented ! \n")  # 算子未实现时打印提示
+        # 根据算子选择父代（i1无需父代，e1/e2选择m个，m1/m2/m3选择1个），再调用LLM生成算法
+        parents = self._select_parents(pop, operator)
+        info = self.evol.generate(operator, parents)
+        if record is not None:
+            add_llm_info(record, info)
+        # 重试后仍无法解析出算法和代码
+        if info['code'] is None:
+            raise ValueError("algorithm or code not identified in the LLM response")
+        offspring['code'], offspring['algorithm'] = info['code'], info['algorithm']
 
         return parents, offspring  # 返回父代和生成的子代
 
-    # 获取子代并评估其性能
+    # 评估子代代码并记录评估耗时、各实例得分和是否竞速提前停止，出错或超时时标记评估失败后继续抛出异常
+    def _evaluate_record(self,code,record,pop=None):
+        time_start = time.time()
+        try:
+            objective, record['scores'], record['raced'] = self._evaluate_detail(code, pop)
+            return objective
+        except Exception:
+            record['eval_failed'] = True
+            raise
+        finally:
+            record['eval_time'] += time.time() - time_start
+
+    # 评估子代：与种群、评估历史或持久化存储中指纹相同的代码直接复用其结果（记录为reused），
+    # 否则评估实际运行的代码code（无法进入种群pop时竞速提前停止），并将完整评估的结果写入持久化存储
+    def _evaluate_or_reuse(self,pop,offspring,code,record):
+        known = self.lookup_fitness(pop, offspring['code'])
+        if known is not None:
+            record['reused'] = True
+            record['scores'] = known['scores']
+            return known['objective']
+        objective = self._evaluate_record(code, record, pop)
+        # 竞速提前停止的目标值不是完整评估的结果，不写入持久化存储；其中下界（'bound'）在本次运行中复用
+        # （种群最差目标值不会变差），符号检验的拒绝值（'sign'）不复用
+        if self.fitness_store is not None and not record['raced']:
+            self.fitness_store.put(code_fingerprint(offspring['code']), objective, record['scores'], record['eval_time'])
+        return objective
+
+    # 为任务结果附加分组标签（按完成顺序收集结果时用于区分所属的算子）
+    def _tagged(self, tag, func, *args):
+        return tag, func(*args)
+
+    # 并行执行子代任务jobs=[(标签, 函数, 参数)]，函数返回 (父代, 子代)，返回 [(标签, (父代, 子代))]
+    # 每收集到一个结果就调用callback(标签, 父代, 子代)（在主进程中，如写入事件日志）
+    # 推测模式下按完成顺序收集，每个标签都凑够limits[标签]（默认pop_size）个有效子代后关闭生成器，
+    # 取消仍在运行或排队的任务；超时或出错时保留已收集的结果
+    def _run_jobs(self, jobs, callback=None, limits=None):
+        limits = limits or {}
+        n_valid = {tag: 0 for tag, _, _ in jobs}  # 每个标签已收集的有效子代数量
+        out = []
+        generator = Parallel(n_jobs=self.n_p,timeout=self.timeout+15,
+                             return_as="generator_unordered" if self.speculative_k else "generator")(
+            delayed(self._tagged)(tag, func, *args) for tag, func, args in jobs)
+        try:
+            for tag, (p, off) in generator:
+                if self.speculative_k and off['objective'] is not None:
+                    # 已凑够的标签不再接收有效子代，保持每个算子最多limits[标签]个
+                    if n_valid[tag] >= limits.get(tag, self.pop_size):
+                        continue
+                    n_valid[tag] += 1
+                out.append((tag, (p, off)))
+                if callback is not None:
+                    callback(tag, p, off)
+                if self.speculative_k and all(n >= limits.get(tag, self.pop_size) for tag, n in n_valid.items()):
+                    break
+        except Exception as e:
+            if self.debug:
+                print(f"Error: {e}")
+            print("Parallel time out .")
+        finally:
+            generator.close()
+        return out
+
+    # 获取子代并评估其性能，度量记录保存在子代的other_inf中（失败的子代同样保留记录）
     def get_offspring(self, pop, operator):
 
+        record = new_record(operator)  # 本子代的度量记录
         try:
-            p, offspring = self._get_alg(pop, operator)  # 调用内部方法生成子代和父代
+            p, offspring = self._get_alg(pop, operator, record)  # 调用内部方法生成子代和父代
             
             # 如果使用numba加速，为生成的函数添加numba装饰器
-            if self.use_numba:
-                
-                # 正则表达式匹配函数定义，提取函数名
-                pattern = r"def\s+(\w+)\s*\(.*\):"
-
-                # 在代码中搜索函数定义
-                match = re.search(pattern, offspring['code'])
-
-                function_name = match.group(1)  # 获取函数名
-
-                # 为函数添加numba装饰器
-                code = add_numba_decorator(program=offspring['code'], function_name=function_name)
-            else:
-                code = offspring['code']  # 不使用加速，直接使用原代码
+            code = self._prepare_code(offspring['code'])
 
             n_retry= 1  # 重试计数器
             # 检查代码是否重复，重复则重试
             while self.check_duplicate(pop, offspring['code']):
                 
                 n_retry += 1
+                record['duplicates'] += 1
                 if self.debug:
                     print("duplicated code, wait 1 second and retrying ... ")  # 调试模式下打印重复提示
                     
-                p, offspring = self._get_alg(pop, operator)  # 重新生成子代
+                p, offspring = self._get_alg(pop, operator, record)  # 重新生成子代
 
                 # 再次处理代码（添加numba装饰器）
-                if self.use_numba:
-                    pattern = r"def\s+(\w+)\s*\(.*\):"
-                    match = re.search(pattern, offspring['code'])
-                    function_name = match.group(1)
-                    code = add_numba_decorator(program=offspring['code'], function_name=function_name)
-                else:
-                    code = offspring['code']
+                code = self._prepare_code(offspring['code'])
                     
                 if n_retry > 1:  # 最多重试1次
                     break
                 
                 
-            # 并发执行评估，设置超时时间
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(self.interface_eval.evaluate, code)  # 提交评估任务
-                fitness = future.result(timeout=self.timeout)  # 获取评估结果，超时则抛出异常
-                offspring['objective'] = np.round(fitness, 5)  # 保留5位小数
-                future.cancel()  # 取消任务
-                # fitness = self.interface_eval.evaluate(code)  # 直接评估（注释掉的备用方式）
-                
+            # 并发执行评估，设置超时时间（已评估过的等价代码复用目标值）
+            offspring['objective'] = self._evaluate_or_reuse(pop, offspring, code, record)
 
         except Exception as e:  # 捕获异常（如超时、代码错误等）
 
@@ -212,6 +377,9 @@ class InterfaceEC():
             }
             p = None
 
+        # 记录相对父代的改进量
+        offspring['other_inf'] = finish_record(record, p, pop, offspring['objective'])
+
         # 返回父代和子代（目标值已取整）
         return p, offspring
     # 处理任务的备用方法（使用并发执行get_offspring，设置超时，未使用）
@@ -234,18 +402,34 @@ class InterfaceEC():
     #     return result
 
     
-    # 批量生成算法（并行生成pop_size个子代）
-    def get_algorithm(self, pop, operator):
+    # 批量生成算法（并行生成n个子代，默认pop_size个），每个子代完成时调用callback(0, 父代, 子代)
+    def get_algorithm(self, pop, operator, n=None, callback=None):
+        n = self.pop_size if n is None else n
+        # 多样本模式：相同提示词的子代合并为一次LLM请求
+        if self.batch_samples:
+            return self.get_algorithms(pop, [operator], [n], callback)[0]
+
         results = []  # 存储结果
+        # 并行执行get_offspring，生成n个子代（推测模式下多启动speculative_k个）
+        jobs = [(0, self.get_offspring, (pop, operator)) for _ in range(n + self.speculative_k)]
+        # 按当前速率等待本批请求的发送名额（未遇到限流时不等待），代替原来每批之后固定等待2秒
+        if self.pacer is not None:
+            self.pacer.wait(len(jobs))
+        # LLM端点尚未验证时，第一个子代在主进程中生成（兼作连接检查），之后与其他子代一起并行评估
+        first = self.generate_first(pop, operator) if jobs else None
+        if first is not None:
+            jobs[0] = (0, self.evaluate_offspring, (pop, operator) + first)
         try:
-            # 并行执行get_offspring，生成pop_size个子代，设置超时时间
-            results = Parallel(n_jobs=self.n_p,timeout=self.timeout+15)(delayed(self.get_offspring)(pop, operator) for _ in range(self.pop_size))
+            # 设置超时时间
+            results = [r for _, r in self._run_jobs(jobs, callback, {0: n})]
         except Exception as e:
             if self.debug:
                 print(f"Error: {e}")  # 调试模式下打印错误信息
             print("Parallel time out .")  # 打印并行超时提示
-            
-        time.sleep(2)  # 等待2秒，避免请求过于频繁
+
+        # 将本批子代遇到的429次数和LLM延迟反馈给节奏控制器
+        if self.pacer is not None:
+            self._record_pacing([off for _, off in results])
 
 
         out_p = []  # 存储父代列表
@@ -257,7 +441,140 @@ class InterfaceEC():
             out_off.append(off)
             if self.debug:
                 print(f">>> check offsprings: \n {off}")  # 调试模式下打印子代信息
+        self.remember(out_off)  # 记录本批评估成功的子代，之后的等价代码直接复用目标值
         return out_p, out_off  # 返回父代和子代列表
+    # 将子代度量记录中的429次数和每个请求的延迟反馈给批次节奏控制器
+    def _record_pacing(self, offsprings):
+        for off in offsprings:
+            record = off.get('other_inf')
+            if not isinstance(record, dict) or 'llm_latencies' not in record:
+                continue
+            if record.get('llm_throttled', 0):
+                self.pacer.record(throttled=record['llm_throttled'])
+            for latency in record['llm_latencies']:
+                self.pacer.record(latency=latency)
+
+    # 生成一个子代的代码（不评估），返回子代；info为已获取的LLM结果，否则同步请求LLM
+    def _generate_offspring(self, operator, parents, info=None):
+        offspring = {
+            'algorithm': None,
+            'code': None,
+            'objective': None,
+            'other_inf': new_record(operator)
+        }
+        info = info or self.evol.generate(operator, parents)
+        add_llm_info(offspring['other_inf'], info)
+        offspring['code'], offspring['algorithm'] = info['code'], info['algorithm']
+        if self.debug and info['code'] is None:
+            print("Error: algorithm or code not identified in the LLM response")
+        return offspring
+
+    # LLM端点尚未验证时，在主进程中同步生成一个子代：第一个真实的生成请求兼作连接检查，配置错误时在分发任务之前
+    # 退出程序（见InterfaceLLM._check_health），而不是在worker中逐个丢弃子代。返回 (父代, 子代)，之后用
+    # evaluate_offspring评估；端点已验证时返回None
+    def generate_first(self, pop, operator):
+        if self.evol.interface_llm.health_verified:
+            return None
+        parents = self._select_parents(pop, operator)
+        return parents, self._generate_offspring(operator, parents)
+
+    # 评估一个已生成代码的子代（用于先批量请求LLM、再并行评估的流程）
+    def evaluate_offspring(self, pop, operator, parents, offspring):
+        record = offspring['other_inf'] or new_record(operator)  # 生成阶段已创建的度量记录
+        try:
+            if offspring['code'] is None:
+                raise ValueError("no code generated")
+            # 代码与种群重复时重新生成一次（同步请求）
+            if self.check_duplicate(pop, offspring['code']):
+                record['duplicates'] += 1
+                if self.debug:
+                    print("duplicated code, retrying ... ")
+                info = self.evol.generate(operator, parents)
+                add_llm_info(record, info)
+                if info['code'] is None:
+                    raise ValueError("algorithm or code not identified in the LLM response")
+                offspring['code'], offspring['algorithm'] = info['code'], info['algorithm']
+            offspring['objective'] = self._evaluate_or_reuse(pop, offspring, self._prepare_code(offspring['code']), record)
+        except Exception as e:
+            offspring = {
+                'algorithm': None,
+                'code': None,
+                'objective': None,
+                'other_inf': None
+            }
+            parents = None
+        offspring['other_inf'] = finish_record(record, parents, pop, offspring['objective'])
+        return parents, offspring
+
+    # 批量生成多个算子的子代：先为每个 (算子, 子代) 选择父代并构造提示词，
+    # 再通过LLM接口一次性并发发送全部提示词，最后并行评估所有子代。
+    # 所有LLM请求都在评估开始之前完成，多发的请求无法缩短等待最慢请求的时间，因此这里不做推测生成（不多发提示词）
+    # 第k个算子生成counts[k]个子代（默认pop_size个），每个子代完成时调用callback(k, 父代, 子代)
+    # 返回与operators顺序对应的 [(父代列表, 子代列表)]
+    def get_algorithms(self, pop, operators, counts=None, callback=None):
+        counts = counts or [self.pop_size] * len(operators)
+        tasks = []  # [(算子序号, 算子, 父代, 提示词)]
+        for k, operator in enumerate(operators):
+            for _ in range(counts[k]):
+                parents = self._select_parents(pop, operator)
+                tasks.append((k, operator, parents, self.evol.get_prompt(operator, parents)))
+
+        # LLM端点尚未验证时，第一个子代在主进程中同步生成（兼作连接检查），其余请求之后再并发发送
+        generated = []  # [(算子序号, 算子, 父代, 子代)]
+        if tasks and not self.evol.interface_llm.health_verified:
+            k, operator, parents, _ = tasks.pop(0)
+            generated.append((k, operator, parents, self._generate_offspring(operator, parents)))
+
+        # 并发获取所有响应；启用多样本请求时，相同提示词合并为一次n样本请求，再把样本按顺序分回各子代
+        # 每个请求的开销记录在meta中，n样本请求的token用量平均分摊到各样本
+        meta = []  # 每个请求的延迟和token用量
+        if self.batch_samples:
+            groups = {}  # 提示词 -> 使用该提示词的子代数量
+            for t in tasks:
+                groups[t[3]] = groups.get(t[3], 0) + 1
+            prompts = list(groups)
+            samples = self.evol.interface_llm.get_samples(prompts, [groups[p] for p in prompts], meta,
+                                                          self.evol.stream_extractor)
+            by_prompt = dict(zip(prompts, zip(samples, meta)))
+            responses, metas = [], []
+            for t in tasks:
+                group_samples, group_meta = by_prompt[t[3]]
+                responses.append(group_samples.pop(0))
+                m = dict(group_meta)
+                m['prompt_tokens'] /= groups[t[3]]
+                m['completion_tokens'] /= groups[t[3]]
+                m['llm_throttled'] /= groups[t[3]]
+                metas.append(m)
+        else:
+            samples = self.evol.interface_llm.get_samples([t[3] for t in tasks], None, meta, self.evol.stream_extractor)
+            responses = [s[0] for s in samples]
+            metas = meta
+
+        # 解析响应（解析失败时按原逻辑同步重试）
+        for (k, operator, parents, prompt), response, m in zip(tasks, responses, metas):
+            info = self.evol.generate(operator, parents, response, m)
+            generated.append((k, operator, parents, self._generate_offspring(operator, parents, info)))
+
+        # 并行评估
+        results = [(k, (None, off)) for k, _, _, off in generated]
+        try:
+            results = self._run_jobs([(k, self.evaluate_offspring, (pop, operator, parents, off))
+                                      for k, operator, parents, off in generated],
+                                     callback, dict(enumerate(counts)))
+        except Exception as e:
+            if self.debug:
+                print(f"Error: {e}")
+            print("Parallel time out .")
+
+        out = [([], []) for _ in operators]
+        for k, (p, off) in results:
+            out[k][0].append(p)
+            out[k][1].append(off)
+            if self.debug:
+                print(f">>> check offsprings: \n {off}")
+        self.remember([off for _, (_, off) in results])
+        return out
+
     # 生成算法的备用方法（单个生成，包含重复检查和错误重试，未使用）
     # def get_algorithm(self,pop,operator, pop_size, n_p):
         
@@ -0,0 +1,105 @@
+# 导入JSON、文件系统和数值计算相关的模块
+import json
+import os
+
+import numpy as np
+
+
+# 创建单个子代的度量记录：生成该子代的算子、LLM开销、解析重试、重复、评估结果和改进量
+# 记录保存在 offspring['other_inf'] 中，随种群一起写入结果文件
+def new_record(operator):
+    return {
+        'operator': operator,  # 生成该子代的算子
+        'llm_latencies': [],  # 每次LLM请求的延迟（秒）
+        'prompt_tokens': 0,  # 提示词token数（缓存命中或接口不提供用量时为0）
+        'completion_tokens': 0,  # 生成token数
+        'llm_throttled': 0,  # LLM请求遇到的429限流次数
+        'parse_retries': 0,  # 响应无法解析而重新请求的次数
+        'parse_failed': False,  # 重试后仍无法解析出算法和代码
+        'patch': None,  # 补丁变异的结果：'applied'补丁成功应用，'fallback'回退为完整生成，None未使用补丁
+        'duplicates': 0,  # 代码与种群重复而重新生成的次数
+        'eval_time': 0.0,  # 评估耗时（秒）
+        'eval_failed': False,  # 评估出错或超时
+        'reused': False,  # 与已评估代码的指纹相同，直接复用其目标值而未评估
+        'scores': None,  # 各实例的得分（问题接口提供evaluate_detail时记录）
+        'raced': False,  # 竞速评估提前停止的方式：'bound'（目标值为下界）或'sign'（符号检验，目标值为拒绝值），未停止为False
+        'improvement': None,  # 相对父代（无父代时相对种群）最优目标值的改进量，正数表示更优
+    }
+
+
+# 将Evolution.generate返回的LLM开销累加到记录中
+def add_llm_info(record, info):
+    record['llm_latencies'] += info['llm_latencies']
+    record['prompt_tokens'] += info['prompt_tokens']
+    record['completion_tokens'] += info['completion_tokens']
+    record['llm_throttled'] += info.get('llm_throttled', 0)
+    record['parse_retries'] += info['parse_retries']
+    record['parse_failed'] = info['code'] is None
+    if info.get('patch'):
+        record['patch'] = info['patch']
+
+
+# 计算子代相对参考个体的改进量（目标值越小越好）
+def finish_record(record, parents, pop, objective):
+    reference = [ind['objective'] for ind in (parents or pop or []) if ind['objective'] is not None]
+    if objective is not None and reference:
+        record['improvement'] = float(np.min(reference) - objective)
+    return record
+
+
+# 按算子汇总一组子代的度量，返回 {算子: 统计字典}
+def summarize(offsprings):
+    groups = {}
+    for off in offsprings:
+        record = off.get('other_inf')
+        if isinstance(record, dict) and 'operator' in record:
+            groups.setdefault(record['operator'], []).append((off, record))
+
+    summary = {}
+    for operator, items in groups.items():
+        records = [r for _, r in items]
+        latencies = [t for r in records for t in r['llm_latencies']]
+        improvements = [r['improvement'] for r in records if r['improvement'] is not None]
+        llm_time = float(sum(latencies))
+        eval_time = float(sum(r['eval_time'] for r in records))
+        tokens = sum(r['prompt_tokens'] + r['completion_tokens'] for r in records)
+        gain = float(sum(max(0.0, i) for i in improvements))
+        stats = {
+            'offspring': len(items),
+            'valid': sum(1 for off, _ in items if off['objective'] is not None),
+            'llm_requests': len(latencies),
+            'prompt_tokens': sum(r['prompt_tokens'] for r in records),
+            'completion_tokens': sum(r['completion_tokens'] for r in records),
+            'llm_throttled': sum(r.get('llm_throttled', 0) for r in records),
+            'parse_retries': sum(r['parse_retries'] for r in records),
+            'parse_failures': sum(1 for r in records if r['parse_failed']),
+            'duplicates': sum(r['duplicates'] for r in records),
+            'patches_applied': sum(1 for r in records if r.get('patch') == 'applied'),
+            'patch_fallbacks': sum(1 for r in records if r.get('patch') == 'fallback'),
+            'eval_failures': sum(1 for r in records if r['eval_failed']),
+            'reused': sum(1 for r in records if r.get('reused')),
+            'raced': sum(1 for r in records if r.get('raced')),
+            'improved': sum(1 for i in improvements if i > 0),
+            'improvement': gain,
+            'best_improvement': max(improvements) if improvements else None,
+            'llm_time': llm_time,
+            'eval_time': eval_time,
+            'improvement_per_second': gain / (llm_time + eval_time) if llm_time + eval_time > 0 else None,
+            'improvement_per_1k_tokens': gain * 1000 / tokens if tokens > 0 else None,
+        }
+        if latencies:
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            stats.update({'latency_p50': float(p50), 'latency_p90': float(p90), 'latency_p99': float(p99)})
+        summary[operator] = stats
+    return summary
+
+
+# 将一代子代的汇总写入 output_path/results/metrics/metrics_generation_N.json
+def save_generation_metrics(output_path, generation, offsprings, elapsed=None):
+    directory = output_path + "/results/metrics"
+    os.makedirs(directory, exist_ok=True)
+    data = {'generation': generation, 'time': elapsed, 'operators': summarize(offsprings)}
+    filename = directory + "/metrics_generation_" + str(generation) + ".json"
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=5)
+    return data
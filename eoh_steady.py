@@ -0,0 +1,131 @@
+import concurrent.futures
+import json
+import os
+import time
+
+import numpy as np
+from joblib.externals.loky import get_reusable_executor
+
+from .eoh import EOH
+from .eoh_metrics import save_generation_metrics
+
+
+# 稳态（异步）EOH：不再按代同步等待，而是始终保持固定数量的子代任务（LLM生成→编译→评估）在途，
+# 每完成一个就通过manage.population_management插入种群并补充新任务；
+# 每插入checkpoint_every个子代保存一次种群（文件编号与分代版本一致，可用exp_continue_*续跑；
+# 同时保存实际的插入数和完成数progress_k.json，最后一个检查点可能不足checkpoint_every个子代）
+class EOHSteady(EOH):
+
+    def __init__(self, paras, problem, select, manage, **kwargs):
+        super().__init__(paras, problem, select, manage, **kwargs)
+
+        self.n_in_flight = paras.ec_in_flight or self.exp_n_proc  # 同时在途的子代任务数
+        self.checkpoint_every = paras.ec_checkpoint_every or self.pop_size  # 每插入多少个子代保存一次检查点
+        # 子代总数预算：与分代版本的期望子代数相同（每代每个算子按权重执行，每次生成pop_size个）
+        self.n_offspring = int(round(self.n_pop * self.pop_size * sum(min(1.0, w) for w in self.operator_weights)))
+
+    # 按算子权重随机选择一个算子
+    def _select_operator(self):
+        weights = np.array(self.operator_weights, dtype=float)
+        return self.operators[np.random.choice(len(self.operators), p=weights / weights.sum())]
+
+    # 起始进度：从第n_start个检查点续跑时读取该检查点的进度文件；
+    # 没有进度文件时（如由分代版本的种群文件续跑）按每个检查点插入checkpoint_every个子代估计
+    def _init_progress(self, n_start):
+        progress = {'n_inserted': n_start * self.checkpoint_every, 'n_completed': n_start * self.checkpoint_every}
+        if self.load_pop and n_start:
+            filename = os.path.join(os.path.dirname(self.load_pop_path), "progress_" + str(n_start) + ".json")
+            if os.path.exists(filename):
+                with open(filename) as file:
+                    progress = json.load(file)
+        return progress
+
+    # 保存检查点：种群、最优个体和进度（可选）以及该检查点期间子代的算子度量
+    def _checkpoint(self, population, k, progress, offsprings, elapsed, time_start):
+        save_generation_metrics(self.output_path, k, offsprings, elapsed)
+        self._log_event({'event': 'checkpoint', 'k': k, 'progress': progress}, sync=True)
+        if self.snapshots:
+            self._save_population(population, k)
+            self._save_progress(progress, k)
+        print(f"--- 检查点 {k} 已保存，耗时: {((time.time()-time_start)/60):.1f} 分钟")
+        print("种群目标值: ", end=" ")
+        for ind in population:
+            print(str(ind['objective']) + " ", end="")
+        print()
+
+    # 运行稳态EOH算法的主方法
+    def run(self):
+        print("- 稳态进化过程开始 -")
+        time_start = time.time()  # 记录开始时间
+
+        # 初始化进化算子接口和种群（与分代版本相同；从事件日志续跑时由日志重建）
+        interface_ec = self._get_interface_ec()
+        resume = self._open_event_log(interface_ec)
+        if resume is None:
+            population, n_start = self._init_population(interface_ec, time_start)
+            progress = self._init_progress(n_start)
+            n_checkpointed = progress['n_inserted']  # 最近一个检查点（或起始）时的插入数
+            window = []  # 上一个检查点之后完成的子代（用于统计算子度量）
+        else:
+            population = resume['population']
+            progress = {'n_inserted': resume['n_inserted'], 'n_completed': resume['n_completed']}
+            n_checkpointed = resume['n_checkpointed']
+            window = list(resume['window'])
+
+        # 续跑时从记录的进度开始，事件日志中记录的子代不再重新生成（崩溃时在途的任务重新提交）
+        n_inserted = progress['n_inserted']  # 已插入种群的有效子代数
+        n_completed = progress['n_completed']  # 已完成的子代任务数（包括失败的任务）
+        n_submitted = n_completed  # 已提交的子代任务数（子代预算n_offspring按提交数计算）
+        time_window = time.time()
+
+        executor = get_reusable_executor(max_workers=self.n_in_flight)
+        pending = {}  # future -> 算子
+        while n_submitted < self.n_offspring or pending:
+            # 补充在途任务；每个任务使用提交时的种群快照选择父代和检查重复
+            while n_submitted < self.n_offspring and len(pending) < self.n_in_flight:
+                op = self._select_operator()
+                # LLM端点尚未验证时，子代在主进程中生成（兼作连接检查），只把评估提交到worker
+                first = interface_ec.generate_first(list(population), op)
+                if first is None:
+                    pending[executor.submit(interface_ec.get_offspring, list(population), op)] = op
+                else:
+                    pending[executor.submit(interface_ec.evaluate_offspring, list(population), op, *first)] = op
+                n_submitted += 1
+
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                op = pending.pop(future)
+                n_completed += 1
+                try:
+                    _, off = future.result()
+                except Exception as e:
+                    if self.debug_mode:
+                        print(f"Error: {e}")
+                    self._log_event({'event': 'failed', 'operator': op})
+                    continue
+                window.append(off)
+                interface_ec.remember([off])  # 子代在worker进程中评估，评估历史在主进程中更新
+                self._log_event({'event': 'offspring', 'operator': op, 'offspring': off})
+                print(f" 算子: {op}, Obj: {off['objective']}")
+                if off['objective'] is None:
+                    continue
+
+                # 立即插入种群并裁剪至设定规模
+                self.add2pop(population, [off])
+                population = self.manage.population_management(population, min(len(population), self.pop_size))
+                n_inserted += 1
+
+                if n_inserted % self.checkpoint_every == 0:
+                    self._checkpoint(population, n_inserted // self.checkpoint_every, {'n_inserted': n_inserted, 'n_completed': n_completed},
+                                     window, time.time() - time_window, time_start)
+                    n_checkpointed = n_inserted
+                    window = []
+                    time_window = time.time()
+
+        # 保存最后不足一个检查点间隔的结果（进度记录实际的插入数，从它续跑时不会多算）
+        if n_inserted % self.checkpoint_every and n_inserted != n_checkpointed:
+            self._checkpoint(population, n_inserted // self.checkpoint_every + 1, {'n_inserted': n_inserted, 'n_completed': n_completed},
+                             window, time.time() - time_window, time_start)
+
+        self._close_event_log()
+        print(f"--- 稳态进化完成：共插入 {n_inserted} 个子代，耗时: {((time.time()-time_start)/60):.1f} 分钟")
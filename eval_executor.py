@@ -0,0 +1,150 @@
+# 导入多进程、资源限制和线程同步相关的模块
+import concurrent.futures
+import multiprocessing
+import os
+import signal
+import threading
+import warnings
+
+try:
+    import resource
+except ImportError:  # 非POSIX平台没有resource模块，不支持资源限制
+    resource = None
+
+
+# 评估进程的主循环：接收 (方法名, 代码, 其他参数)，调用问题接口的该方法评估，返回 ('ok', 结果) 或 ('error', 错误信息)
+# 每次评估前把CPU时间的软限制设为“已用时间+cpu_limit”，超出后进程被SIGXCPU终止
+def _worker_loop(conn, interface_eval, cpu_limit, mem_limit_mb):
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()  # 自成进程组，终止时连同评估中创建的子进程一起杀死
+    if resource is not None and mem_limit_mb:
+        limit = int(mem_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    while True:
+        try:
+            method, code, args = conn.recv()
+        except EOFError:
+            return
+        if resource is not None and cpu_limit:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            used = int(usage.ru_utime + usage.ru_stime)
+            hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+            soft = used + int(cpu_limit) + 1
+            resource.setrlimit(resource.RLIMIT_CPU, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+        try:
+            conn.send(('ok', getattr(interface_eval, method)(code, *args)))
+        except MemoryError:
+            conn.send(('error', "memory limit exceeded"))
+        except Exception as e:
+            conn.send(('error', repr(e)))
+
+
+# 在线程中调用func(*args)，最多等待timeout秒，超时抛出concurrent.futures.TimeoutError。
+# 超时后不等待线程结束（线程无法被强制终止，失控的启发式在后台继续运行到结束），调用方立即返回
+def evaluate_in_thread(func, timeout, *args):
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    try:
+        return executor.submit(func, *args).result(timeout=timeout)
+    finally:
+        executor.shutdown(wait=False)
+
+
+# 基于进程的评估器：每个评估在独立的工作进程中运行，超时则直接杀死该进程并在下次评估时补充新进程，
+# 失控的启发式不会继续占用CPU和GIL；可选的CPU时间和内存限制通过rlimit施加在工作进程上。
+# 工作进程用fork创建（无需pickle问题接口），所在进程是守护进程（不允许创建子进程）或平台不支持fork时，
+# 退回到线程评估（evaluate_in_thread）并给出警告
+class ProcessEvaluator():
+    def __init__(self, interface_eval, timeout, cpu_limit=None, mem_limit_mb=None):
+        self.interface_eval = interface_eval  # 问题评估接口
+        self.timeout = timeout  # 单次评估的超时时间（秒）
+        self.cpu_limit = cpu_limit  # 单次评估的CPU时间上限（秒），None表示不限制
+        self.mem_limit_mb = mem_limit_mb  # 工作进程的地址空间上限（MB），None表示不限制
+        self._idle = []  # 空闲的工作进程 [(进程, 连接)]
+        self._pid = None  # 创建工作进程的进程号，pickle到其他进程后重新创建
+        self._lock = threading.Lock()
+
+    # 当前进程能否创建工作进程
+    def available(self):
+        return 'fork' in multiprocessing.get_all_start_methods() and not multiprocessing.current_process().daemon
+
+    def _spawn(self):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.get_context('fork').Process(
+            target=_worker_loop,
+            args=(child_conn, self.interface_eval, self.cpu_limit, self.mem_limit_mb),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+
+    def _acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = []
+                self._pid = os.getpid()
+            while self._idle:
+                process, conn = self._idle.pop()
+                if process.is_alive():
+                    return process, conn
+                conn.close()
+        return self._spawn()
+
+    def _release(self, process, conn):
+        with self._lock:
+            self._idle.append((process, conn))
+
+    @staticmethod
+    def _kill(process, conn):
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:  # 工作进程尚未建立进程组或已退出
+                pass
+        process.kill()
+        process.join()
+        conn.close()
+
+    # 评估代码，返回问题接口评估方法method（默认evaluate）以 (code, *args) 调用的结果；
+    # 超时抛出concurrent.futures.TimeoutError，评估出错或进程被终止抛出RuntimeError
+    def evaluate(self, code, method='evaluate', args=()):
+        if not self.available():
+            warnings.warn("process evaluation is unavailable here (daemon process or no fork); evaluating in a thread, "
+                          "which cannot be stopped on timeout", RuntimeWarning)
+            return evaluate_in_thread(getattr(self.interface_eval, method), self.timeout, code, *args)
+
+        process, conn = self._acquire()
+        try:
+            conn.send((method, code, tuple(args)))
+            finished = conn.poll(self.timeout)
+            result = conn.recv() if finished else None
+        except (EOFError, OSError):
+            self._kill(process, conn)
+            raise RuntimeError("evaluation process died (CPU or memory limit exceeded?)")
+        if not finished:
+            self._kill(process, conn)
+            raise concurrent.futures.TimeoutError(f"evaluation exceeded {self.timeout} s")
+        status, value = result
+        self._release(process, conn)
+        if status != 'ok':
+            raise RuntimeError(value)
+        return value
+
+    # 关闭全部空闲的工作进程
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for process, conn in idle:
+            self._kill(process, conn)
+
+    # 工作进程、连接和锁不能被pickle，传到其他进程时重新创建
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_idle'] = []
+        state['_pid'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
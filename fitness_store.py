@@ -0,0 +1,155 @@
+# 导入哈希、JSON、文件路径、SQLite、线程同步和时间相关的模块
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+# 计算数据的稳定哈希：数组按dtype、形状和字节内容，列表/元组/字典递归，其余按repr
+def _update_hash(h, value):
+    if isinstance(value, np.ndarray):
+        h.update(str(value.dtype).encode() + str(value.shape).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(b"[" + str(len(value)).encode())
+        for v in value:
+            _update_hash(h, v)
+        h.update(b"]")
+    elif isinstance(value, dict):
+        h.update(b"{")
+        for k in sorted(value, key=str):
+            h.update(str(k).encode() + b":")
+            _update_hash(h, value[k])
+        h.update(b"}")
+    else:
+        h.update(repr(value).encode())
+
+
+def data_hash(value):
+    h = hashlib.sha256()
+    _update_hash(h, value)
+    return h.hexdigest()
+
+
+# 问题的签名：(问题类名, 实例集哈希, 评估参数哈希)。
+# 问题接口可以定义fitness_key()返回 (实例数据, 评估参数字典)；否则从实例属性推断：
+# 标量属性（如iter_max、time_max）视为评估参数，数组和列表视为实例数据，其他对象（如提示词）忽略
+def problem_signature(problem):
+    name = type(problem).__module__ + "." + type(problem).__qualname__
+    if hasattr(problem, 'fitness_key'):
+        instances, params = problem.fitness_key()
+    else:
+        instances, params = {}, {}
+        for k, v in sorted(vars(problem).items()):
+            if isinstance(v, (bool, int, float, str)) or v is None:
+                params[k] = v
+            elif isinstance(v, (np.ndarray, list, tuple)):
+                instances[k] = v
+    return name, data_hash(instances), data_hash(params)
+
+
+# 持久化的适应度存储（SQLite），键为 (代码指纹, 问题类名, 实例集哈希, 评估参数哈希)，
+# 保存目标值、各实例得分和评估耗时。同一问题和评估设置下，已评估过的代码（跨运行、续跑和种子）直接复用结果。
+# 只保存评估成功的结果；总大小超过上限时按最久未访问淘汰
+class FitnessStore():
+    def __init__(self, path, signature, max_mb=256):
+        self.path = path  # SQLite文件路径
+        self.problem, self.instances, self.params = signature  # 问题签名，见problem_signature
+        self.max_bytes = None if max_mb is None else int(max_mb * 1024 * 1024)  # 存储的总大小上限
+        self._conn = None  # 按进程懒加载的数据库连接
+        self._pid = None
+        self._lock = threading.Lock()
+
+    # 获取当前进程的数据库连接（fork后的子进程重新连接）
+    def _connect(self):
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS fitness (
+                fingerprint TEXT, problem TEXT, instances TEXT, params TEXT,
+                objective REAL, scores TEXT, runtime REAL,
+                size INTEGER, created REAL, last_access REAL,
+                PRIMARY KEY (fingerprint, problem, instances, params))""")
+            conn.execute("CREATE INDEX IF NOT EXISTS fitness_access ON fitness (last_access)")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _key(self, fingerprint):
+        return (fingerprint, self.problem, self.instances, self.params)
+
+    # 查询代码指纹对应的结果，返回 {'objective', 'scores', 'runtime'}，未命中时返回None
+    def get(self, fingerprint):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("""SELECT objective, scores, runtime FROM fitness
+                WHERE fingerprint=? AND problem=? AND instances=? AND params=?""", self._key(fingerprint)).fetchone()
+            if row is None:
+                return None
+            conn.execute("""UPDATE fitness SET last_access=?
+                WHERE fingerprint=? AND problem=? AND instances=? AND params=?""", (time.time(),) + self._key(fingerprint))
+        return {'objective': row[0], 'scores': None if row[1] is None else json.loads(row[1]), 'runtime': row[2]}
+
+    # 写入一个评估结果，并在超过大小上限时淘汰
+    def put(self, fingerprint, objective, scores=None, runtime=None):
+        if fingerprint is None or objective is None:
+            return
+        scores = None if scores is None else json.dumps([float(s) for s in scores])
+        size = len(fingerprint) + len(self.problem) + 128 + (0 if scores is None else len(scores))
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO fitness VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         self._key(fingerprint) + (float(objective), scores, runtime, size, now, now))
+            self._evict(conn)
+
+    # 使结果失效：指定fingerprint时只删除该代码在当前问题签名下的结果，否则删除当前问题签名下的全部结果；
+    # everything=True时清空整个存储（包括其他问题和设置）。返回删除的条数
+    def invalidate(self, fingerprint=None, everything=False):
+        with self._lock:
+            conn = self._connect()
+            if everything:
+                cursor = conn.execute("DELETE FROM fitness")
+            elif fingerprint is not None:
+                cursor = conn.execute("""DELETE FROM fitness
+                    WHERE fingerprint=? AND problem=? AND instances=? AND params=?""", self._key(fingerprint))
+            else:
+                cursor = conn.execute("DELETE FROM fitness WHERE problem=? AND instances=? AND params=?",
+                                      (self.problem, self.instances, self.params))
+            return cursor.rowcount
+
+    # 按最久未访问的顺序删除结果，直到总大小降到上限的90%以下（调用方需持有锁）
+    def _evict(self, conn):
+        if self.max_bytes is None:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM fitness").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        rows = conn.execute("SELECT rowid, size FROM fitness ORDER BY last_access").fetchall()
+        victims = []
+        for rowid, size in rows:
+            if total <= target:
+                break
+            victims.append((rowid,))
+            total -= size
+        conn.executemany("DELETE FROM fitness WHERE rowid=?", victims)
+
+    # 数据库连接和锁不能被pickle，传到worker进程时重新创建
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pid'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
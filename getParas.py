@@ -16,6 +16,11 @@ class Paras():  # 定义一个参数配置类Paras，用于管理整个算法流
         self.ec_operators = None  # 进化算子列表，默认未设置，后续根据算法自动配置（如['e1','e2','m1','m2']）
         self.ec_m = 2  # 'e1'和'e2'算子使用的父代数量，默认2
         self.ec_operator_weights = None  # 算子的权重（即每次迭代中使用该算子的概率），默认未设置，后续自动设为等概率
+        self.ec_patch_mutation = False  # m1/m2/m3是否只让LLM返回针对父代代码的补丁（SEARCH/REPLACE块或unified diff），本地应用并校验，失败时回退为完整生成
+        self.ec_speculative_k = 0  # 推测生成：每批多启动k个子代任务，按完成顺序收集，凑够ec_pop_size个有效子代后取消其余任务；0表示不启用。只用于逐个子代请求LLM的方式，llm_async和llm_batch_samples时LLM请求全部完成后才开始评估，不多发提示词
+        self.ec_steady_state = False  # 是否使用稳态（异步）进化：保持固定数量的子代任务在途，完成一个插入一个，不再按代同步等待
+        self.ec_in_flight = None  # 稳态模式下同时在途的子代任务数，None表示等于exp_n_proc
+        self.ec_checkpoint_every = None  # 稳态模式下每插入多少个子代保存一次种群，None表示等于ec_pop_size
         
         #####################
         ### LLM settings  ###  # 大语言模型（LLM）相关设置
@@ -25,6 +30,28 @@ class Paras():  # 定义一个参数配置类Paras，用于管理整个算法流
         self.llm_api_endpoint = None  # 远程LLM的API端点，如api.deepseek.com，默认未设置
         self.llm_api_key = None  # 远程LLM的API密钥，如sk-xxxx，默认未设置
         self.llm_model = None  # 远程LLM的模型类型，如deepseek-chat，默认未设置
+        self.llm_pool_size = 4  # 每个进程到同一LLM端点的最大keep-alive连接数
+        self.llm_pool_idle_timeout = 60  # 空闲连接的最长保留时间（秒），超时后关闭
+        self.llm_max_attempts = 5  # 每次LLM调用的最大尝试次数（含第一次）
+        self.llm_backoff_base = 1.0  # 重试退避的基础时间（秒），按指数增长并完全随机抖动
+        self.llm_backoff_max = 60.0  # 单次重试退避的上限（秒）；429响应优先遵循Retry-After
+        self.llm_breaker_threshold = 5  # 同一端点连续失败多少次后打开熔断器
+        self.llm_breaker_reset = 30.0  # 熔断器打开后多久（秒）放行探测请求
+        self.llm_stream = False  # 是否使用流式（SSE）响应，收到完整的描述和函数后提前结束读取
+        self.llm_batch_samples = False  # 是否将提示词相同的子代合并为一次n样本请求（需服务支持n参数，不支持时自动逐个补齐）
+        self.llm_async = False  # 是否用asyncio在单进程内并发发送一代内所有算子的LLM请求
+        self.llm_max_in_flight = 8  # asyncio模式下同时在途的最大请求数
+        self.llm_rpm = None  # 每分钟请求数上限（令牌桶），None表示不限制
+        self.llm_tpm = None  # 每分钟token数上限（令牌桶），None表示不限制
+        self.llm_pacing = True  # 是否自适应控制请求节奏（AIMD）：未遇到429时全速发送，遇到429或延迟超过阈值时降速，之后逐步回升
+        self.llm_pacing_max_rpm = None  # 自适应节奏回升时的速率上限（请求/分钟），None表示不设上限
+        self.llm_pacing_latency = None  # 视为拥塞的LLM请求延迟阈值（秒），None表示只根据429调整
+        self.llm_cache_mode = 'off'  # LLM响应缓存：'off'不使用，'cache'命中复用、未命中请求并记录，'replay'只回放记录不联网
+        self.llm_cache_path = None  # 缓存文件路径，默认为 exp_output_path/results/llm_cache.sqlite
+        self.llm_cache_max_mb = 512  # 缓存文件中响应的总大小上限（MB），超过后按最久未访问淘汰
+        self.llm_health_ttl = 3600  # LLM连接检查结果的有效期（秒），有效期内跳过检查，0表示每次运行开始时都检查
+        self.llm_health_path = None  # 连接检查状态文件路径，默认为 exp_output_path/results/llm_health.json
+        self.llm_prompt_budget = None  # 提示词的token预算，设置后压缩父代代码（去注释和空行）并在超出时截断，静态部分置于开头以利于服务端前缀缓存；None保持原提示词
 
         #####################
         ###  Exp settings  ###  # 实验相关设置
@@ -37,12 +64,25 @@ class Paras():  # 定义一个参数配置类Paras，用于管理整个算法流
         self.exp_continue_id = 0  # 继续运行的起始ID，默认0
         self.exp_continue_path = "./results/pops/population_generation_0.json"  # 继续运行的结果文件路径，默认值
         self.exp_n_proc = 1  # 实验使用的进程数，默认1（并行计算）
+        self.exp_event_log = True  # 是否将每个生成的子代记录到只追加的事件日志 exp_output_path/results/events.jsonl（不续跑时已有的日志改名为events.jsonl.1等保留）
+        self.exp_event_log_fsync = 16  # 事件日志每多少个事件fsync一次（每代结束时总会fsync）
+        self.exp_resume = False  # 是否重放事件日志，从崩溃的位置（包括代中间）继续运行；日志不存在时重新开始
+        self.exp_snapshots = True  # 是否在每代结束时写出种群快照（results/pops和pops_best），关闭后可由事件日志导出
         
         #####################
         ###  Evaluation settings  ###  # 评估相关设置
         #####################
         self.eva_timeout = 30  # 评估的超时时间（秒），默认30
         self.eva_numba_decorator = False  # 是否使用numba装饰器加速评估，默认不使用
+        self.eva_process_pool = False  # 是否在可被强制终止的工作进程中评估（超时即杀死并替换进程），默认使用线程评估
+        self.eva_cpu_limit = None  # 进程评估时单次评估的CPU时间上限（秒，RLIMIT_CPU），None表示不限制
+        self.eva_mem_limit_mb = None  # 进程评估时工作进程的内存上限（MB，RLIMIT_AS），None表示不限制
+        self.eva_race = False  # 竞速评估：种群已满时，子代确定无法进入种群（目标值下界不小于种群最差目标值）后提前停止评估（需问题接口提供evaluate_race）
+        self.eva_race_confidence = None  # 竞速评估的统计提前停止：与种群最差个体的各实例得分做单侧符号检验的置信度（如0.9），None表示只用确定性下界
+        self.eva_fitness_store = False  # 是否使用持久化的适应度存储：同一问题、实例集和评估参数下已评估过的等价代码（跨运行、续跑和种子）直接复用结果
+        self.eva_fitness_store_path = None  # 适应度存储文件路径，默认为 exp_output_path/results/fitness.sqlite
+        self.eva_float_makespan = False  # 问题接口支持时（如JSSPGLS.float_makespan），扰动矩阵按浮点数计算makespan并使用增量内核：更快，但目标值与原实现不同，不能与之前的结果比较
+        self.eva_fitness_store_max_mb = 256  # 适应度存储的总大小上限（MB），超过后按最久未访问淘汰
 
 
     def set_parallel(self):  # 设置并行计算的进程数
@@ -1,11 +1,20 @@
+import multiprocessing
+import threading
+import time
+
 # 从同级目录的llm模块中导入处理远程API和本地LLM的接口类
 from ..llm.api_general import InterfaceAPI
+from ..llm.api_retry import RetryPolicy
 from ..llm.api_local_llm import InterfaceLocalLLM
+from ..llm.api_async import AsyncLLMClient, request_meta
+from ..llm.llm_cache import LLMCache
+from ..llm.llm_health import HealthState, health_key
 
 # 定义一个统一的LLM接口类，用于封装本地和远程LLM的调用逻辑
 class InterfaceLLM:
     # 初始化方法，接收API端点、密钥、模型名称、是否使用本地LLM、本地LLM地址和调试模式等参数
-    def __init__(self, api_endpoint, api_key, model_LLM,llm_use_local,llm_local_url, debug_mode):
+    # 其余LLM相关设置（如连接池大小llm_pool_size）通过kwargs传入
+    def __init__(self, api_endpoint, api_key, model_LLM,llm_use_local,llm_local_url, debug_mode, **kwargs):
         # 将传入的参数赋值给实例变量，用于后续使用
         self.api_endpoint = api_endpoint
         self.api_key = api_key
@@ -13,12 +22,43 @@ class InterfaceLLM:
         self.debug_mode = debug_mode
         self.llm_use_local = llm_use_local
         self.llm_local_url = llm_local_url
+        self.llm_pool_size = kwargs.get('llm_pool_size', 4)  # 每个进程到同一端点的最大连接数
+        self.llm_pool_idle_timeout = kwargs.get('llm_pool_idle_timeout', 60)  # 空闲连接的保留时间（秒）
+        self.llm_async = kwargs.get('llm_async', False)  # 是否使用asyncio并发发送批量请求
+        self.llm_max_in_flight = kwargs.get('llm_max_in_flight', 8)  # 单进程内最大在途请求数
+        self.llm_rpm = kwargs.get('llm_rpm', None)  # 每分钟请求数上限，None表示不限制
+        self.llm_tpm = kwargs.get('llm_tpm', None)  # 每分钟token数上限，None表示不限制
+        self.llm_cache_mode = kwargs.get('llm_cache_mode', 'off')  # 响应缓存模式：'off'、'cache'或'replay'
+        self.llm_stream = kwargs.get('llm_stream', False)  # 是否使用流式响应（可提前结束）
+
+        # 初始化响应缓存，缓存键中的模型名在使用本地LLM时取其URL
+        self.cache = None
+        self.cache_model = str(self.llm_local_url if self.llm_use_local else self.model_LLM)
+        if self.llm_cache_mode in ['cache', 'replay']:
+            self.cache = LLMCache(
+                kwargs.get('llm_cache_path', './llm_cache.sqlite'),
+                self.llm_cache_mode,
+                kwargs.get('llm_cache_max_mb', 512),
+            )
+
+        # 连接健康状态：有效期内验证过的端点不再检查，否则由第一个真实请求兼作检查
+        self.health = HealthState(kwargs.get('llm_health_path', None), kwargs.get('llm_health_ttl', 3600))
+        self.health_key = health_key(
+            self.llm_local_url if self.llm_use_local else self.api_endpoint,
+            self.model_LLM,
+            None if self.llm_use_local else self.api_key,
+        )
 
         # 打印提示信息，指示正在检查LLM API连接
         print("- check LLM API")
 
+        # 回放模式下只使用已记录的响应，不建立任何网络连接
+        if self.llm_cache_mode == 'replay':
+            print('replay recorded llm responses from ' + self.cache.path + ' ...')
+            self.interface_llm = None
+
         # 如果设置为使用本地LLM
-        if self.llm_use_local:
+        elif self.llm_use_local:
             # 打印提示信息，说明正在使用本地LLM部署
             print('local llm delopyment is used ...')
             
@@ -42,26 +82,161 @@ class InterfaceLLM:
                 print(">> Stop with wrong API setting: Set api_endpoint (e.g., api.chat...) and api_key (e.g., kx-...) !")
                 exit()
 
-            # 初始化远程API接口实例，传入API端点、密钥、模型名称和调试模式
+            # 初始化远程API接口实例，传入API端点、密钥、模型名称、调试模式和连接池设置
             self.interface_llm = InterfaceAPI(
                 self.api_endpoint,
                 self.api_key,
                 self.model_LLM,
                 self.debug_mode,
+                pool_size=max(self.llm_pool_size, self.llm_max_in_flight if self.llm_async else 0),
+                pool_idle_timeout=self.llm_pool_idle_timeout,
+                retry_policy=RetryPolicy(
+                    kwargs.get('llm_max_attempts', 5),
+                    kwargs.get('llm_backoff_base', 1.0),
+                    kwargs.get('llm_backoff_max', 60.0),
+                ),
+                breaker_threshold=kwargs.get('llm_breaker_threshold', 5),
+                breaker_reset=kwargs.get('llm_breaker_reset', 30.0),
+                stream=self.llm_stream,
+                pacing=kwargs.get('llm_pacing', True),
+                pacing_max_rpm=kwargs.get('llm_pacing_max_rpm', None),
+                pacing_latency=kwargs.get('llm_pacing_latency', None),
             )
 
-        # 发送一个简单的"1+1=?"请求来测试LLM连接是否正常
-        res = self.interface_llm.get_response("1+1=?")
+        # 回放模式无需检查；其余情况由主进程在分发任务前同步发送的第一个真实生成请求兼作检查（最近检查过时跳过），
+        # 检查结果随对象一起传到worker进程
+        self.health_verified = self.interface_llm is None or self.health.is_verified(self.health_key)
+        if self.health_verified and self.interface_llm is not None:
+            print('llm api verified recently, skip check ...')
 
-        # 如果测试响应为空，说明LLM连接存在问题，打印错误信息并退出程序
-        if res == None:
-            print(">> Error in LLM API, wrong endpoint, key, model or local deployment!")
-            exit()
+        # asyncio并发客户端，仅在批量请求时使用
+        self.async_client = None
+        if self.llm_async:
+            self.async_client = AsyncLLMClient(self, self.llm_max_in_flight, self.llm_rpm, self.llm_tpm)
 
     # 定义获取响应的方法，接收提示词内容并返回LLM的响应结果
-    def get_response(self, prompt_content):
-        # 调用内部封装的LLM接口（本地或远程）的get_response方法获取响应
-        response = self.interface_llm.get_response(prompt_content)
+    # stop_when(已接收内容)用于流式响应的提前结束判断，非流式接口忽略该参数
+    def get_response(self, prompt_content, stop_when=None):
+        # 获取响应（可能来自缓存），忽略token用量
+        response = self.get_completion(prompt_content, stop_when)[0]
 
         # 返回获取到的响应
         return response
+
+    # 获取响应及token用量：先查缓存，未命中时请求LLM并写入缓存；缓存命中时用量为None
+    def get_completion(self, prompt_content, stop_when=None):
+        if self.cache is None:
+            return self._request(prompt_content, stop_when)
+
+        key = self.cache.prompt_hash(prompt_content)
+        idx = self.cache.next_index(self.cache_model, key)
+        response = self.cache.get(self.cache_model, key, idx)
+        if response is not None:
+            return response, None
+
+        if self.llm_cache_mode == 'replay':
+            return self._replay(key, idx), None
+
+        response, usage = self._request(prompt_content, stop_when)
+        if response is not None:
+            self.cache.put(self.cache_model, key, idx, response)
+        return response, usage
+
+    # 获取同一提示词的n个样本，返回 (响应列表, 用量)，列表中失败的样本为None
+    # 缓存命中的样本直接复用，其余通过一次n样本请求获取；服务器返回的样本不足时继续补齐
+    # stop_when只用于单样本请求（n样本请求不使用流式）
+    def get_completions(self, prompt_content, n=1, stop_when=None):
+        if n == 1:
+            response, usage = self.get_completion(prompt_content, stop_when)
+            return [response], usage
+
+        responses = [None] * n
+        if self.cache is not None:
+            key = self.cache.prompt_hash(prompt_content)
+            idxs = [self.cache.next_index(self.cache_model, key) for _ in range(n)]
+            responses = [self.cache.get(self.cache_model, key, idx) for idx in idxs]
+            if self.llm_cache_mode == 'replay':
+                return [r if r is not None else self._replay(key, idx) for r, idx in zip(responses, idxs)], None
+
+        missing = [i for i in range(n) if responses[i] is None]
+        usage = None
+        if missing:
+            fetched, usage = self._request_n(prompt_content, len(missing))
+            while 0 < len(fetched) < len(missing):
+                extra, _ = self._request_n(prompt_content, len(missing) - len(fetched))
+                if not extra:
+                    break
+                fetched += extra
+            for i, response in zip(missing, fetched):
+                responses[i] = response
+                if self.cache is not None and response is not None:
+                    self.cache.put(self.cache_model, key, idxs[i], response)
+        return responses, usage
+
+    # 回放模式：返回第idx个记录的样本，记录的样本数少于请求次数时循环复用已有样本
+    def _replay(self, key, idx):
+        n_recorded = self.cache.count(self.cache_model, key)
+        if n_recorded == 0:
+            if self.debug_mode:
+                print("Replay miss: prompt not recorded, return None")
+            return None
+        return self.cache.get(self.cache_model, key, idx % n_recorded)
+
+    # 调用内部封装的LLM接口（本地或远程），底层接口不提供用量时返回None
+    def _request(self, prompt_content, stop_when=None):
+        if hasattr(self.interface_llm, 'get_completion'):
+            response, usage = self.interface_llm.get_completion(prompt_content, stop_when)
+        else:
+            response, usage = self.interface_llm.get_response(prompt_content), None
+        self._check_health(response is not None)
+        return response, usage
+
+    # 向底层接口请求n个样本，返回 (响应列表, 用量)；不支持n参数的接口逐个请求
+    def _request_n(self, prompt_content, n):
+        if n == 1:
+            response, usage = self._request(prompt_content)
+            return ([] if response is None else [response]), usage
+        if hasattr(self.interface_llm, 'get_completions'):
+            responses, usage = self.interface_llm.get_completions(prompt_content, n)
+        else:
+            responses, usage = [self.interface_llm.get_response(prompt_content) for _ in range(n)], None
+        responses = [r for r in responses if r is not None]
+        self._check_health(len(responses) > 0)
+        return responses, usage
+
+    # 连接检查：未验证时请求成功则记录到状态文件；请求失败说明配置有误，只在主进程的主线程中（分发任务前的
+    # 第一个生成请求）打印错误信息并退出程序，worker进程和线程中的失败只丢弃当前子代（其他进程可能已经成功，见状态文件）
+    def _check_health(self, ok):
+        if self.health_verified:
+            return
+        if ok:
+            self.health.mark_verified(self.health_key)
+            self.health_verified = True
+            return
+        if multiprocessing.parent_process() is not None or threading.current_thread() is not threading.main_thread():
+            return
+        if self.health.is_verified(self.health_key):
+            self.health_verified = True
+            return
+        print(">> Error in LLM API, wrong endpoint, key, model or local deployment!")
+        exit()
+
+    # 批量获取响应：启用asyncio时并发发送，否则依次发送；返回与prompts顺序一致的响应列表
+    def get_responses(self, prompts):
+        return [samples[0] for samples in self.get_samples(prompts)]
+
+    # 批量获取多样本响应：第i个提示词请求counts[i]个样本（默认1个），返回与prompts顺序一致的响应列表的列表
+    # 传入列表meta时，按相同顺序追加每个请求的延迟和token用量；stop_when见get_completion
+    def get_samples(self, prompts, counts=None, meta=None, stop_when=None):
+        if counts is None:
+            counts = [1] * len(prompts)
+        if self.async_client is not None:
+            return self.async_client.get_samples(prompts, counts, meta, stop_when)
+        samples = []
+        for p, n in zip(prompts, counts):
+            time_start = time.monotonic()
+            responses, usage = self.get_completions(p, n, stop_when)
+            samples.append(responses)
+            if meta is not None:
+                meta.append(request_meta(time.monotonic() - time_start, usage))
+        return samples
@@ -0,0 +1,143 @@
+# 导入哈希、文件路径、SQLite、线程同步、时间和唯一ID相关的模块
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+# 基于内容寻址的LLM响应缓存，存储在本地SQLite文件中
+# 键为 (模型, 提示词哈希, 样本序号)：同一次运行中同一提示词第k次请求对应第k个样本，
+# 因此重复的提示词仍能得到不同的响应，重新运行时则按相同顺序复用
+# mode='cache'：命中则直接返回，未命中时请求LLM并写入缓存
+# mode='replay'：严格回放，从不访问网络，未命中时返回None
+# 样本计数按会话记录在draws表中；超过session_ttl秒没有领取样本的会话（已结束或崩溃的运行）
+# 的计数在连接时删除，因此draws表不会随运行次数无限增长
+class LLMCache():
+    def __init__(self, path, mode='cache', max_mb=512, session=None, session_ttl=7 * 24 * 3600):
+        self.path = path  # SQLite文件路径
+        self.mode = mode  # 缓存模式：'cache' 或 'replay'
+        self.max_bytes = None if max_mb is None else int(max_mb * 1024 * 1024)  # 缓存响应的总大小上限
+        # 会话ID：用于在多个worker进程之间共享“同一提示词已请求次数”的计数
+        self.session = session if session is not None else uuid.uuid4().hex
+        self.session_ttl = session_ttl  # 会话计数的保留时间（秒）
+        self._conn = None  # 按进程懒加载的数据库连接
+        self._pid = None
+        self._lock = threading.Lock()
+
+    # 计算提示词的哈希值
+    @staticmethod
+    def prompt_hash(prompt_content):
+        return hashlib.sha256(prompt_content.encode("utf-8")).hexdigest()
+
+    # 获取当前进程的数据库连接（fork后的子进程重新连接）
+    def _connect(self):
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                model TEXT, prompt_hash TEXT, sample_idx INTEGER, response TEXT,
+                size INTEGER, created REAL, last_access REAL,
+                PRIMARY KEY (model, prompt_hash, sample_idx))""")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_access ON responses (last_access)")
+            conn.execute("""CREATE TABLE IF NOT EXISTS draws (
+                session TEXT, model TEXT, prompt_hash TEXT, n INTEGER,
+                PRIMARY KEY (session, model, prompt_hash))""")
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions (session TEXT PRIMARY KEY, last_seen REAL)")
+            self._evict_sessions(conn)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    # 原子地领取下一个样本序号（跨进程共享计数）
+    def next_index(self, model, key):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT n FROM draws WHERE session=? AND model=? AND prompt_hash=?",
+                                   (self.session, model, key)).fetchone()
+                idx = 0 if row is None else row[0]
+                conn.execute("INSERT OR REPLACE INTO draws (session, model, prompt_hash, n) VALUES (?, ?, ?, ?)",
+                             (self.session, model, key, idx + 1))
+                conn.execute("INSERT OR REPLACE INTO sessions (session, last_seen) VALUES (?, ?)", (self.session, time.time()))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return idx
+
+    # 查询某个样本，命中时更新访问时间（用于LRU淘汰）
+    def get(self, model, key, idx):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM responses WHERE model=? AND prompt_hash=? AND sample_idx=?",
+                               (model, key, idx)).fetchone()
+            if row is None:
+                return None
+            if self.mode != 'replay':
+                conn.execute("UPDATE responses SET last_access=? WHERE model=? AND prompt_hash=? AND sample_idx=?",
+                             (time.time(), model, key, idx))
+            return row[0]
+
+    # 已记录的某提示词的样本数量
+    def count(self, model, key):
+        with self._lock:
+            row = self._connect().execute("SELECT COUNT(*) FROM responses WHERE model=? AND prompt_hash=?",
+                                          (model, key)).fetchone()
+            return row[0]
+
+    # 写入一个样本，并在超过大小上限时淘汰
+    def put(self, model, key, idx, response):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (model, key, idx, response, len(response.encode("utf-8")), now, now))
+            self._evict(conn)
+
+    # 按最久未访问的顺序删除样本，直到总大小降到上限的90%以下（调用方需持有锁）
+    def _evict(self, conn):
+        if self.max_bytes is None:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        rows = conn.execute("SELECT rowid, size FROM responses ORDER BY last_access").fetchall()
+        victims = []
+        for rowid, size in rows:
+            if total <= target:
+                break
+            victims.append((rowid,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE rowid=?", victims)
+
+    # 删除过期会话的计数（没有会话记录的计数同样视为过期）
+    def _evict_sessions(self, conn):
+        if self.session_ttl is None:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM sessions WHERE last_seen < ?", (time.time() - self.session_ttl,))
+            conn.execute("DELETE FROM draws WHERE session NOT IN (SELECT session FROM sessions)")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # 数据库连接和锁不能被pickle，传到worker进程时重新创建
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pid'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,54 @@
+# 导入哈希、JSON、文件系统和时间相关的模块
+import hashlib
+import json
+import os
+import time
+
+
+# 默认的健康状态文件（EOH默认放在实验的结果目录下，见getParas的llm_health_path）
+DEFAULT_HEALTH_PATH = "./llm_health.json"
+
+
+# 生成健康检查的键：端点+模型+密钥摘要（不记录明文密钥，更换密钥后需要重新验证）
+def health_key(endpoint, model, api_key=None):
+    key_digest = hashlib.sha256(str(api_key).encode("utf-8")).hexdigest()[:12]
+    return f"{endpoint}|{model}|{key_digest}"
+
+
+# LLM连接健康状态：记录每个端点最近一次成功请求的时间，在ttl秒内视为可用，
+# 从而跳过连接检查；否则由第一个真实的生成请求兼作连接检查
+class HealthState():
+    def __init__(self, path=None, ttl=3600):
+        self.path = path or DEFAULT_HEALTH_PATH  # 状态文件路径
+        self.ttl = ttl  # 成功结果的有效期（秒），0表示不使用文件缓存
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    # 该端点是否在有效期内验证过
+    def is_verified(self, key):
+        if not self.ttl:
+            return False
+        verified_at = self._load().get(key)
+        return verified_at is not None and time.time() - verified_at < self.ttl
+
+    # 记录一次成功请求；先写临时文件再替换，多个进程同时写入时不会产生损坏的文件
+    def mark_verified(self, key):
+        if not self.ttl:
+            return
+        try:
+            state = self._load()
+            now = time.time()
+            state = {k: t for k, t in state.items() if now - t < self.ttl}
+            state[key] = now
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
@@ -0,0 +1,304 @@
+# 本地LLM替身服务：实现 /v1/chat/completions 协议，从内置语料生成启发式代码（补丁提示词返回SEARCH/REPLACE块），
+# 可配置延迟、错误率和限流行为，用于在离线环境中端到端地压测EoH（并发、重试、缓存等）
+#
+# 用法：
+#   python -m eoh.llm.llm_server --port 8000 --latency 0.5 --error-rate 0.05 --rpm 120
+# 然后设置 llm_api_endpoint = "http://127.0.0.1:8000", llm_api_key = "local", llm_model = "stand-in"
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# 语料：每个目标函数名对应若干启发式模板，@A@/@B@/@K@ 为可变参数占位符
+CORPUS = {
+    'update_edge_distance': [
+        ("Penalize every edge of the local optimum proportionally to its length and inversely to its usage count.",
+         """import numpy as np
+def update_edge_distance(edge_distance, local_opt_tour, edge_n_used):
+    updated_edge_distance = np.copy(edge_distance)
+    for i in range(len(local_opt_tour) - 1):
+        a, b = local_opt_tour[i], local_opt_tour[i + 1]
+        penalty = @A@ * edge_distance[a, b] / (1.0 + edge_n_used[a, b])
+        updated_edge_distance[a, b] += penalty
+        updated_edge_distance[b, a] += penalty
+    return updated_edge_distance"""),
+        ("Scale the distances of the local optimum edges by a factor that grows with how often each edge was used.",
+         """import numpy as np
+def update_edge_distance(edge_distance, local_opt_tour, edge_n_used):
+    updated_edge_distance = np.copy(edge_distance)
+    for i in range(len(local_opt_tour) - 1):
+        a, b = local_opt_tour[i], local_opt_tour[i + 1]
+        factor = 1.0 + @A@ * np.log1p(edge_n_used[a, b] + @B@)
+        updated_edge_distance[a, b] = edge_distance[a, b] * factor
+        updated_edge_distance[b, a] = edge_distance[b, a] * factor
+    return updated_edge_distance"""),
+        ("Add a penalty to the longest edges of the local optimum relative to the mean edge length of the tour.",
+         """import numpy as np
+def update_edge_distance(edge_distance, local_opt_tour, edge_n_used):
+    updated_edge_distance = np.copy(edge_distance)
+    a = local_opt_tour[:-1]
+    b = local_opt_tour[1:]
+    lengths = edge_distance[a, b]
+    mean_length = np.mean(lengths)
+    for k in np.argsort(-lengths)[:@K@]:
+        penalty = @A@ * mean_length + @B@ * edge_n_used[a[k], b[k]]
+        updated_edge_distance[a[k], b[k]] += penalty
+        updated_edge_distance[b[k], a[k]] += penalty
+    return updated_edge_distance"""),
+    ],
+    'get_matrix_and_jobs': [
+        ("Inflate processing times on the most loaded machines and perturb the jobs with the largest inflated totals.",
+         """import numpy as np
+def get_matrix_and_jobs(current_sequence, time_matrix, m, n):
+    machine_load = time_matrix.sum(axis=0)
+    scale = 1.0 + @A@ * machine_load / machine_load.max()
+    new_matrix = time_matrix * scale
+    job_score = new_matrix.sum(axis=1)
+    perturb_jobs = list(np.argsort(-job_score)[:@K@])
+    return new_matrix, perturb_jobs"""),
+        ("Add random noise proportional to each processing time and perturb the jobs whose total time changed most.",
+         """import numpy as np
+def get_matrix_and_jobs(current_sequence, time_matrix, m, n):
+    rng = np.random.default_rng(len(current_sequence))
+    noise = rng.uniform(1.0 - @B@, 1.0 + @A@, size=time_matrix.shape)
+    new_matrix = time_matrix * noise
+    change = np.abs(new_matrix - time_matrix).sum(axis=1)
+    perturb_jobs = list(np.argsort(-change)[:@K@])
+    return new_matrix, perturb_jobs"""),
+        ("Penalize the jobs at the end of the current sequence and perturb the jobs placed there.",
+         """import numpy as np
+def get_matrix_and_jobs(current_sequence, time_matrix, m, n):
+    new_matrix = time_matrix.copy()
+    tail = list(current_sequence[-@K@:])
+    for job in tail:
+        new_matrix[job] = new_matrix[job] * (1.0 + @A@)
+    perturb_jobs = tail
+    return new_matrix, perturb_jobs"""),
+    ],
+}
+
+
+# 从提示词中识别目标函数名、输入和输出（对应Evolution中提示词的固定句式）
+def parse_prompt(prompt):
+    name = re.search(r"function named (\w+)", prompt) or re.search(r"def\s+(\w+)\s*\(", prompt)
+    inputs = re.search(r"input\(s\): (.*?)\. The function should return", prompt)
+    outputs = re.search(r"output\(s\): (.*?)\. ", prompt)
+    return (
+        name.group(1) if name else None,
+        re.findall(r"'(\w+)'", inputs.group(1)) if inputs else [],
+        re.findall(r"'(\w+)'", outputs.group(1)) if outputs else [],
+    )
+
+
+# 补丁提示词（父代代码带行号）：修改父代中第一个带小数常量的行，以SEARCH/REPLACE块返回；
+# 父代中没有可修改的常量时返回None，由调用方改为生成完整的启发式
+def make_patch(prompt, rng):
+    lines = re.findall(r"^\s*\d+\| (.*)$", prompt, re.MULTILINE)
+    for line in lines:
+        match = re.search(r"\d+\.\d+", line)
+        if match:
+            value = float(match.group(0)) * rng.uniform(0.5, 1.5)
+            new_line = line[:match.start()] + f"{value:.3f}" + line[match.end():]
+            return "{Rescale the constant " + match.group(0) + " of the parent to " + f"{value:.3f}" + ".}\n" \
+                "<<<<<<< SEARCH\n" + line + "\n=======\n" + new_line + "\n>>>>>>> REPLACE\n"
+    return None
+
+
+# 根据提示词和随机数生成器产生一个启发式（描述+代码）
+def make_heuristic(prompt, rng):
+    name, inputs, outputs = parse_prompt(prompt)
+    if name in CORPUS:
+        description, template = rng.choice(CORPUS[name])
+        code = (template
+                .replace("@A@", f"{rng.uniform(0.05, 1.0):.3f}")
+                .replace("@B@", f"{rng.uniform(0.0, 0.5):.3f}")
+                .replace("@K@", str(rng.randint(2, 5))))
+        return description, code
+    # 未知函数：返回一个原样输出输入的占位实现
+    name = name or "heuristic"
+    inputs = inputs or ["x"]
+    outputs = outputs or ["y"]
+    body = "\n".join(f"    {out} = {inputs[min(i, len(inputs) - 1)]}" for i, out in enumerate(outputs))
+    code = f"def {name}({', '.join(inputs)}):\n{body}\n    return {', '.join(outputs)}"
+    return "Return the inputs unchanged.", code
+
+
+# 替身服务的状态：延迟、错误率、限流配置，以及每个提示词的请求计数（保证确定性）
+class StandInState():
+    def __init__(self, seed=2024, latency=0.0, jitter=0.0, error_rate=0.0, rpm=None, chunk_size=16):
+        self.seed = seed  # 全局随机种子
+        self.latency = latency  # 每个请求的平均延迟（秒）
+        self.jitter = jitter  # 延迟的随机波动范围（秒）
+        self.error_rate = error_rate  # 返回500错误的概率
+        self.rpm = rpm  # 每分钟允许的请求数，超出返回429，None表示不限制
+        self.chunk_size = chunk_size  # 流式响应每个分块的字符数
+        self.counts = {}  # 提示词哈希 -> 已生成的样本数
+        self.window = []  # 最近一分钟内被接受请求的时间
+        self.n_requests = 0  # 总请求数
+        self.n_throttled = 0  # 429次数
+        self.n_errors = 0  # 500次数
+        self.lock = threading.Lock()
+
+    # 为某个提示词领取一个确定性的随机数生成器（第k次请求对应第k个样本）
+    def next_rng(self, prompt):
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self.lock:
+            k = self.counts.get(key, 0)
+            self.counts[key] = k + 1
+        return random.Random(f"{self.seed}:{key}:{k}")
+
+    # 限流判断，返回需要等待的秒数（0表示放行）
+    def throttle(self):
+        with self.lock:
+            self.n_requests += 1
+            if not self.rpm:
+                return 0.0
+            now = time.monotonic()
+            self.window = [t for t in self.window if now - t < 60.0]
+            if len(self.window) >= self.rpm:
+                self.n_throttled += 1
+                return 60.0 - (now - self.window[0])
+            self.window.append(now)
+            return 0.0
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持keep-alive
+    state = None  # StandInState，由make_server设置
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, obj, extra_headers=None):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        state = self.state
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+            prompt = request["messages"][-1]["content"]
+        except (ValueError, KeyError, IndexError):
+            self._send_json(400, {"error": {"message": "invalid request"}})
+            return
+        if not self.path.rstrip("/").endswith("/v1/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        wait = state.throttle()
+        if wait > 0:
+            self._send_json(429, {"error": {"message": "rate limited"}}, {"Retry-After": f"{wait:.2f}"})
+            return
+
+        rng = state.next_rng(prompt)
+        delay = max(0.0, state.latency + rng.uniform(-state.jitter, state.jitter))
+        time.sleep(delay)
+        if rng.random() < state.error_rate:
+            with state.lock:
+                state.n_errors += 1
+            self._send_json(500, {"error": {"message": "injected error"}})
+            return
+
+        # 生成n个样本：第一个使用本次请求的随机数生成器，其余各自领取
+        n = max(1, int(request.get("n", 1)))
+        contents = []
+        for i in range(n):
+            if prompt.strip() == "1+1=?":
+                contents.append("2")
+                continue
+            sample_rng = rng if i == 0 else state.next_rng(prompt)
+            patch = make_patch(prompt, sample_rng) if ">>>>>>> REPLACE" in prompt else None
+            if patch is not None:
+                contents.append(patch)
+                continue
+            description, code = make_heuristic(prompt, sample_rng)
+            contents.append("{" + description + "}\n```python\n" + code + "\n```\n"
+                            "The heuristic above follows the requested signature.")
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = sum(len(c) // 4 + 1 for c in contents)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        model = request.get("model", "stand-in")
+
+        if request.get("stream") and n == 1:
+            self._stream(contents[0], model, usage)
+            return
+        self._send_json(200, {
+            "id": "standin-" + hashlib.md5(prompt.encode("utf-8")).hexdigest()[:12],
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{"index": i, "message": {"role": "assistant", "content": c}, "finish_reason": "stop"}
+                        for i, c in enumerate(contents)],
+            "usage": usage,
+        })
+
+    # 以SSE分块返回内容，客户端提前断开时安静地结束
+    def _stream(self, content, model, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        size = self.state.chunk_size
+        events = [{"choices": [{"index": 0, "delta": {"content": content[i:i + size]}}], "model": model}
+                  for i in range(0, len(content), size)]
+        events.append({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage})
+        try:
+            for event in events:
+                self._write_chunk(b"data: " + json.dumps(event).encode("utf-8") + b"\n\n")
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+# 创建替身服务（port=0时自动选择空闲端口），返回 (server, state)
+def make_server(host="127.0.0.1", port=0, **state_kwargs):
+    state = StandInState(**state_kwargs)
+    handler = type("BoundStandInHandler", (StandInHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server, state
+
+
+# 在后台线程中启动替身服务，返回 (server, 端点URL)，用完后调用 server.shutdown()
+def serve_in_background(host="127.0.0.1", port=0, **state_kwargs):
+    server, _ = make_server(host, port, **state_kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deterministic local stand-in for /v1/chat/completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an HTTP 500 response")
+    parser.add_argument("--rpm", type=int, default=None, help="requests per minute before HTTP 429")
+    args = parser.parse_args()
+
+    server, state = make_server(args.host, args.port, seed=args.seed, latency=args.latency,
+                                jitter=args.jitter, error_rate=args.error_rate, rpm=args.rpm)
+    print(f"LLM stand-in listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"requests: {state.n_requests}, throttled: {state.n_throttled}, errors: {state.n_errors}")
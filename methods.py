@@ -40,6 +40,9 @@ class Methods():
             from .ael.ael import AEL  # 导入AEL算法
             return AEL(self.paras, self.problem, self.select, self.manage)
         elif self.paras.method == "eoh":
+            if self.paras.ec_steady_state:
+                from .eoh.eoh_steady import EOHSteady  # 导入稳态（异步）EOH算法
+                return EOHSteady(self.paras, self.problem, self.select, self.manage)
             from .eoh.eoh import EOH  # 导入EOH算法
             return EOH(self.paras, self.problem, self.select, self.manage)
         elif self.paras.method in ['ls', 'sa']:
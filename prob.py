@@ -9,6 +9,17 @@ import random
 import types
 import warnings
 import sys
+from math import comb
+
+# 导入实例缓存使用的哈希、JSON和文件系统相关的库
+import hashlib
+import json
+import os
+
+# 导入实例级并行使用的序列化、信号和prctl调用相关的库
+import pickle
+import signal
+import ctypes
 
 # 导入numba相关的警告类，用于过滤特定警告
 from numba.core.errors import NumbaDeprecationWarning, NumbaPendingDeprecationWarning
@@ -21,6 +32,7 @@ warnings.simplefilter('ignore', category=NumbaPendingDeprecationWarning)
 warnings.filterwarnings("ignore", message="loaded more than 1 DLL from .libs", category=UserWarning)
 
 # 使用numba的jit装饰器加速makespan函数，该函数计算调度方案的最大完工时间
+# 注意：机器时间为整数列表，非整数的（扰动后的）处理时间每次累加都会被截断；原实现（legacy）依赖这一行为，保持不变
 @jit(nopython=True)
 def makespan(order, tasks, machines_val):
     # 初始化每个机器的时间为0
@@ -39,6 +51,26 @@ def makespan(order, tasks, machines_val):
     # 返回最大完工时间（所有机器中最大的时间）
     return max(times)
 
+# 使用预分配的缓冲区times（长度machines_val的float64数组）计算最大完工时间，不分配内存；
+# 与makespan不同，非整数的处理时间按浮点数累加（与增量内核的计算一致），用于增量实现的整数矩阵，
+# 以及开启float_makespan时的扰动矩阵
+@jit(nopython=True)
+def makespan_into(order, tasks, machines_val, times):
+    # 初始化每个机器的时间为0
+    for i in range(0, machines_val):
+        times[i] = 0.0
+    # 遍历作业序列，更新每个机器的时间
+    for j in order:
+        # 第一个机器的时间直接累加当前作业的处理时间
+        times[0] += tasks[j, 0]
+        # 后续机器的时间取前一个机器完成时间和当前机器已有时间的最大值，再累加当前作业处理时间
+        for k in range(1, machines_val):
+            if times[k] < times[k-1]:
+                times[k] = times[k-1]
+            times[k] += tasks[j, k]
+    # 返回最大完工时间（所有机器中最大的时间）
+    return times.max()
+
 # 使用numba加速局部搜索函数，通过交换或移动作业位置优化调度方案
 @jit(nopython=True)
 def local_search(sequence, cmax_old,tasks,machines_val):
@@ -98,12 +130,211 @@ def local_search_perturb(sequence, cmax_old,tasks,machines_val,job):
     # 返回优化后的序列
     return new_seq
 
+# 序列的头部矩阵：e[t]为序列前t个作业在各机器上的完工时间（e[0]为0）
+@jit(nopython=True)
+def head_matrix(seq, n, tasks, machines_val, e):
+    for l in range(machines_val):
+        e[0, l] = 0.0
+    for t in range(1, n + 1):
+        for l in range(machines_val):
+            left = e[t, l - 1] if l > 0 else 0.0
+            e[t, l] = max(e[t - 1, l], left) + tasks[seq[t - 1], l]
+
+# 序列的尾部矩阵：q[t]为从序列第t个作业（0起）开始到最后一个作业结束所需的最短时间（q[n]为0）
+@jit(nopython=True)
+def tail_matrix(seq, n, tasks, machines_val, q):
+    for l in range(machines_val):
+        q[n, l] = 0.0
+    for t in range(n - 1, -1, -1):
+        for l in range(machines_val - 1, -1, -1):
+            right = q[t, l + 1] if l < machines_val - 1 else 0.0
+            q[t, l] = max(q[t + 1, l], right) + tasks[seq[t], l]
+
+# 增量的交换邻域：依次尝试交换位置i（positions中的每个位置）和其后的每个位置j，改进即接受（与local_search相同的顺序）。
+# 候选解的最大完工时间由头部e[i]出发只正向计算被交换的区间i..j，再与尾部q[j+1]合并，O((j-i)·m)；
+# 头部和尾部矩阵只在接受移动后重建。返回最终的最大完工时间
+@jit(nopython=True)
+def swap_pass(seq, cmax_old, tasks, machines_val, positions, e, q, c):
+    n = len(seq)
+    dirty = True
+    for i in positions:
+        if i >= n:
+            continue
+        for j in range(i + 1, n):
+            if dirty:
+                head_matrix(seq, n, tasks, machines_val, e)
+                tail_matrix(seq, n, tasks, machines_val, q)
+                dirty = False
+            for l in range(machines_val):
+                c[l] = e[i, l]
+            # 被交换后的区间：seq[j], seq[i+1..j-1], seq[i]
+            for t in range(i, j + 1):
+                job = seq[j] if t == i else (seq[i] if t == j else seq[t])
+                for l in range(machines_val):
+                    left = c[l - 1] if l > 0 else 0.0
+                    c[l] = max(c[l], left) + tasks[job, l]
+            cmax = 0.0
+            for l in range(machines_val):
+                if c[l] + q[j + 1, l] > cmax:
+                    cmax = c[l] + q[j + 1, l]
+            if cmax < cmax_old:
+                seq[i], seq[j] = seq[j], seq[i]
+                cmax_old = cmax
+                dirty = True
+    return cmax_old
+
+# 增量的插入邻域：依次将jobs中的每个作业（按作业编号）移出序列，尝试插入到位置1..n-1，改进即接受（与local_search相同的顺序）。
+# 移出作业后的序列对所有插入位置都相同，只需计算一次它的头部和尾部矩阵，之后每个插入位置O(m)（Taillard）。
+# 作业不在序列中时抛出ValueError（与list.remove相同）。返回最终的最大完工时间
+@jit(nopython=True)
+def insert_pass(seq, cmax_old, tasks, machines_val, jobs, e, q, r):
+    n = len(seq)
+    for job in jobs:
+        pos = -1
+        for t in range(n):
+            if seq[t] == job:
+                pos = t
+                break
+        if pos < 0:
+            raise ValueError("job not in sequence")
+        # 移出作业后的序列r及其头部和尾部矩阵
+        k = 0
+        for t in range(n):
+            if t != pos:
+                r[k] = seq[t]
+                k += 1
+        head_matrix(r, n - 1, tasks, machines_val, e)
+        tail_matrix(r, n - 1, tasks, machines_val, q)
+        best = pos
+        for j in range(1, n):
+            cmax = 0.0
+            f = 0.0
+            for l in range(machines_val):
+                f = max(e[j, l], f) + tasks[job, l]
+                if f + q[j, l] > cmax:
+                    cmax = f + q[j, l]
+            if cmax < cmax_old:
+                best = j
+                cmax_old = cmax
+        # 把作业插回最后一次接受的位置
+        if best != pos:
+            k = 0
+            for t in range(n):
+                if t == best:
+                    seq[t] = job
+                else:
+                    seq[t] = r[k]
+                    k += 1
+    return cmax_old
+
+# 局部搜索的预分配缓冲区（n个作业、m台机器）：头部矩阵e、尾部矩阵q、机器时间c、移出作业后的序列r、位置0..n-1
+def scratch_buffers(n, machines_val):
+    return (np.zeros((n + 1, machines_val)), np.zeros((n + 1, machines_val)), np.zeros(machines_val),
+            np.zeros(max(n - 1, 1), dtype=np.int32), np.arange(n, dtype=np.int32))
+
+# 增量实现的local_search：先交换邻域，再插入邻域，接受移动的顺序与local_search相同，
+# 每遍O(n³·m/6)（交换）+ O(n²·m)（插入），原实现为O(n³·m)且每个候选解都复制列表。
+# 直接修改序列seq（int32数组），缓冲区见scratch_buffers，不分配内存。返回最终的最大完工时间
+@jit(nopython=True)
+def local_search_incremental(seq, cmax_old, tasks, machines_val, e, q, c, r, positions):
+    cmax_old = swap_pass(seq, cmax_old, tasks, machines_val, positions, e, q, c)
+    return insert_pass(seq, cmax_old, tasks, machines_val, positions[1:], e, q, r)
+
+# 增量实现的local_search_perturb：只对job中的位置做交换、只移动job中的作业
+@jit(nopython=True)
+def local_search_perturb_incremental(seq, cmax_old, tasks, machines_val, job, e, q, c, r):
+    cmax_old = swap_pass(seq, cmax_old, tasks, machines_val, job, e, q, c)
+    return insert_pass(seq, cmax_old, tasks, machines_val, job, e, q, r)
+
+# 在实例tasks的前两个作业上调用一次gls_instance用到的全部内核，参数类型与实际搜索相同（实例矩阵本身的类型，
+# 如缓存的只读内存映射；float64的扰动矩阵；整数和浮点数的cmax），使它们在当前进程中完成编译。
+# fork子进程之前调用，子进程直接继承编译结果，不再各自编译；numba按参数类型分派，已编译时只需调用一次的时间
+def compile_kernels(tasks, machines_val, ls_kernel, float_makespan):
+    tasks = tasks[:2]
+    perturbed = np.ascontiguousarray(tasks, dtype=np.float64)
+    seq, cmax = neh_taillard(np.array([1, 0], dtype=np.int32), np.ascontiguousarray(tasks), machines_val)
+    jobs = np.array([0, 1], dtype=np.int32)
+    buffers = scratch_buffers(2, machines_val)
+    for cmax_old in (int(cmax), float(cmax)):
+        if ls_kernel == 'legacy':
+            local_search(seq.tolist(), cmax_old, tasks, machines_val)
+        else:
+            local_search_incremental(seq, cmax_old, tasks, machines_val, *buffers)
+        if ls_kernel != 'legacy' and float_makespan:
+            local_search_perturb_incremental(seq, cmax_old, perturbed, machines_val, jobs, *buffers[:4])
+        else:
+            local_search_perturb(seq.tolist(), cmax_old, perturbed, machines_val, jobs.tolist())
+    if ls_kernel == 'legacy':
+        makespan(seq.tolist(), tasks, machines_val)
+        makespan(seq.tolist(), perturbed, machines_val)
+    else:
+        makespan_into(seq, tasks, machines_val, buffers[2])
+        makespan_into(seq, perturbed, machines_val, buffers[2])
+        makespan(seq, perturbed, machines_val)
+
+# 让当前（fork出的子）进程在父进程退出时收到SIGKILL，只在Linux上有效，其他平台忽略
+def _die_with_parent():
+    if sys.platform.startswith('linux'):
+        try:
+            ctypes.CDLL(None).prctl(1, signal.SIGKILL)  # 1 = PR_SET_PDEATHSIG
+        except (OSError, AttributeError):
+            pass
+
+# Taillard加速的NEH插入：对每个待插入作业，先计算当前序列的头部矩阵e（各作业在各机器上的最早完工时间）
+# 和尾部矩阵q（从各作业开始到结束的最短剩余时间），再由相对完工时间f[j] = max(e[j-1], f[j的前一台机器]) + p
+# 得到插入到每个位置后的最大完工时间 max(f[j] + q[j])，每个作业的全部插入位置共O(n·m)，整个NEH为O(n²·m)。
+# 相同最大完工时间取最靠前的插入位置，与逐个位置重新计算makespan的结果完全一致
+@jit(nopython=True)
+def neh_taillard(order, tasks, machines_val):
+    n = len(order)
+    seq = np.empty(n, dtype=np.int32)
+    seq[0] = order[0]
+    e = np.zeros((n + 1, machines_val))  # e[j]：序列前j个作业的头部（e[0]为0）
+    q = np.zeros((n + 2, machines_val))  # q[j]：序列第j个作业起的尾部（q[k+1]为0）
+    f = np.zeros((n + 2, machines_val))  # f[j]：插入到第j个位置时新作业的相对完工时间
+    for k in range(1, n):
+        job = order[k]
+        # 当前序列（k个作业）的头部和尾部矩阵
+        for j in range(1, k + 1):
+            for l in range(machines_val):
+                left = e[j, l - 1] if l > 0 else 0.0
+                e[j, l] = max(e[j - 1, l], left) + tasks[seq[j - 1], l]
+        for l in range(machines_val):
+            q[k + 1, l] = 0.0
+        for j in range(k, 0, -1):
+            for l in range(machines_val - 1, -1, -1):
+                right = q[j, l + 1] if l < machines_val - 1 else 0.0
+                q[j, l] = max(q[j + 1, l], right) + tasks[seq[j - 1], l]
+        # 逐个插入位置计算最大完工时间，取第一个最优位置
+        best_pos = 0
+        best_cmax = np.inf
+        for j in range(1, k + 2):
+            cmax = 0.0
+            for l in range(machines_val):
+                left = f[j, l - 1] if l > 0 else 0.0
+                f[j, l] = max(e[j - 1, l], left) + tasks[job, l]
+                if f[j, l] + q[j, l] > cmax:
+                    cmax = f[j, l] + q[j, l]
+            if cmax < best_cmax:
+                best_cmax = cmax
+                best_pos = j - 1
+        # 插入到最优位置
+        for j in range(k, best_pos, -1):
+            seq[j] = seq[j - 1]
+        seq[best_pos] = job
+    return seq, makespan(seq, tasks, machines_val)
+
 # 定义JSSPGLS类，用于解决作业车间调度问题的广义局部搜索
 class JSSPGLS():
     def __init__(self) -> None:
         self.n_inst_eva = 3  # 用于测试的实例数量（较小）
         self.iter_max = 1000  # 广义局部搜索的最大迭代次数
         self.time_max = 30  # 每个实例的最大运行时间（秒）
+        self.n_inst_proc = 1  # 单次评估中并行搜索的实例数（fork子进程），1表示按顺序搜索；与exp_n_proc相乘为总进程数
+        self.ls_kernel = 'incremental'  # 局部搜索的实现：'incremental'（头部/尾部矩阵增量计算）或'legacy'（原实现，逐个候选解重新计算makespan）
+        self.float_makespan = False  # 扰动矩阵是否按浮点数计算makespan并使用增量内核；默认与原实现相同逐次截断为整数，开启后目标值与原实现不同
+        self.instance_dir = "./TrainingData"  # 实例文件目录
+        self.instance_cache = True  # 是否使用二进制实例缓存（instances.npy和instances.json，内存映射读取）
         # 读取实例数据，获取作业数、机器数和处理时间矩阵
         self.tasks_val, self.machines_val, self.tasks = self.read_instances()
         # 导入提示信息类，用于与LLM交互
@@ -115,11 +346,11 @@ class JSSPGLS():
         # 使用NEH算法生成初始序列和对应的最大完工时间
         pi0, cmax0 = self.neh(tasks, machines_val, tasks_val) 
         # 初始化当前序列和最优最大完工时间
-        pi = pi0
+        pi = pi0 if self.ls_kernel == 'legacy' else np.array(pi0, dtype=np.int32)
         cmax_old = cmax0
         # 循环进行局部搜索，直到无法找到更优解
         while True:
-            piprim = local_search(pi, cmax_old,tasks,machines_val)
+            piprim = self.local_search(pi.copy(), cmax_old,tasks,machines_val)
             cmax = makespan(piprim, tasks, machines_val)
             # 如果新解不优于当前解，则跳出循环
             if (cmax>=cmax_old):
@@ -131,141 +362,297 @@ class JSSPGLS():
         # 返回最优序列和对应的最大完工时间
         return pi, cmax_old
 
+    # 局部搜索和带扰动的局部搜索，按ls_kernel选择实现，返回新的序列。两种实现接受移动的顺序相同，整数处理时间下结果完全一致；
+    # 非整数的扰动矩阵只在开启float_makespan时使用增量内核，否则与原实现相同逐次截断。
+    # legacy的序列为列表（返回新列表），incremental的序列为int32数组（直接修改并返回该数组，buffers见scratch_buffers）
+    def local_search(self, pi, cmax, tasks, machines_val, buffers=None):
+        if self.ls_kernel == 'legacy':
+            return local_search(pi, cmax, tasks, machines_val)
+        buffers = buffers or scratch_buffers(len(pi), machines_val)
+        local_search_incremental(pi, cmax, tasks, machines_val, *buffers)
+        return pi
+
+    def local_search_perturb(self, pi, cmax, tasks, machines_val, jobs, buffers=None):
+        if self.ls_kernel == 'legacy':
+            return local_search_perturb(pi, cmax, tasks, machines_val, jobs)
+        jobs = np.asarray(jobs, dtype=np.int32)
+        # 负数位置（按Python列表的从后计数）只有原实现支持；未开启float_makespan时扰动矩阵同样使用原实现
+        if not self.float_makespan or (len(jobs) and jobs.min() < 0):
+            pi[:] = local_search_perturb(pi.tolist(), cmax, tasks, machines_val, jobs.tolist())
+            return pi
+        buffers = buffers or scratch_buffers(len(pi), machines_val)
+        local_search_perturb_incremental(pi, cmax, tasks, machines_val, jobs, *buffers[:4])
+        return pi
+
     ############################################### 迭代局部搜索 ####################################################
+    # 返回所有实例的平均最优最大完工时间，启发式无效时返回大值
     def gls(self,heuristic):
+        cmax_best_list = self.gls_instances(heuristic)
+        if cmax_best_list is None:
+            return 1E10
+        return np.average(cmax_best_list)
+
+    # 对每个测试实例执行广义局部搜索，返回各实例的最优最大完工时间数组；启发式无效时返回None
+    # 竞速评估（race不为None）时，每完成一个实例检查一次，确定无法进入种群后立即停止，返回已完成实例的结果
+    # n_inst_proc > 1时各实例在fork的子进程中并行搜索，结果仍按实例顺序汇总（与顺序执行的结果和竞速判定相同）
+    def gls_instances(self,heuristic,race=None):
         # 初始化存储每个实例最优最大完工时间的数组
         cmax_best_list = np.zeros(self.n_inst_eva)
-        
-        n_inst = 0
-        # 遍历每个实例的作业数、处理时间矩阵和机器数
-        for tasks_val,tasks,machines_val in zip(self.tasks_val, self.tasks, self.machines_val):
-            # 初始化最优最大完工时间为一个很大的值
-            cmax_best = 1E10
-            # 设置随机种子，保证结果可复现
-            random.seed(2024)
-            try:
-                # 使用NEH算法生成初始序列和最大完工时间
-                pi, cmax = self.neh(tasks, machines_val, tasks_val) 
-                n = len(pi)
-                
-                # 初始化最优序列和最优最大完工时间
-                pi_best = pi
-                cmax_best = cmax
-                n_itr = 0
-                time_start = time.time()
-                # 在最大时间和最大迭代次数内循环
-                while time.time() - time_start < self.time_max and n_itr <self.iter_max:
-                    # 对当前序列进行局部搜索
-                    piprim = local_search(pi, cmax,tasks,machines_val)
-
-                    pi = piprim
-                    cmax = makespan(pi, tasks, machines_val)
-                    
-                    # 如果找到更优解，更新最优序列和最优值
-                    if (cmax<cmax_best):
-                        pi_best = pi
-                        cmax_best = cmax
-
-                    # 使用启发式算法（可能来自LLM）获取扰动后的处理时间矩阵和待扰动作业
-                    tasks_perturb, jobs = heuristic.get_matrix_and_jobs(pi, tasks.copy(), machines_val, n)
+        n_total = min(self.n_inst_eva, len(self.tasks))
+        if self.n_inst_proc > 1 and n_total > 1 and hasattr(os, 'fork'):
+            results = self._gls_forked(heuristic, n_total)
+        else:
+            results = (self.gls_instance(heuristic, k) for k in range(n_total))
 
-                    # 检查待扰动作业列表的有效性，若不符合要求则返回大值
-                    if ( len(jobs) <= 1):
-                        print("jobs is not a list of size larger than 1")          
-                        return 1E10   
-                    # 如果作业数量超过5，取前5个
-                    if  ( len(jobs) > 5):
-                        jobs = jobs[:5]
+        try:
+            n_inst = 0
+            for cmax_best in results:
+                # 启发式无效时返回None（并行时其余实例的子进程被终止）
+                if cmax_best is None:
+                    return None
+                # 存储当前实例的最优最大完工时间
+                cmax_best_list[n_inst] = cmax_best
+                n_inst += 1
+                # 达到测试实例数量则停止
+                if n_inst == self.n_inst_eva:
+                    break
+                # 竞速评估：已确定无法进入种群时不再评估其余实例
+                if race is not None and self.race_bound(cmax_best_list[:n_inst], race) is not None:
+                    return cmax_best_list[:n_inst]
+        finally:
+            results.close()
+
+        # 返回所有实例的最优最大完工时间
+        return cmax_best_list
+
+    # 对第k个测试实例执行广义局部搜索，返回最优最大完工时间；启发式无效时返回None。
+    # should_stop()返回True时提前结束搜索（并行子进程的父进程已退出时）
+    def gls_instance(self,heuristic,k,should_stop=None):
+        tasks_val, tasks, machines_val = self.tasks_val[k], self.tasks[k], self.machines_val[k]
+        # 初始化最优最大完工时间为一个很大的值
+        cmax_best = 1E10
+        # 设置随机种子，保证结果可复现
+        random.seed(2024)
+        try:
+            # 使用NEH算法生成初始序列和最大完工时间
+            pi, cmax = self.neh(tasks, machines_val, tasks_val) 
+            n = len(pi)
+            # 增量实现：序列为int32数组，移动直接作用于数组，缓冲区在整个搜索过程中复用
+            inplace = self.ls_kernel != 'legacy'
+            if inplace:
+                pi = np.array(pi, dtype=np.int32)
+                buffers = scratch_buffers(n, machines_val)
+                times = buffers[2]
+            else:
+                buffers = None
+                times = None
+            
+            # 初始化最优序列和最优最大完工时间
+            pi_best = pi.copy() if inplace else pi
+            cmax_best = cmax
+            n_itr = 0
+            time_start = time.time()
+            # 在最大时间和最大迭代次数内循环
+            while time.time() - time_start < self.time_max and n_itr <self.iter_max and not (should_stop and should_stop()):
+                # 对当前序列进行局部搜索
+                piprim = self.local_search(pi, cmax,tasks,machines_val,buffers)
 
-                    # 计算扰动后的处理时间矩阵对应的最大完工时间
-                    cmax = makespan(pi, tasks_perturb, machines_val)
+                pi = piprim
+                cmax = makespan_into(pi, tasks, machines_val, times) if inplace else makespan(pi, tasks, machines_val)
+                
+                # 如果找到更优解，更新最优序列和最优值
+                if (cmax<cmax_best):
+                    if inplace:
+                        pi_best[:] = pi
+                    else:
+                        pi_best = pi
+                    cmax_best = cmax
+
+                # 使用启发式算法（可能来自LLM）获取扰动后的处理时间矩阵和待扰动作业
+                # 启发式总是收到列表形式的当前序列（它对列表的修改同样作用于当前序列）和float64的处理时间矩阵副本
+                if inplace:
+                    current_sequence = pi.tolist()
+                    tasks_perturb, jobs = heuristic.get_matrix_and_jobs(current_sequence, tasks.astype(np.float64), machines_val, n)
+                    pi[:] = current_sequence
+                else:
+                    tasks_perturb, jobs = heuristic.get_matrix_and_jobs(pi, tasks.astype(np.float64), machines_val, n)
+
+                # 检查待扰动作业列表的有效性，若不符合要求则返回大值
+                if ( len(jobs) <= 1):
+                    print("jobs is not a list of size larger than 1")          
+                    return None
+                # 如果作业数量超过5，取前5个
+                if  ( len(jobs) > 5):
+                    jobs = jobs[:5]
+
+                # 计算扰动后的处理时间矩阵对应的最大完工时间
+                if inplace:
+                    tasks_perturb = np.ascontiguousarray(tasks_perturb, dtype=np.float64)
+                cmax = makespan_into(pi, tasks_perturb, machines_val, times) if inplace and self.float_makespan else makespan(pi, tasks_perturb, machines_val)
+
+                # 对指定作业进行带扰动的局部搜索
+                pi = self.local_search_perturb(pi, cmax,tasks_perturb,machines_val,jobs,buffers)
+
+                # 迭代次数加1
+                n_itr +=1
+                # 每50次迭代，将当前序列重置为最优序列
+                if n_itr % 50 == 0:
+                    if inplace:
+                        pi[:] = pi_best
+                    else:
+                        pi = pi_best
+                    cmax = cmax_best
 
-                    # 对指定作业进行带扰动的局部搜索
-                    pi = local_search_perturb(pi, cmax,tasks_perturb,machines_val,jobs)
+        # 捕获异常，将最优值设为大值
+        except Exception as e:
+            cmax_best = 1E10
 
-                    # 迭代次数加1
-                    n_itr +=1
-                    # 每50次迭代，将当前序列重置为最优序列
-                    if n_itr % 50 == 0:
-                        pi = pi_best
-                        cmax = cmax_best
-
-            # 捕获异常，将最优值设为大值
-            except Exception as e:
-                cmax_best = 1E10
-        
-            # 存储当前实例的最优最大完工时间
-            cmax_best_list[n_inst] = cmax_best
-            n_inst += 1
-            # 达到测试实例数量则停止
-            if n_inst == self.n_inst_eva:
+        return cmax_best
+
+    # 在fork的子进程中并行搜索各实例（最多n_inst_proc个同时运行），按实例顺序逐个产出结果。
+    # 子进程继承启发式模块和实例数据（内存映射的实例共享页面），只通过管道传回结果；
+    # 直接使用os.fork，因此在守护进程（如ProcessEvaluator的工作进程）中同样可用。
+    # 子进程随父进程被杀死（评估超时）：Linux上通过PR_SET_PDEATHSIG立即收到SIGKILL，其他平台在下一次迭代时退出；
+    # 生成器关闭时终止仍在运行的子进程
+    def _gls_forked(self, heuristic, n_total):
+        parent = os.getpid()
+        running = {}  # 实例序号 -> (子进程号, 管道读端)
+        n_started = 0
+        compile_kernels(self.tasks[0], self.machines_val[0], self.ls_kernel, self.float_makespan)
+        try:
+            for k in range(n_total):
+                while n_started < n_total and len(running) < self.n_inst_proc:
+                    running[n_started] = self._fork_instance(heuristic, n_started, parent)
+                    n_started += 1
+                pid, fd = running.pop(k)
+                yield self._collect_instance(pid, fd)
+        finally:
+            for pid, fd in running.values():
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+                os.waitpid(pid, 0)
+                os.close(fd)
+
+    def _fork_instance(self, heuristic, k, parent):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                os.close(r)
+                _die_with_parent()
+                if os.getppid() != parent:  # 设置前父进程已退出
+                    os._exit(status)
+                data = memoryview(pickle.dumps(self.gls_instance(heuristic, k, lambda: os.getppid() != parent)))
+                while data:
+                    data = data[os.write(w, data):]
+                status = 0
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(status)
+        os.close(w)
+        return pid, r
+
+    # 读取子进程的结果；子进程异常退出时按评估出错处理（返回大值）
+    @staticmethod
+    def _collect_instance(pid, fd):
+        chunks = []
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
                 break
-        
-        # 返回所有实例的平均最优最大完工时间
-        return np.average(cmax_best_list)
+            chunks.append(chunk)
+        os.close(fd)
+        os.waitpid(pid, 0)
+        if not chunks:
+            return 1E10
+        return pickle.loads(b"".join(chunks))
+
+    # 各测试实例最大完工时间的下界（Taillard下界）：每台机器的总加工时间加上在它之前和之后的最短加工时间，
+    # 以及每个作业的总加工时间，取最大值
+    def lower_bounds(self):
+        if getattr(self, '_lower_bounds', None) is None:
+            bounds = []
+            for tasks in self.tasks[:self.n_inst_eva]:
+                p = np.asarray(tasks, dtype=np.float64)
+                heads = np.cumsum(p, axis=1) - p  # 作业在每台机器之前的加工时间
+                tails = np.sum(p, axis=1, keepdims=True) - np.cumsum(p, axis=1)  # 作业在每台机器之后的加工时间
+                machine_bound = np.max(np.min(heads, axis=0) + np.sum(p, axis=0) + np.min(tails, axis=0))
+                bounds.append(float(max(machine_bound, np.max(np.sum(p, axis=1)))))
+            self._lower_bounds = bounds
+        return self._lower_bounds
+
+    # 竞速评估的判定：race={'threshold': 种群最差目标值, 'references': 最差个体的各实例得分, 'confidence': 统计检验置信度}
+    # 已完成实例的得分加上其余实例的下界，按实例数平均即为最终目标值的下界，不小于threshold时子代不可能进入种群，
+    # 返回 (下界, 'bound')；设置了置信度时再对参考得分做单侧符号检验，显著更差时返回 (max(下界, threshold), 'sign')，
+    # 此时的目标值不是下界，只是保证子代不会进入种群的拒绝值（不应被复用）。仍可能进入种群时返回None
+    def race_bound(self, scores, race):
+        n_done = len(scores)
+        bound = (float(np.sum(scores)) + sum(self.lower_bounds()[n_done:self.n_inst_eva])) / self.n_inst_eva
+        if bound >= race['threshold']:
+            return bound, 'bound'
+        references = race.get('references')
+        confidence = race.get('confidence')
+        if confidence and references is not None and len(references) >= n_done:
+            losses = sum(1 for s, r in zip(scores, references) if s > r)
+            p_value = sum(comb(n_done, i) for i in range(losses, n_done + 1)) / 2 ** n_done
+            if p_value <= 1 - confidence:
+                return max(bound, race['threshold']), 'sign'
+        return None
 
     ###################################################################### NEH算法 ############################################
-    # 计算每个作业的总处理时间并按降序排序，返回排序后的作业索引
+    # 计算每个作业的总处理时间并按降序排序，返回排序后的作业索引（总处理时间相同的作业保持原有顺序）
     def sum_and_order(self,tasks_val, machines_val, tasks):
-        tab = []
-        tab1 = []
-        # 初始化存储总处理时间的列表
-        for i in range(0, tasks_val):
-            tab.append(0)
-            tab1.append(0)
-        # 计算每个作业的总处理时间
-        for j in range(0, tasks_val):
-            for k in range(0, machines_val):
-                tab[j] += tasks[j][k]
-        tmp_tab = tab.copy()
-        place = 0
-        iter = 0
-        # 按总处理时间降序排序作业
-        while(iter != tasks_val):
-            max_time = 1
-            for i in range(0, tasks_val):
-                if(max_time < tab[i]):
-                    max_time = tab[i]
-                    place = i
-            tab[place] = 1
-            tab1[iter] = place
-            iter = iter + 1
-        return tab1
-
-    # 在序列的指定位置插入值，返回新序列
-    def insertNEH(self,sequence, position, value):
-        new_seq = sequence[:]
-        new_seq.insert(position, value)
-        return new_seq
-
-    # NEH算法：生成初始调度序列并计算其最大完工时间
+        totals = np.sum(np.asarray(tasks)[:tasks_val, :machines_val], axis=1)
+        return np.argsort(-totals, kind='stable').tolist()
+
+    # NEH算法：生成初始调度序列并计算其最大完工时间（Taillard加速，见neh_taillard）
     def neh(self,tasks, machines_val, tasks_val):
         # 按总处理时间降序获取作业顺序
         order = self.sum_and_order(tasks_val, machines_val, tasks)
-        current_seq = [order[0]]
         # 依次将每个作业插入到当前序列的最优位置
-        for i in range(1, tasks_val):
-            min_cmax = float("inf")
-            for j in range(0, i + 1):
-                tmp = self.insertNEH(current_seq, j, order[i])
-                cmax_tmp = makespan(tmp, tasks, machines_val)
-                # 记录最优插入位置
-                if min_cmax > cmax_tmp:
-                    best_seq = tmp
-                    min_cmax = cmax_tmp
-            current_seq = best_seq
-        # 返回最优序列和对应的最大完工时间
-        return current_seq, makespan(current_seq, tasks, machines_val)
-
-    # 读取训练数据集中的实例，返回作业数、机器数和处理时间矩阵的列表
+        seq, cmax = neh_taillard(np.array(order, dtype=np.int32), np.ascontiguousarray(tasks), machines_val)
+        # 返回最优序列（列表，供局部搜索使用）和对应的最大完工时间
+        return seq.tolist(), cmax
+
+    # 读取训练数据集中的实例，返回作业数、机器数和处理时间矩阵的列表。
+    # 启用缓存时第一次把全部文本实例转换为一个二进制文件（instances.npy，int32，所有矩阵依次拼接）和索引
+    # （instances.json，每个实例的偏移、形状以及源文件的大小、修改时间和sha256），之后以只读内存映射方式读取：
+    # 同一台机器上的所有进程共享同一份页面缓存，worker进程反序列化问题对象时也不再解析文本。
+    # 源文件的大小或修改时间变化时按sha256校验，内容变化时重新生成缓存；缓存无法写入时直接解析文本
     def read_instances(self):
+        filenames = [self.instance_dir + "/" + str(i) + ".txt" for i in range(1,65)]  # 1到64号实例文件
+        self._mapped_tasks = None  # 从缓存内存映射的矩阵列表（序列化时不带数据）
+        if self.instance_cache:
+            # 缓存文件损坏（索引不是合法的JSON、字段缺失、数据文件被截断等）时与过期相同，重新生成
+            errors = (OSError, ValueError, KeyError, TypeError)
+            try:
+                cached = self._load_instance_cache(filenames)
+            except errors:
+                cached = None
+            if cached is None:
+                try:
+                    self._build_instance_cache(filenames)
+                    cached = self._load_instance_cache(filenames)
+                except errors:
+                    cached = None
+            if cached is not None:
+                self._mapped_tasks = cached[2]
+                return cached
+        return self._parse_instances(filenames)
+
+    # 逐行解析文本实例文件
+    def _parse_instances(self, filenames):
         tasks_val_list = [] 
         machines_val_list = [] 
         tasks_list = []
 
-        # 读取1到64号实例文件
-        for i in range(1,65):
-            filename = "./TrainingData/"+ str(i) + ".txt"
+        for filename in filenames:
             file = open(filename, "r")
 
             # 读取第一行的作业数和机器数
@@ -273,8 +660,8 @@ class JSSPGLS():
             tasks_val = int(tasks_val)
             machines_val = int(machines_val)
 
-            # 初始化处理时间矩阵并读取数据
-            tasks = np.zeros((tasks_val,machines_val))
+            # 初始化处理时间矩阵（C连续的int32矩阵，供numba内核直接使用）并读取数据
+            tasks = np.zeros((tasks_val,machines_val), dtype=np.int32)
             for i in range(tasks_val):
                 tmp = file.readline().split()
                 for j in range(machines_val):
@@ -289,8 +676,95 @@ class JSSPGLS():
 
         return tasks_val_list, machines_val_list, tasks_list
 
+    # 实例缓存的数据文件和索引文件路径
+    def _instance_cache_paths(self):
+        return self.instance_dir + "/instances.npy", self.instance_dir + "/instances.json"
+
+    @staticmethod
+    def _file_sha256(filename):
+        with open(filename, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    # 读取并校验缓存，返回与_parse_instances相同的结果（矩阵为内存映射的只读视图），缓存不存在或已过期时返回None
+    def _load_instance_cache(self, filenames):
+        data_path, index_path = self._instance_cache_paths()
+        if not (os.path.exists(data_path) and os.path.exists(index_path)):
+            return None
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+        entries = index.get('instances', [])
+        if index.get('version') != 1 or [e['file'] for e in entries] != [os.path.basename(f) for f in filenames]:
+            return None
+        # 大小和修改时间相同视为未变化；否则按内容哈希确认
+        for filename, entry in zip(filenames, entries):
+            stat = os.stat(filename)
+            if stat.st_size != entry['size']:
+                return None
+            if stat.st_mtime_ns != entry['mtime_ns'] and self._file_sha256(filename) != entry['sha256']:
+                return None
+        data = np.load(data_path, mmap_mode='r')
+        tasks_list = [np.asarray(data[e['offset']:e['offset'] + e['n'] * e['m']]).reshape(e['n'], e['m']) for e in entries]
+        return [e['n'] for e in entries], [e['m'] for e in entries], tasks_list
+
+    # 解析全部文本实例并写出缓存（先写临时文件再原子替换，多个进程同时生成时互不影响）
+    def _build_instance_cache(self, filenames):
+        tasks_val_list, machines_val_list, tasks_list = self._parse_instances(filenames)
+        entries = []
+        offset = 0
+        for filename, n, m in zip(filenames, tasks_val_list, machines_val_list):
+            stat = os.stat(filename)
+            entries.append({'file': os.path.basename(filename), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                            'sha256': self._file_sha256(filename), 'offset': offset, 'n': n, 'm': m})
+            offset += n * m
+        data = np.concatenate([t.ravel() for t in tasks_list]) if tasks_list else np.zeros(0, dtype=np.int32)
+        data_path, index_path = self._instance_cache_paths()
+        suffix = ".tmp" + str(os.getpid())
+        with open(data_path + suffix, 'wb') as f:
+            np.save(f, data.astype(np.int32))
+        with open(index_path + suffix, 'w') as f:
+            json.dump({'version': 1, 'instances': entries}, f)
+        os.replace(data_path + suffix, data_path)
+        os.replace(index_path + suffix, index_path)
+
+    # 从缓存读取的实例在序列化时不带矩阵数据，反序列化时（如joblib的worker进程）重新内存映射缓存文件
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        mapped = state.pop('_mapped_tasks', None)
+        if mapped is not None and state.get('tasks') is mapped:
+            del state['tasks_val'], state['machines_val'], state['tasks']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if 'tasks' not in state:
+            self.tasks_val, self.machines_val, self.tasks = self.read_instances()
+
+    # 适应度存储的键：参与评估的实例数据和影响评估结果的参数
+    def fitness_key(self):
+        # 处理时间矩阵按float64计算哈希，与改为int32存储之前保存的结果兼容（数值完全相同）
+        tasks = [np.asarray(t, dtype=np.float64) for t in self.tasks[:self.n_inst_eva]]
+        instances = [tasks, self.machines_val[:self.n_inst_eva], self.tasks_val[:self.n_inst_eva]]
+        params = {'n_inst_eva': self.n_inst_eva, 'iter_max': self.iter_max, 'time_max': self.time_max}
+        # 扰动矩阵按浮点数计算makespan时结果与原实现不同（原实现的makespan逐次截断为整数），不复用原实现保存的结果；
+        # 默认的增量实现与原实现结果相同，共用同一个键
+        if self.ls_kernel != 'legacy' and self.float_makespan:
+            params['ls_kernel'] = self.ls_kernel
+            params['makespan'] = 'float'
+        return instances, params
+
     # 评估函数：执行传入的代码字符串作为启发式算法，并返回平均最优最大完工时间
     def evaluate(self, code_string):
+        return self.evaluate_detail(code_string)[0]
+
+    # 评估函数：返回 (平均最优最大完工时间, 各实例的最优最大完工时间列表)；
+    # 启发式无效时各实例得分为None，代码执行出错时返回 (None, None)
+    def evaluate_detail(self, code_string):
+        return self.evaluate_race(code_string, None)[:2]
+
+    # 竞速评估：与evaluate_detail相同，但在确定无法进入种群后提前停止（race的含义见race_bound），
+    # 返回 (目标值, 已完成实例的得分, 提前停止的方式)；未提前停止时为False，否则为race_bound判定的方式
+    # （'bound'：目标值为下界；'sign'：目标值为符号检验的拒绝值）
+    def evaluate_race(self, code_string, race):
         try:
             # 抑制警告
             with warnings.catch_warnings():
@@ -305,11 +779,17 @@ class JSSPGLS():
                 # 将模块添加到sys.modules中以便导入
                 sys.modules[heuristic_module.__name__] = heuristic_module
 
-                # 使用该启发式算法执行广义局部搜索并获取适应度（平均最大完工时间）
-                fitness = self.gls(heuristic_module)
+                # 使用该启发式算法执行广义局部搜索并获取各实例的最优最大完工时间和适应度（平均最大完工时间）
+                cmax_best_list = self.gls_instances(heuristic_module, race)
+                if cmax_best_list is None:
+                    return 1E10, None, False
 
-                return fitness
+                scores = [float(c) for c in cmax_best_list]
+                if len(scores) < self.n_inst_eva:
+                    objective, raced = self.race_bound(cmax_best_list, race)
+                    return objective, scores, raced
+                return np.average(cmax_best_list), scores, False
             
         # 捕获异常，返回None
         except Exception as e:
-            return None
\ No newline at end of file
+            return None, None, False
\ No newline at end of file
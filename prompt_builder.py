@@ -0,0 +1,116 @@
+import ast
+import io
+import tokenize
+from ...llm.api_async import estimate_tokens
+
+
+# Lean code for prompts: drops comments, docstrings and blank lines.
+# Falls back to a line-based filter when the code does not tokenize/parse.
+def compact_code(code):
+    try:
+        docstring_lines = set()
+        for node in ast.walk(ast.parse(code)):
+            if isinstance(node, (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.body:
+                first = node.body[0]
+                if isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant) and isinstance(first.value.value, str):
+                    docstring_lines.update(range(first.lineno, first.end_lineno + 1))
+
+        lines = code.splitlines()
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type == tokenize.COMMENT:
+                row, col = tok.start
+                lines[row - 1] = lines[row - 1][:col]
+        lines = [line for i, line in enumerate(lines, 1) if i not in docstring_lines]
+    except (SyntaxError, tokenize.TokenError, IndentationError):
+        lines = [line for line in code.splitlines() if not line.strip().startswith("#")]
+
+    return "\n".join(line.rstrip() for line in lines if line.strip())
+
+
+# Keeps whole leading lines of text within max_tokens; the cut is marked so the model
+# knows the code continues.
+def truncate(text, max_tokens, marker="..."):
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(0, max_tokens * 4 - len(marker) - 1)
+    kept = []
+    size = 0
+    for line in text.splitlines():
+        if size + len(line) + 1 > max_chars:
+            break
+        kept.append(line)
+        size += len(line) + 1
+    if not kept:
+        return text[:max_chars] + marker
+    indent = kept[-1][:len(kept[-1]) - len(kept[-1].lstrip())]
+    return "\n".join(kept) + "\n" + indent + marker
+
+
+# Builds the operator prompts of Evolution within a token budget. Everything that is the
+# same for every request of a run (task, function signature, input/output notes) comes
+# first, so servers with prefix caching can reuse it; parents and the operator
+# instruction follow. Parent code is compacted and, if the prompt is still too long,
+# descriptions and code are truncated evenly across parents.
+class PromptBuilder():
+
+    def __init__(self, prompt_task, func_name, joined_inputs, n_inputs, joined_outputs, n_outputs,
+                 inout_inf, other_inf, budget=None):
+        self.budget = budget
+        self.prefix = prompt_task + "\n"\
+            "The algorithm must be implemented in Python as a function named " + func_name + \
+            ". This function should accept " + str(n_inputs) + " input(s): " + joined_inputs + \
+            ". The function should return " + str(n_outputs) + " output(s): " + joined_outputs + \
+            ". " + inout_inf + " " + other_inf + "\n"
+        self.suffix = "Do not give additional explanations."
+        self.describe = "First, describe your new algorithm and main steps in one sentence. "\
+            "The description must be inside a brace. Next, implement it in Python as the function specified above.\n"
+
+    def _instruction(self, operator, n_parents):
+        if operator == "i1":
+            return "", self.describe
+        if operator == "e1":
+            return "I have " + str(n_parents) + " existing algorithms with their codes as follows: \n", \
+                "Please help me create a new algorithm that has a totally different form from the given ones. \n" + self.describe
+        if operator == "e2":
+            return "I have " + str(n_parents) + " existing algorithms with their codes as follows: \n", \
+                "Please help me create a new algorithm that has a totally different form from the given ones but can be motivated from them. \n"\
+                "Firstly, identify the common backbone idea in the provided algorithms. Secondly, based on the backbone idea describe your new algorithm in one sentence. "\
+                "The description must be inside a brace. Thirdly, implement it in Python as the function specified above.\n"
+        if operator == "m1":
+            return "I have one algorithm with its code as follows. \n", \
+                "Please assist me in creating a new algorithm that has a different form but can be a modified version of the algorithm provided. \n" + self.describe
+        if operator == "m2":
+            return "I have one algorithm with its code as follows. \n", \
+                "Please identify the main algorithm parameters and assist me in creating a new algorithm that has a different parameter settings of the score function provided. \n" + self.describe
+        if operator == "m3":
+            return "Here is the function: \n", \
+                "First, you need to identify the main components in the function above. "\
+                "Next, analyze whether any of these components can be overfit to the in-distribution instances. "\
+                "Then, based on your analysis, simplify the components to enhance the generalization to potential out-of-distribution instances. "\
+                "Finally, provide the revised code, keeping the function name, inputs, and outputs unchanged. \n"
+        raise ValueError(f"Evolution operator [{operator}] has not been implemented !")
+
+    def _parent_text(self, operator, i, n_parents, algorithm, code):
+        if operator == "m3":
+            return code + "\n"
+        if n_parents == 1:
+            return "Algorithm description: " + algorithm + "\nCode:\n" + code + "\n"
+        return "No." + str(i + 1) + " algorithm and the corresponding code are: \n" + algorithm + "\n" + code + "\n"
+
+    def build(self, operator, parents=None):
+        parents = parents or []
+        head, instruction = self._instruction(operator, len(parents))
+        codes = [compact_code(p['code']) for p in parents]
+        algorithms = [p['algorithm'] for p in parents]
+
+        if self.budget and parents:
+            fixed = estimate_tokens(self.prefix + head + instruction + self.suffix)
+            texts = [self._parent_text(operator, i, len(parents), a, c) for i, (a, c) in enumerate(zip(algorithms, codes))]
+            if fixed + sum(estimate_tokens(t) for t in texts) > self.budget:
+                # descriptions may take at most a quarter of each parent's share, code the rest
+                share = max(1, (self.budget - fixed) // len(parents))
+                algorithms = [truncate(a, max(1, share // 4)) for a in algorithms]
+                codes = [truncate(c, max(1, share - estimate_tokens(a) - 16)) for a, c in zip(algorithms, codes)]
+
+        body = "".join(self._parent_text(operator, i, len(parents), a, c) for i, (a, c) in enumerate(zip(algorithms, codes)))
+        return self.prefix + head + body + instruction + self.suffix
@@ -0,0 +1,74 @@
+import ast
+import re
+import textwrap
+
+
+# Extracts [code, description] from an LLM response in one pass: fenced code blocks
+# (a trailing unclosed fence is accepted, as left by an early-stopped stream) are tried
+# first, then the raw text from the first top-level import/def. The candidate is parsed
+# with ast, trimmed just before the first syntax error if that error is trailing prose
+# (an unindented line after the code; errors inside a function body reject the
+# candidate so that the response is re-requested), and accepted only if it defines func_name. The description is the first balanced {...}
+# outside the code, or else the text before the code.
+class ResponseParser():
+
+    _fence_pattern = re.compile(r"```[ \t]*(?:python|py|python3)?[ \t]*\n(.*?)(?:```|\Z)", re.DOTALL | re.IGNORECASE)
+    _start_pattern = re.compile(r"^(?:import|from|def|@)\b", re.MULTILINE)
+
+    def __init__(self, func_name):
+        self.func_name = func_name
+
+    def __call__(self, response):
+        return self.parse(response)
+
+    def parse(self, response):
+        if not response:
+            return None
+
+        for match in self._fence_pattern.finditer(response):
+            code = self._parse_code(match.group(1))
+            if code is not None:
+                outside = response[:match.start()] + response[match.end():]
+                return [code, self._description(outside, response[:match.start()])]
+
+        match = self._start_pattern.search(response)
+        if match is None:
+            return None
+        code = self._parse_code(response[match.start():])
+        if code is None:
+            return None
+        return [code, self._description(response[:match.start()], response[:match.start()])]
+
+    def _parse_code(self, text):
+        lines = textwrap.dedent(text).strip("\n").split("\n")
+        while lines:
+            try:
+                tree = ast.parse("\n".join(lines))
+            except SyntaxError as e:
+                if not e.lineno or e.lineno <= 1 or e.lineno > len(lines):
+                    return None
+                # prose after the code: keep what precedes the offending line; an indented
+                # offending line belongs to the code itself (typo, truncated statement)
+                offending = lines[e.lineno - 1]
+                if not offending.strip() or offending[0].isspace():
+                    return None
+                lines = lines[:e.lineno - 1]
+                continue
+            if any(isinstance(node, ast.FunctionDef) and node.name == self.func_name for node in tree.body):
+                return "\n".join(lines).rstrip()
+            return None
+        return None
+
+    @staticmethod
+    def _description(outside, head):
+        start = outside.find("{")
+        if start >= 0:
+            depth = 0
+            for i in range(start, len(outside)):
+                if outside[i] == "{":
+                    depth += 1
+                elif outside[i] == "}":
+                    depth -= 1
+                    if depth == 0:
+                        return outside[start + 1:i].strip()
+        return head.replace("```", "").strip()
@@ -11,7 +11,7 @@ setup(
     install_requires=[  # 安装该包时需要自动安装的依赖库
         "numpy",
         "numba",
-        "joblib"
+        "joblib>=1.4"  # Parallel的return_as="generator"/"generator_unordered"需要1.3/1.4及以上版本
     ],
     test_suite="tests"  # 测试套件的位置（指定测试代码所在的目录）
 )
\ No newline at end of file
@@ -0,0 +1,81 @@
+import re
+
+
+# Decides, while a response is still streaming, whether it already holds everything
+# _get_alg needs: the algorithm description in braces, then `def <func_name>(...)`
+# with its body-level return statement fully received. The rest would be discarded.
+class StreamExtractor():
+
+    _string_pattern = re.compile(r"'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\"")
+
+    def __init__(self, func_name):
+        self.func_name = func_name
+        self._def_pattern = re.compile(r"^([ \t]*)def\s+" + re.escape(func_name) + r"\s*\(", re.MULTILINE)
+
+    def __call__(self, text):
+        return self.is_complete(text)
+
+    def is_complete(self, text):
+        match = self._def_pattern.search(text)
+        if match is None:
+            return False
+        if not self._has_description(text[:match.start()]):
+            return False
+        return self._has_return(text[match.start():], len(match.group(1).expandtabs()))
+
+    @staticmethod
+    def _has_description(head):
+        start = head.find("{")
+        if start < 0:
+            return False
+        depth = 0
+        for ch in head[start:]:
+            if ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    return True
+        return False
+
+    def _bracket_delta(self, line):
+        line = self._string_pattern.sub("", line).split("#", 1)[0]
+        return sum(line.count(c) for c in "([{") - sum(line.count(c) for c in ")]}")
+
+    def _has_return(self, code, def_indent):
+        # the last line may still be arriving, so only complete lines are inspected
+        lines = code.split("\n")[:-1]
+        depth = 0
+        in_signature = True
+        in_docstring = False
+        body_indent = None
+        in_return = False
+        for line in lines:
+            n_quotes = line.count('"""') + line.count("'''")
+            if in_docstring or (n_quotes % 2 == 1):
+                if n_quotes % 2 == 1:
+                    in_docstring = not in_docstring
+                continue
+            stripped = line.strip()
+            if in_signature:
+                depth += self._bracket_delta(line)
+                if depth <= 0 and stripped.endswith(":"):
+                    in_signature = False
+                    depth = 0
+                continue
+            if not stripped or stripped.startswith("#"):
+                continue
+            indent = len(line.expandtabs()) - len(line.expandtabs().lstrip())
+            if depth == 0 and not in_return:
+                if body_indent is None:
+                    if indent <= def_indent:
+                        return False
+                    body_indent = indent
+                if indent < body_indent:
+                    return False
+                if indent == body_indent and re.match(r"return\b", stripped):
+                    in_return = True
+            depth += self._bracket_delta(line)
+            if in_return and depth <= 0 and not stripped.endswith("\\"):
+                return True
+        return False
@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+import unittest
+
+from eoh.llm.api_pool import ConnectionPool, get_pool, parse_endpoint
+from eoh.llm.llm_server import serve_in_background
+
+PAYLOAD = json.dumps({"model": "stand-in", "messages": [{"role": "user", "content": "1+1=?"}]})
+HEADERS = {"Content-Type": "application/json"}
+
+
+# 连接池测试：对本地替身服务（llm_server）发送真实的HTTP请求
+class TestConnectionPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.url = serve_in_background()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def make_pool(self, max_size=4, idle_timeout=60):
+        scheme, host, port, _ = parse_endpoint(self.url)
+        pool = ConnectionPool(scheme, host, port, max_size, idle_timeout, timeout=10)
+        self.addCleanup(pool.close)
+        return pool
+
+    # 在已取出的连接上发送一次请求并读取完整响应，返回本地端口（用于区分不同的TCP连接）
+    def send(self, conn):
+        conn.request("POST", "/v1/chat/completions", PAYLOAD, HEADERS)
+        res = conn.getresponse()
+        res.read()
+        self.assertEqual(res.status, 200)
+        return conn.sock.getsockname()[1]
+
+    def test_keep_alive_reuse(self):
+        pool = self.make_pool()
+        conn, reused = pool.acquire()
+        self.assertFalse(reused)
+        port = self.send(conn)
+        pool.release(conn)
+
+        conn, reused = pool.acquire()
+        self.assertTrue(reused)
+        self.assertEqual(self.send(conn), port)
+        pool.release(conn)
+
+        status, _, data = pool.request("POST", "/v1/chat/completions", PAYLOAD, HEADERS)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(data)["choices"][0]["message"]["content"], "2")
+        self.assertEqual(pool._n_open, 1)
+
+    def test_max_size_blocks_until_release(self):
+        pool = self.make_pool(max_size=2)
+        held = [pool.acquire()[0] for _ in range(2)]
+        acquired = threading.Event()
+
+        def waiter():
+            conn, _ = pool.acquire()
+            acquired.set()
+            pool.release(conn)
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        self.assertFalse(acquired.wait(0.2))
+        self.assertEqual(pool._n_open, 2)
+        pool.release(held.pop())
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        pool.release(held.pop())
+        self.assertLessEqual(pool._n_open, 2)
+
+    def test_idle_eviction(self):
+        pool = self.make_pool(idle_timeout=0.05)
+        conn, _ = pool.acquire()
+        self.send(conn)
+        pool.release(conn)
+        time.sleep(0.1)
+        conn, reused = pool.acquire()
+        self.assertFalse(reused)
+        self.assertEqual(pool._n_open, 1)
+        self.send(conn)
+        pool.release(conn)
+
+    # 共享的连接池提高上限时唤醒已经在等待的线程，并采用较宽松的空闲时间
+    def test_get_pool_widen_wakes_waiters(self):
+        pool = get_pool(self.url, max_size=1, idle_timeout=1)
+        self.addCleanup(pool.close)
+        conn, _ = pool.acquire()
+        acquired = threading.Event()
+
+        def waiter():
+            other, _ = pool.acquire()
+            acquired.set()
+            pool.release(other)
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        self.assertFalse(acquired.wait(0.2))
+        self.assertIs(get_pool(self.url, max_size=2, idle_timeout=30), pool)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        self.assertEqual((pool.max_size, pool.idle_timeout), (2, 30))
+        pool.release(conn)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from eoh.methods.eoh.code_fingerprint import code_fingerprint
+
+CODE = '''def get_matrix_and_jobs(x, n):
+    y = x
+    return y, n
+'''
+
+
+class TestCodeFingerprint(unittest.TestCase):
+    def test_docstrings_and_comments_ignored(self):
+        variant = '"""Module docstring."""\n' + CODE.replace("    y = x", "    # copy\n    y = x") + "'''trailing note'''\n"
+        self.assertEqual(code_fingerprint(variant), code_fingerprint(CODE))
+
+    def test_local_names_ignored(self):
+        self.assertEqual(code_fingerprint(CODE.replace("y", "tmp")), code_fingerprint(CODE))
+
+    # 顶层的裸名称表达式在exec时抛出NameError，不能与可运行的代码共用同一个指纹（否则复用其目标值）
+    def test_bare_names_kept(self):
+        for trailer in ["y, n\n", "y\n"]:
+            with self.subTest(trailer=trailer):
+                self.assertNotEqual(code_fingerprint(CODE + trailer), code_fingerprint(CODE))
+                with self.assertRaises(NameError):
+                    exec(CODE + trailer, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
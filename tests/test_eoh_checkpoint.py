@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+from eoh.methods.eoh.eoh_checkpoint import EventLog, read_events, replay
+
+
+# 种群管理替身：按目标值排序后保留前size个
+class Manage():
+    @staticmethod
+    def population_management(pop, size):
+        return sorted(pop, key=lambda x: x['objective'])[:size]
+
+
+def add2pop(population, offspring):
+    population.extend(offspring)
+
+
+def offspring(objective):
+    return {'event': 'offspring', 'operator': 'e1', 'offspring': {'objective': objective}}
+
+
+class TestSteadyReplay(unittest.TestCase):
+    # 进度从init事件记录的起始值累计，失败的任务只计入完成数，检查点记录实际的插入数
+    def test_progress(self):
+        events = [
+            {'event': 'init', 'generation': 3, 'population': [{'objective': 5.0}], 'n_inserted': 12, 'n_completed': 14},
+            offspring(4.0), offspring(None), {'event': 'failed', 'operator': 'm1'},
+            {'event': 'checkpoint', 'k': 3, 'progress': {'n_inserted': 13, 'n_completed': 17}},
+            offspring(3.0),
+        ]
+        state = replay(events, add2pop, Manage(), 2)
+        self.assertEqual((state['n_inserted'], state['n_completed'], state['n_checkpointed']), (14, 18, 13))
+        self.assertEqual(state['progress'], {3: {'n_inserted': 13, 'n_completed': 17}})
+        self.assertEqual(len(state['window']), 1)
+        self.assertEqual([ind['objective'] for ind in state['population']], [3.0, 4.0])
+
+
+class TestEventLog(unittest.TestCase):
+    # 不续跑时已有的非空日志改名保留，不被覆盖
+    def test_existing_log_rotated(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "events.jsonl")
+        for i in range(3):
+            log = EventLog(path)
+            log.append({'event': 'init', 'run': i}, sync=True)
+            log.close()
+            self.assertEqual(log.rotated, f"{path}.{i}" if i else None)
+        self.assertEqual(read_events(path)[0], [{'event': 'init', 'run': 2}])
+        self.assertEqual(read_events(path + ".1")[0], [{'event': 'init', 'run': 0}])
+        self.assertEqual(read_events(path + ".2")[0], [{'event': 'init', 'run': 1}])
+
+        log = EventLog(path, append=True)
+        log.close()
+        self.assertIsNone(log.rotated)
+        self.assertFalse(os.path.exists(path + ".3"))
+
+
+if __name__ == '__main__':
+    unittest.main()
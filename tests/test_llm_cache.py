@@ -0,0 +1,44 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from eoh.llm.llm_cache import LLMCache
+
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "llm_cache.sqlite")
+
+    def sessions(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return sorted(row[0] for row in conn.execute("SELECT DISTINCT session FROM draws"))
+        finally:
+            conn.close()
+
+    def test_sample_indices_per_session(self):
+        cache = LLMCache(self.path, session="a")
+        self.assertEqual([cache.next_index("m", "k") for _ in range(3)], [0, 1, 2])
+        self.assertEqual(LLMCache(self.path, session="b").next_index("m", "k"), 0)
+
+    # 过期会话的计数在连接时删除，仍在使用的会话保留
+    def test_stale_sessions_evicted(self):
+        LLMCache(self.path, session="old").next_index("m", "k")
+        LLMCache(self.path, session="live").next_index("m", "k")
+        conn = sqlite3.connect(self.path)
+        conn.execute("UPDATE sessions SET last_seen=? WHERE session='old'", (time.time() - 3600,))
+        conn.commit()
+        conn.close()
+
+        cache = LLMCache(self.path, session="new", session_ttl=60)
+        self.assertEqual(cache.next_index("m", "k"), 0)
+        self.assertEqual(self.sessions(), ["live", "new"])
+        self.assertEqual(LLMCache(self.path, session="live", session_ttl=60).next_index("m", "k"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import types
+import unittest
+
+import numpy as np
+
+import prob
+
+# 扰动若干作业的处理时间（非整数倍），与LLM生成的启发式相同的接口
+HEURISTIC = '''
+import numpy as np
+def get_matrix_and_jobs(current_sequence, time_matrix, m, n):
+    new_matrix = time_matrix.copy()
+    perturb_jobs = current_sequence[2:6]
+    for j in perturb_jobs:
+        new_matrix[j] = new_matrix[j] * 1.37
+    return new_matrix, perturb_jobs
+'''
+
+KERNELS = ['makespan', 'makespan_into', 'local_search', 'local_search_perturb', 'local_search_incremental',
+           'local_search_perturb_incremental', 'swap_pass', 'insert_pass', 'neh_taillard']
+
+
+# 问题对象：实例从临时目录读取（经过二进制缓存，与实际运行相同的只读内存映射矩阵），不加载提示词
+def make_problem(instance_dir, ls_kernel='incremental', float_makespan=False):
+    problem = prob.JSSPGLS.__new__(prob.JSSPGLS)
+    problem.instance_dir = instance_dir
+    problem.instance_cache = True
+    problem.tasks_val, problem.machines_val, problem.tasks = problem.read_instances()
+    problem.n_inst_eva = 4
+    problem.iter_max = 60
+    problem.time_max = 60
+    problem.n_inst_proc = 1
+    problem.ls_kernel = ls_kernel
+    problem.float_makespan = float_makespan
+    return problem
+
+
+class TestKernelWarmup(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.instance_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(2024)
+        for i in range(1, 65):
+            n, m = 12, 4
+            with open(os.path.join(cls.instance_dir, f"{i}.txt"), 'w') as f:
+                f.write(f"{n} {m}\n")
+                for row in rng.integers(1, 100, size=(n, m)):
+                    f.write(" ".join(f"{k} {p}" for k, p in enumerate(row)) + "\n")
+        cls.heuristic = types.ModuleType('heuristic_module')
+        exec(HEURISTIC, cls.heuristic.__dict__)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.instance_dir)
+
+    # 预编译之后的搜索不再编译新的特化版本（否则fork的子进程每次评估都要重新编译）
+    def test_search_uses_warmed_specialisations(self):
+        for ls_kernel, float_makespan in [('incremental', False), ('incremental', True), ('legacy', False)]:
+            with self.subTest(ls_kernel=ls_kernel, float_makespan=float_makespan):
+                problem = make_problem(self.instance_dir, ls_kernel, float_makespan)
+                prob.compile_kernels(problem.tasks[0], problem.machines_val[0], ls_kernel, float_makespan)
+                before = {name: len(getattr(prob, name).signatures) for name in KERNELS}
+                problem.gls_instance(self.heuristic, 0)
+                after = {name: len(getattr(prob, name).signatures) for name in KERNELS}
+                self.assertEqual(before, after)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "requires fork")
+    def test_parallel_matches_sequential(self):
+        problem = make_problem(self.instance_dir)
+        expected = problem.gls_instances(self.heuristic).tolist()
+        problem.n_inst_proc = 2
+        self.assertEqual(problem.gls_instances(self.heuristic).tolist(), expected)
+
+    # 默认的增量实现与原实现的目标值完全相同（扰动矩阵同样逐次截断）
+    def test_incremental_matches_legacy(self):
+        legacy = make_problem(self.instance_dir, 'legacy').gls_instances(self.heuristic).tolist()
+        self.assertEqual(make_problem(self.instance_dir).gls_instances(self.heuristic).tolist(), legacy)
+
+
+if __name__ == '__main__':
+    unittest.main()